@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import DEFERRED
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -11,12 +12,32 @@ class Profile(models.Model):
     def __str__(self) -> str:
         return f"Profile({self.user.username})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {name: value for name, value in zip(field_names, values) if value is not DEFERRED}
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = {f.attname: getattr(self, f.attname) for f in self._meta.concrete_fields}
+
+    def has_changed(self) -> bool:
+        """True for an unsaved profile or one edited since it was loaded."""
+        loaded = getattr(self, "_loaded_values", None)
+        if self._state.adding or loaded is None:
+            return True
+        return any(getattr(self, name) != value for name, value in loaded.items())
+
 
 @receiver(post_save, sender=User)
 def create_or_update_user_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
-    else:
+        return
+    # Plain user saves (e.g. last_login on every login) never touch the profile;
+    # only one loaded through this user and edited since is written back
+    if User.profile.related.is_cached(instance) and instance.profile.has_changed():
         instance.profile.save()
 
 
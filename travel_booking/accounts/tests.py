@@ -2,6 +2,8 @@ from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth.models import User
 
+from .models import Profile
+
 
 class AccountsTests(TestCase):
     def test_register_and_login(self):
@@ -28,4 +30,27 @@ class AccountsTests(TestCase):
         )
         self.assertEqual(resp.status_code, 200)
 
+
+class ProfileSignalTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="dana", password="pass12345")
+
+    def test_login_does_not_touch_profile(self):
+        # user, session lookup + insert, last_login, session update (with savepoints)
+        with self.assertNumQueries(9):
+            self.client.post(reverse("accounts:login"), {"username": "dana", "password": "pass12345"})
+
+    def test_unchanged_profile_is_not_saved(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.profile  # loaded, but not edited
+        with self.assertNumQueries(1):
+            user.save(update_fields=["first_name"])
+
+    def test_edited_profile_is_saved_with_user(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.profile.phone = "555"
+        user.save()
+        self.assertEqual(Profile.objects.get(user=user).phone, "555")
+
+
 # Create your tests here.
@@ -1,5 +1,19 @@
 from django.contrib import admin
-from .models import TravelOption, Booking
+from .models import Location, LocationAlias, OutboxEmail, SeatHold, TravelOption, Booking
+
+
+class LocationAliasInline(admin.TabularInline):
+    model = LocationAlias
+    fields = ("name",)
+    extra = 1
+
+
+@admin.register(Location)
+class LocationAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "key")
+    search_fields = ("name", "key")
+    readonly_fields = ("key",)
+    inlines = [LocationAliasInline]
 
 
 @admin.register(TravelOption)
@@ -11,6 +25,7 @@ class TravelOptionAdmin(admin.ModelAdmin):
         "destination",
         "departure_date",
         "departure_time",
+        "duration",
         "price",
         "available_seats",
         "created_at",
@@ -26,6 +41,7 @@ class BookingAdmin(admin.ModelAdmin):
         "user",
         "travel_option",
         "number_of_seats",
+        "unit_price",
         "total_price",
         "status",
         "booking_date",
@@ -34,4 +50,18 @@ class BookingAdmin(admin.ModelAdmin):
     search_fields = ("user__username",)
 
 
+@admin.register(SeatHold)
+class SeatHoldAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "travel_option", "seats", "status", "expires_at", "created_at")
+    list_filter = ("status",)
+    search_fields = ("user__username",)
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("id", "subject", "recipient", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("recipient",)
+
+
 # Register your models here.
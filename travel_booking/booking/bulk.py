@@ -0,0 +1,147 @@
+import json
+from collections import Counter, defaultdict
+
+from django.db import connection, transaction
+
+from .forms import BookingForm
+from .models import Booking, TravelOption
+from .outbox import enqueue_email
+from .popular import record_booking
+
+
+def validate_item(item) -> tuple:
+    """Return (cleaned item, error message) for one raw batch entry."""
+    if not isinstance(item, dict):
+        return None, "Item must be an object."
+    try:
+        travel_option_id = int(item.get("travel_option_id"))
+    except (TypeError, ValueError):
+        return None, "travel_option_id is required."
+    passengers = item.get("passengers") or []
+    # Same rules as the HTML booking form
+    form = BookingForm({"number_of_seats": item.get("seats"), "passenger_payload": json.dumps(passengers)})
+    if not form.is_valid():
+        return None, " ".join(error for errors in form.errors.values() for error in errors)
+    seats = form.cleaned_data["number_of_seats"]
+    if seats <= 0:
+        return None, "Number of seats must be positive."
+    return {
+        "travel_option_id": travel_option_id,
+        "seats": seats,
+        "passenger_details": form.cleaned_data["passenger_details"],
+        "primary_passenger_name": form.cleaned_data["primary_passenger_name"].strip(),
+        "primary_passenger_age": form.cleaned_data["primary_passenger_age"],
+    }, None
+
+
+def book_batch(user, items: list, all_or_nothing: bool = True) -> tuple:
+    """Book every item in one transaction.
+
+    Returns (ok, results) with one result dict per input item, in order. With
+    ``all_or_nothing`` any rejected item rolls the whole batch back; otherwise
+    items are filled in request order while seats last.
+    """
+    results = [None] * len(items)
+    cleaned = {}
+    for index, item in enumerate(items):
+        valid, error = validate_item(item)
+        if error:
+            results[index] = {"index": index, "status": "rejected", "error": error}
+        else:
+            cleaned[index] = valid
+    if all_or_nothing and len(cleaned) != len(items):
+        return False, _mark_aborted(results)
+
+    with transaction.atomic():
+        # Lock in ascending id order so overlapping batches cannot deadlock
+        option_ids = sorted({item["travel_option_id"] for item in cleaned.values()})
+        options = {
+            option.pk: option
+            for option in TravelOption.objects.select_for_update().filter(pk__in=option_ids).order_by("pk")
+        }
+        remaining = {pk: option.available_seats for pk, option in options.items()}
+        accepted = []
+        for index, item in cleaned.items():
+            pk = item["travel_option_id"]
+            if pk not in options:
+                results[index] = {"index": index, "status": "rejected", "error": "Unknown travel option."}
+            elif remaining[pk] < item["seats"]:
+                results[index] = {"index": index, "status": "rejected", "error": "Not enough seats available."}
+            else:
+                remaining[pk] -= item["seats"]
+                accepted.append(index)
+
+        if all_or_nothing and len(accepted) != len(items):
+            transaction.set_rollback(True)
+            return False, _mark_aborted(results)
+        if not accepted:
+            return False, results
+
+        seats_per_option = defaultdict(int)
+        for index in accepted:
+            seats_per_option[cleaned[index]["travel_option_id"]] += cleaned[index]["seats"]
+        for pk in sorted(seats_per_option):
+            # The rows are locked, so this only fails where select_for_update cannot lock;
+            # the whole batch then rolls back, in partial mode too
+            if not TravelOption.objects.reserve_seats(pk, seats_per_option[pk]):
+                transaction.set_rollback(True)
+                for index in accepted:
+                    if cleaned[index]["travel_option_id"] == pk:
+                        results[index] = {"index": index, "status": "rejected", "error": "Not enough seats available."}
+                return False, _mark_aborted(results)
+
+        bookings = []
+        for index in accepted:
+            item = cleaned[index]
+            option = options[item["travel_option_id"]]
+            bookings.append(
+                Booking(
+                    user=user,
+                    travel_option=option,
+                    number_of_seats=item["seats"],
+                    primary_passenger_name=item["primary_passenger_name"],
+                    primary_passenger_age=item["primary_passenger_age"],
+                    passenger_details=item["passenger_details"],
+                    # bulk_create skips Booking.save(), so price here
+                    unit_price=option.price,
+                    total_price=item["seats"] * option.price,
+                )
+            )
+        if connection.features.can_return_rows_from_bulk_insert:
+            Booking.objects.bulk_create(bookings)
+        else:
+            # MySQL returns no ids from a bulk insert; the results and email need them
+            for booking in bookings:
+                booking.save(force_insert=True)
+
+        bookings_per_route = Counter()
+        for booking in bookings:
+            option = booking.travel_option
+            bookings_per_route[(option.source, option.destination)] += 1
+        for (source, destination), count in bookings_per_route.items():
+            record_booking(source, destination, delta=count)
+
+        for index, booking in zip(accepted, bookings):
+            results[index] = {
+                "index": index,
+                "status": "confirmed",
+                "booking_id": booking.pk,
+                "travel_option_id": booking.travel_option_id,
+                "seats": booking.number_of_seats,
+                "total_price": str(booking.total_price),
+            }
+        if user.email:
+            lines = [f"#{b.pk}: {b.travel_option} x{b.number_of_seats}" for b in bookings]
+            enqueue_email(
+                subject="Group Booking Confirmed",
+                message="The following bookings are confirmed:\n" + "\n".join(lines),
+                recipient=user.email,
+            )
+    return True, results
+
+
+def _mark_aborted(results: list) -> list:
+    return [
+        result or {"index": index, "status": "aborted", "error": "Batch rolled back."}
+        for index, result in enumerate(results)
+    ]
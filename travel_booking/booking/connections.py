@@ -0,0 +1,332 @@
+"""Connecting itineraries from a per-process, time-expanded graph of departures.
+
+Each process holds, per (source, destination) location pair, the departures
+sorted by departure minute in flat arrays (about 40 bytes a departure).
+A search walks forward from the origin: onward departures inside the
+layover window are found with bisect, and a partial itinerary is dropped as
+soon as it arrives later (or costs more) than the worst of the best
+``limit`` found so far.
+
+TravelOption saves and deletes append to a change log in the shared cache,
+and every process applies the logged departures to its graph before its
+next search instead of rebuilding. Bulk loads call invalidate_graph().
+"""
+import heapq
+import threading
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Location, TravelOption, start_of_day
+
+GRAPH_GENERATION_KEY = "booking:connections-generation"
+GRAPH_CHANGES_KEY = "booking:connections-changes"
+GRAPH_CHANGE_PREFIX = "booking:connections-change"
+# Long enough for any process to come back for its changes; after that it rebuilds
+CHANGE_TTL_SECONDS = 24 * 3600
+# Past this many pending changes a rebuild is cheaper than patching
+MAX_PATCH_CHANGES = 5000
+# Itineraries searched per result wanted, so sold-out legs can be dropped afterwards
+CANDIDATES_PER_RESULT = 3
+SORTS = ("arrival", "price")
+TYPE_CODES = {name: code for code, name in enumerate(TravelOption.TravelType.values)}
+GRAPH_FIELDS = (
+    "pk",
+    "source_location_id",
+    "destination_location_id",
+    "departure_date",
+    "departure_time",
+    "duration",
+    "price",
+    "type",
+)
+
+
+def to_minutes(day, moment) -> int:
+    """Minutes since 0001-01-01 of a departure's (local) date and time."""
+    return day.toordinal() * 1440 + moment.hour * 60 + moment.minute
+
+
+def graph_key(option) -> tuple:
+    """Where a departure sits in the graph: (source, destination, departure minute)."""
+    return option.source_location_id, option.destination_location_id, to_minutes(
+        option.departure_date, option.departure_time
+    )
+
+
+class Route:
+    """Departures on one location pair as parallel arrays sorted by departure minute."""
+
+    __slots__ = ("departs", "arrives", "ids", "cents", "types")
+
+    def __init__(self, rows=()):
+        rows = sorted(rows)
+        self.departs = array("q", (row[0] for row in rows))
+        self.arrives = array("q", (row[1] for row in rows))
+        self.ids = array("q", (row[2] for row in rows))
+        self.cents = array("q", (row[3] for row in rows))
+        self.types = array("b", (row[4] for row in rows))
+
+    def rows(self):
+        return zip(self.departs, self.arrives, self.ids, self.cents, self.types)
+
+
+class ConnectionGraph:
+    """Routes plus who-connects-to-whom. Changes copy the route (and set) they
+    touch instead of mutating it, so searches running in other threads always
+    see a consistent graph."""
+
+    def __init__(self, rows=()):
+        by_pair = {}
+        for row in rows:
+            entry = self._entry(row)
+            if entry:
+                by_pair.setdefault(entry[0], []).append(entry[1])
+        self.routes = {pair: Route(departures) for pair, departures in by_pair.items()}
+        self.outgoing, self.incoming = {}, {}
+        for source, destination in self.routes:
+            self.outgoing.setdefault(source, set()).add(destination)
+            self.incoming.setdefault(destination, set()).add(source)
+        # Shared generation this graph was built for, and how far into the change log it is
+        self.generation = None
+        self.applied = 0
+
+    @staticmethod
+    def _entry(row):
+        pk, source, destination, day, moment, duration, price, travel_type = row
+        if source is None or destination is None or duration is None:
+            return None
+        departs = to_minutes(day, moment)
+        arrives = departs + int(duration.total_seconds() // 60)
+        return (source, destination), (departs, arrives, pk, int(price * 100), TYPE_CODES[travel_type])
+
+    def __len__(self) -> int:
+        return sum(len(route.ids) for route in self.routes.values())
+
+    def replace(self, pk: int, old_key, row) -> None:
+        """Drop departure ``pk`` from ``old_key`` (if given) and add ``row`` (if it still exists)."""
+        if old_key:
+            pair = old_key[:2]
+            route = self.routes.get(pair)
+            if route is not None:
+                self.routes[pair] = Route(r for r in route.rows() if r[2] != pk)
+        entry = self._entry(row) if row else None
+        if entry:
+            pair, departure = entry
+            route = self.routes.get(pair, Route())
+            self.routes[pair] = Route([*(r for r in route.rows() if r[2] != pk), departure])
+            source, destination = pair
+            if destination not in self.outgoing.get(source, ()):
+                self.outgoing[source] = self.outgoing.get(source, set()) | {destination}
+                self.incoming[destination] = self.incoming.get(destination, set()) | {source}
+
+    def search(
+        self, origins, destinations, day, *, types=(), max_legs=2, min_layover=45, max_layover=360,
+        sort="arrival", limit=10,
+    ) -> list:
+        """Leg id tuples of the best ``limit`` itineraries leaving an origin on ``day``.
+
+        Ranked by (arrival, price) or (price, arrival). Both only grow as legs
+        are added, which is what makes pruning on the current worst safe.
+        """
+        destinations = set(destinations)
+        allowed = {TYPE_CODES[name] for name in types} or None
+        by_price = sort == "price"
+        # reach[k]: places from which some destination is at most k legs away
+        reach = [destinations]
+        for _ in range(max_legs - 1):
+            nearer = set(reach[-1])
+            for place in reach[-1]:
+                nearer |= self.incoming.get(place, set())
+            reach.append(nearer)
+        # Max-heap (negated keys) of the best itineraries so far
+        best = []
+
+        def walk(place, earliest, latest, legs, cents, visited):
+            left = max_legs - len(legs)
+            onward = self.outgoing.get(place, set())
+            nexts = destinations & onward if left == 1 else onward
+            for nxt in nexts:
+                final = nxt in destinations
+                if nxt in visited or not (final or nxt in reach[left - 1]):
+                    continue
+                route = self.routes[(place, nxt)]
+                for i in range(bisect_left(route.departs, earliest), bisect_right(route.departs, latest)):
+                    if allowed is not None and route.types[i] not in allowed:
+                        continue
+                    arrives, total = route.arrives[i], cents + route.cents[i]
+                    key = (total, arrives) if by_price else (arrives, total)
+                    if len(best) >= limit and key >= (-best[0][0], -best[0][1]):
+                        continue
+                    path = (*legs, route.ids[i])
+                    if final:
+                        entry = (-key[0], -key[1], path)
+                        if len(best) < limit:
+                            heapq.heappush(best, entry)
+                        else:
+                            heapq.heapreplace(best, entry)
+                    else:
+                        walk(nxt, arrives + min_layover, arrives + max_layover, path, total, visited | {nxt})
+
+        start = day.toordinal() * 1440
+        origins = set(origins)
+        for origin in origins:
+            walk(origin, start, start + 1439, (), 0, origins)
+        return [path for _, _, path in sorted(best, reverse=True)]
+
+
+def build_graph() -> ConnectionGraph:
+    # Yesterday onwards: overnight legs of today's itineraries may have left then.
+    # Read from the primary, as in _patch(); connection searches are replica-routed views
+    rows = (
+        TravelOption.objects.using("default")
+        .filter(departure_at__gte=start_of_day(timezone.localdate() - timedelta(days=1)))
+        .values_list(*GRAPH_FIELDS)
+        .iterator(chunk_size=10000)
+    )
+    return ConnectionGraph(rows)
+
+
+def record_change(pk: int, old_key=None) -> None:
+    """Log that departure ``pk`` changed (``old_key`` = where it used to sit); run on commit."""
+    record_changes([(pk, old_key)])
+
+
+def record_changes(changes: list) -> None:
+    """record_change() for many (pk, old_key) pairs: one counter bump and one write."""
+    if not changes:
+        return
+    try:
+        position = cache.incr(GRAPH_CHANGES_KEY, len(changes))
+    except ValueError:
+        cache.add(GRAPH_CHANGES_KEY, 0, None)
+        position = cache.incr(GRAPH_CHANGES_KEY, len(changes))
+    first = position - len(changes) + 1
+    cache.set_many(
+        {f"{GRAPH_CHANGE_PREFIX}:{first + n}": change for n, change in enumerate(changes)}, CHANGE_TTL_SECONDS
+    )
+
+
+def invalidate_graph() -> None:
+    """Make every process rebuild (for bulk loads that bypass the model signals)."""
+    cache.set(GRAPH_GENERATION_KEY, uuid.uuid4().hex, None)
+
+
+def _patch(graph: ConnectionGraph, position: int) -> bool:
+    """Apply logged changes up to ``position``; False if some have expired."""
+    keys = [f"{GRAPH_CHANGE_PREFIX}:{n}" for n in range(graph.applied + 1, position + 1)]
+    changes = cache.get_many(keys)
+    if len(changes) != len(keys):
+        return False
+    changed = [changes[key] for key in keys]
+    # From the primary: a lagging replica would drop new departures or keep moved ones
+    # in place, and the change is never replayed once ``applied`` has moved past it
+    rows = TravelOption.objects.using("default").filter(pk__in={pk for pk, _ in changed}).values_list(*GRAPH_FIELDS)
+    current = {row[0]: row for row in rows}
+    for pk, old_key in changed:
+        graph.replace(pk, old_key, current.get(pk))
+    graph.applied = position
+    return True
+
+
+_lock = threading.Lock()
+_graph = None
+
+
+def _shared_state() -> tuple:
+    state = cache.get_many([GRAPH_GENERATION_KEY, GRAPH_CHANGES_KEY])
+    if GRAPH_GENERATION_KEY not in state:
+        cache.add(GRAPH_GENERATION_KEY, uuid.uuid4().hex, None)
+        state[GRAPH_GENERATION_KEY] = cache.get(GRAPH_GENERATION_KEY)
+    return state[GRAPH_GENERATION_KEY], state.get(GRAPH_CHANGES_KEY, 0)
+
+
+def get_graph() -> ConnectionGraph:
+    """This process's graph, patched from the change log or rebuilt when invalidated."""
+    global _graph
+    generation, position = _shared_state()
+    graph = _graph
+    if graph is not None and graph.generation == generation and graph.applied == position:
+        return graph
+    with _lock:
+        graph = _graph
+        stale = graph is None or graph.generation != generation or position < graph.applied
+        if not stale and position > graph.applied:
+            stale = position - graph.applied > MAX_PATCH_CHANGES or not _patch(graph, position)
+        if stale:
+            graph = build_graph()
+            graph.generation = generation
+            graph.applied = position
+            _graph = graph
+    return graph
+
+
+@dataclass
+class Itinerary:
+    legs: list
+
+    @staticmethod
+    def departs(leg) -> datetime:
+        return datetime.combine(leg.departure_date, leg.departure_time)
+
+    @classmethod
+    def arrives(cls, leg) -> datetime:
+        return cls.departs(leg) + leg.duration
+
+    @property
+    def departs_at(self) -> datetime:
+        return self.departs(self.legs[0])
+
+    @property
+    def arrives_at(self) -> datetime:
+        return self.arrives(self.legs[-1])
+
+    @property
+    def price(self):
+        return sum(leg.price for leg in self.legs)
+
+    @property
+    def layovers(self) -> list:
+        return [self.departs(after) - self.arrives(before) for before, after in zip(self.legs, self.legs[1:])]
+
+
+def find_connections(
+    source: str, destination: str, day, *, types=(), max_legs=2, min_layover=45, max_layover=360,
+    sort="arrival", seats=1, limit=10,
+) -> list:
+    """Best itineraries from ``source`` to ``destination`` leaving on ``day``.
+
+    The graph picks the candidates; their legs are then re-read in one query,
+    so seats and prices are live and legs changed since the graph was patched
+    are re-checked. Layovers are in minutes. Place names match exactly
+    (aliases included), not by prefix.
+    """
+    origins = list(Location.objects.matching(source, prefix=False).values_list("pk", flat=True))
+    destinations = list(Location.objects.matching(destination, prefix=False).values_list("pk", flat=True))
+    if not origins or not destinations:
+        return []
+    candidates = get_graph().search(
+        origins, destinations, day, types=types, max_legs=max_legs, min_layover=min_layover,
+        max_layover=max_layover, sort=sort, limit=limit * CANDIDATES_PER_RESULT,
+    )
+    legs = TravelOption.objects.in_bulk({pk for path in candidates for pk in path})
+    window = (timedelta(minutes=min_layover), timedelta(minutes=max_layover))
+    itineraries = []
+    for path in candidates:
+        if not all(pk in legs and legs[pk].duration is not None for pk in path):
+            continue
+        itinerary = Itinerary([legs[pk] for pk in path])
+        if all(leg.available_seats >= seats for leg in itinerary.legs) and all(
+            window[0] <= layover <= window[1] for layover in itinerary.layovers
+        ):
+            itineraries.append(itinerary)
+    if sort == "price":
+        itineraries.sort(key=lambda it: (it.price, it.arrives_at))
+    else:
+        itineraries.sort(key=lambda it: (it.arrives_at, it.price))
+    return itineraries[:limit]
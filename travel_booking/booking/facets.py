@@ -0,0 +1,128 @@
+"""Search facets: how many matches per travel type, price bucket, time of day
+and seat band, all counted in one conditional-aggregation query.
+
+Facets are disjunctive: the counts of a facet apply every selected filter but
+its own, so with "Bus" picked the type facet still shows how many flights and
+trains there are.
+"""
+from dataclasses import dataclass, field
+from datetime import time
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .models import TravelOption
+
+# Filters a facet can set; (facet, SearchForm fields)
+FACET_FIELDS = {
+    "type": ("type",),
+    "price": ("price_from", "price_under"),
+    "time": ("depart_after", "depart_before"),
+}
+TIME_BUCKETS = (
+    ("Night", time(0), time(6)),
+    ("Morning", time(6), time(12)),
+    ("Afternoon", time(12), time(18)),
+    ("Evening", time(18), None),
+)
+
+
+def _range(name: str, low, high) -> Q:
+    """``low <= name < high``; either bound may be None."""
+    condition = Q()
+    if low is not None:
+        condition &= Q(**{f"{name}__gte": low})
+    if high is not None:
+        condition &= Q(**{f"{name}__lt": high})
+    return condition
+
+
+def facet_filters(cleaned_data: dict) -> dict:
+    """The Q each facet's selected filter adds to a search (an empty Q when unset)."""
+    travel_type = cleaned_data.get("type")
+    return {
+        "type": Q(type=travel_type) if travel_type else Q(),
+        "price": _range("price", cleaned_data.get("price_from"), cleaned_data.get("price_under")),
+        "time": _range("departure_time", cleaned_data.get("depart_after"), cleaned_data.get("depart_before")),
+    }
+
+
+def _price_label(low, high) -> str:
+    if low is None:
+        return f"Under ${high}"
+    if high is None:
+        return f"${low}+"
+    return f"${low}–{high}"
+
+
+def _buckets() -> dict:
+    """(label, condition, SearchForm values selecting it) per bucket, per facet."""
+    edges = [None, *settings.SEARCH_PRICE_BUCKETS, None]
+    few = settings.SEARCH_FEW_SEATS
+    return {
+        "type": [(label, Q(type=value), {"type": value}) for value, label in TravelOption.TravelType.choices],
+        "price": [
+            (_price_label(low, high), _range("price", low, high), {"price_from": low, "price_under": high})
+            for low, high in zip(edges, edges[1:])
+        ],
+        "time": [
+            (label, _range("departure_time", start, end), {"depart_after": start, "depart_before": end})
+            for label, start, end in TIME_BUCKETS
+        ],
+        # Informational only: seats change with every booking, so there is no seat filter
+        "seats": [
+            ("Sold out", Q(available_seats__lte=0), {}),
+            (f"Under {few} left", _range("available_seats", 1, few), {}),
+            (f"{few}+ seats", Q(available_seats__gte=few), {}),
+        ],
+    }
+
+
+def _count(condition: Q) -> Count:
+    return Count("id", filter=condition) if condition else Count("id")
+
+
+def facet_aggregates(cleaned_data: dict) -> dict:
+    """Aggregate expressions for QuerySet.aggregate() over the search without its
+    facet filters: ``total`` plus ``<facet>_<n>`` per bucket."""
+    filters = facet_filters(cleaned_data)
+
+    def others(facet):
+        condition = Q()
+        for name, selected in filters.items():
+            if name != facet:
+                condition &= selected
+        return condition
+
+    aggregates = {"total": _count(others(None))}
+    for facet, buckets in _buckets().items():
+        for n, (_, condition, _) in enumerate(buckets):
+            aggregates[f"{facet}_{n}"] = _count(condition & others(facet))
+    return aggregates
+
+
+@dataclass
+class Bucket:
+    label: str
+    count: int
+    # SearchForm values that select this bucket
+    values: dict = field(default_factory=dict)
+    selected: bool = False
+    # Query string toggling the bucket, filled in by the view
+    query: str = ""
+
+
+def build_facets(counts: dict, cleaned_data: dict) -> dict:
+    """Buckets per facet from the result of facet_aggregates(), plus ``total``."""
+    facets = {"total": counts["total"]}
+    for facet, buckets in _buckets().items():
+        facets[facet] = [
+            Bucket(
+                label=label,
+                count=counts[f"{facet}_{n}"],
+                values=values,
+                selected=bool(values) and all(cleaned_data.get(name) == value for name, value in values.items()),
+            )
+            for n, (label, _, values) in enumerate(buckets)
+        ]
+    return facets
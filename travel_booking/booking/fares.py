@@ -0,0 +1,157 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Min, Q, Sum
+
+from .models import FareDay, Location, TravelOption, start_of_day
+
+# A FareDay key, as the attribute names on a TravelOption
+DAY_FIELDS = ("type", "source_location_id", "destination_location_id", "departure_date")
+# FareDay fields in the order _aggregate() selects them
+AGGREGATE_FIELDS = ("type", "source_location", "destination_location", "date", "min_price", "departures")
+# Keys per recompute query; each adds a nested OR term, and SQLite caps expression depth
+REFRESH_BATCH_SIZE = 100
+CENTS = Decimal("0.01")
+
+# Set of keys collected inside deferred_fare_refresh()
+_deferred = ContextVar("fare_refresh_deferred", default=None)
+
+
+def fare_day(option) -> tuple:
+    return tuple(getattr(option, name) for name in DAY_FIELDS)
+
+
+def _aggregate(queryset):
+    return (
+        queryset.values(*DAY_FIELDS)
+        .annotate(min_price=Min("price"), departures=Count("id"))
+        .order_by()
+    )
+
+
+def _fare_day_row(row) -> FareDay:
+    return FareDay(
+        type=row["type"],
+        source_location_id=row["source_location_id"],
+        destination_location_id=row["destination_location_id"],
+        date=row["departure_date"],
+        min_price=row["min_price"],
+        departures=row["departures"],
+    )
+
+
+def _key_filter(keys, date_field: str) -> Q:
+    condition = Q()
+    for travel_type, source_id, destination_id, day in keys:
+        condition |= Q(
+            type=travel_type, source_location_id=source_id, destination_location_id=destination_id, **{date_field: day}
+        )
+    return condition
+
+
+def refresh_fare_days(keys) -> None:
+    """Recompute the FareDay rows for (type, source_location_id,
+    destination_location_id, departure_date) keys from their departures.
+
+    For schedule changes (new, moved, repriced or deleted departures); seat
+    changes do not touch FareDay. Call inside the transaction making the change.
+    """
+    deferred = _deferred.get()
+    if deferred is not None:
+        deferred.update(keys)
+        return
+    keys = [key for key in set(keys) if None not in key]
+    for start in range(0, len(keys), REFRESH_BATCH_SIZE):
+        batch = keys[start : start + REFRESH_BATCH_SIZE]
+        departures = TravelOption.objects.filter(_key_filter(batch, "departure_date"))
+        with transaction.atomic():
+            # Serialize concurrent recomputes of the same days
+            list(departures.select_for_update().values_list("pk", flat=True))
+            days = [_fare_day_row(row) for row in _aggregate(departures)]
+            # MySQL takes no conflict target; its ON DUPLICATE KEY hits fare_day_unique
+            target = ["source_location", "destination_location", "date", "type"]
+            FareDay.objects.bulk_create(
+                days,
+                update_conflicts=True,
+                unique_fields=target if connection.features.supports_update_conflicts_with_target else None,
+                update_fields=["min_price", "departures"],
+            )
+            # Days left without departures
+            remaining = {(day.type, day.source_location_id, day.destination_location_id, day.date) for day in days}
+            emptied = [key for key in batch if key not in remaining]
+            if emptied:
+                FareDay.objects.filter(_key_filter(emptied, "date")).delete()
+
+
+@contextmanager
+def deferred_fare_refresh():
+    """Recompute each day touched inside the block once, at the end, in batches.
+
+    For bulk edits through the model (e.g. deleting a whole schedule), where
+    the signals would otherwise recompute a day per departure.
+    """
+    keys = set()
+    token = _deferred.set(keys)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+    refresh_fare_days(keys)
+
+
+@transaction.atomic
+def rebuild_fare_calendar() -> int:
+    """Recreate every FareDay from the departures; returns the day count.
+
+    One INSERT ... SELECT of the grouped aggregate, so no day passes through
+    Python (about 8 s instead of 40 s for 1M departures on SQLite).
+    """
+    FareDay.objects.all().delete()
+    departures = TravelOption.objects.filter(source_location__isnull=False, destination_location__isnull=False)
+    select, params = _aggregate(departures).query.sql_with_params()
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(FareDay._meta.get_field(name).column) for name in AGGREGATE_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {quote(FareDay._meta.db_table)} ({columns}) {select}", params)
+    return FareDay.objects.count()
+
+
+def fare_calendar_days(source: str, destination: str, start, days: int, travel_type: str = "") -> list:
+    """Cheapest fare, departures and seats left per day from ``start`` for ``days`` days.
+
+    Fares and departure counts are one range read on the fare_day_unique
+    index. Seats left are summed live from the departures, in a second range
+    read on the (route, departure_at) index, so bookings never write to a
+    shared per-day row. Days without departures are left out. Place names
+    match exactly (aliases included), not by prefix.
+    """
+    route = {
+        "source_location__in": Location.objects.matching(source, prefix=False),
+        "destination_location__in": Location.objects.matching(destination, prefix=False),
+    }
+    if travel_type:
+        route["type"] = travel_type
+    rows = (
+        FareDay.objects.filter(**route, date__range=(start, start + timedelta(days=days - 1)))
+        .values("date")
+        .annotate(min_price=Min("min_price"), departures=Sum("departures"))
+        .order_by("date")
+    )
+    seats_left = dict(
+        TravelOption.objects.filter(
+            **route,
+            departure_at__gte=start_of_day(start),
+            departure_at__lt=start_of_day(start + timedelta(days=days)),
+        )
+        .values_list("departure_date")
+        .annotate(seats=Sum("available_seats"))
+        .order_by()
+    )
+    # Aggregates skip the DecimalField quantizing on some backends (SQLite)
+    return [
+        {**row, "min_price": row["min_price"].quantize(CENTS), "seats_left": seats_left.get(row["date"], 0)}
+        for row in rows
+    ]
@@ -1,5 +1,8 @@
 from django import forms
-from .models import Booking
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Booking, TravelOption
 
 
 class SearchForm(forms.Form):
@@ -52,6 +55,156 @@ class SearchForm(forms.Form):
             }
         ),
     )
+    # Widens ``date`` to date ± flex_days; ignored without a date
+    flex_days = forms.TypedChoiceField(
+        required=False,
+        coerce=int,
+        empty_value=0,
+        choices=[(0, "Exact date")]
+        + [(n, f"± {n} day{'s' if n > 1 else ''}") for n in range(1, settings.SEARCH_FLEX_MAX_DAYS + 1)],
+        widget=forms.Select(attrs={"class": "form-select", "aria-label": "Flexible dates"}),
+        label="Flexible",
+    )
+    # Facet filters: price_from <= price < price_under, depart_after <= time < depart_before
+    price_from = forms.DecimalField(
+        required=False,
+        min_value=0,
+        decimal_places=2,
+        label="Price from",
+        widget=forms.NumberInput(attrs={"class": "form-control", "aria-label": "Price from", "step": "any"}),
+    )
+    price_under = forms.DecimalField(
+        required=False,
+        min_value=0,
+        decimal_places=2,
+        label="Price under",
+        widget=forms.NumberInput(attrs={"class": "form-control", "aria-label": "Price under", "step": "any"}),
+    )
+    depart_after = forms.TimeField(
+        required=False,
+        label="Departing after",
+        widget=forms.TimeInput(attrs={"type": "time", "class": "form-control", "aria-label": "Departing after"}),
+    )
+    depart_before = forms.TimeField(
+        required=False,
+        label="Departing before",
+        widget=forms.TimeInput(attrs={"type": "time", "class": "form-control", "aria-label": "Departing before"}),
+    )
+
+    def clean(self):
+        cleaned = super().clean()
+        for low, high in (("price_from", "price_under"), ("depart_after", "depart_before")):
+            if cleaned.get(low) is not None and cleaned.get(high) is not None and cleaned[low] >= cleaned[high]:
+                self.add_error(high, f"Must be above {self.fields[low].label.lower()}.")
+        return cleaned
+
+
+class FareCalendarForm(SearchForm):
+    """A route plus a date range; ``date`` is the first day shown (today when blank)."""
+
+    flex_days = price_from = price_under = depart_after = depart_before = None
+    days = forms.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=settings.FARE_CALENDAR_MAX_DAYS,
+        label="Days",
+        widget=forms.NumberInput(attrs={"class": "form-control", "aria-label": "Days"}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["source"].required = True
+        self.fields["destination"].required = True
+
+    def clean(self):
+        cleaned = super().clean()
+        cleaned["date"] = cleaned.get("date") or timezone.localdate()
+        cleaned["days"] = cleaned.get("days") or settings.FARE_CALENDAR_DAYS
+        return cleaned
+
+
+class NextDeparturesForm(SearchForm):
+    """A route's next ``limit`` departures at or after ``after`` (default: now)."""
+
+    date = flex_days = price_from = price_under = depart_after = depart_before = None
+    after = forms.DateTimeField(required=False, label="After")
+    limit = forms.IntegerField(required=False, min_value=1, max_value=settings.NEXT_DEPARTURES_MAX, label="How many")
+    seats = forms.IntegerField(required=False, min_value=1, max_value=settings.SEAT_HOLD_MAX_SEATS, label="Seats")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["source"].required = True
+        self.fields["destination"].required = True
+
+    def clean(self):
+        cleaned = super().clean()
+        cleaned["limit"] = cleaned.get("limit") or settings.NEXT_DEPARTURES_LIMIT
+        cleaned["seats"] = cleaned.get("seats") or 1
+        return cleaned
+
+
+class ConnectionSearchForm(SearchForm):
+    """A route and a departure day; legs may mix any of the allowed ``types``."""
+
+    type = flex_days = price_from = price_under = depart_after = depart_before = None
+    types = forms.MultipleChoiceField(
+        required=False,
+        choices=TravelOption.TravelType.choices,
+        widget=forms.CheckboxSelectMultiple,
+        label="Types",
+    )
+    max_legs = forms.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=settings.CONNECTION_MAX_LEGS,
+        label="Legs",
+        widget=forms.NumberInput(attrs={"class": "form-control", "aria-label": "Legs"}),
+    )
+    min_layover = forms.IntegerField(
+        required=False,
+        min_value=0,
+        max_value=settings.CONNECTION_LAYOVER_CAP_MINUTES,
+        label="Min layover (min)",
+        widget=forms.NumberInput(attrs={"class": "form-control", "aria-label": "Minimum layover"}),
+    )
+    max_layover = forms.IntegerField(
+        required=False,
+        min_value=0,
+        max_value=settings.CONNECTION_LAYOVER_CAP_MINUTES,
+        label="Max layover (min)",
+        widget=forms.NumberInput(attrs={"class": "form-control", "aria-label": "Maximum layover"}),
+    )
+    sort = forms.ChoiceField(
+        required=False,
+        choices=(("arrival", "Earliest arrival"), ("price", "Cheapest")),
+        widget=forms.Select(attrs={"class": "form-select", "aria-label": "Sort"}),
+        label="Sort",
+    )
+    seats = forms.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=settings.SEAT_HOLD_MAX_SEATS,
+        label="Seats",
+        widget=forms.NumberInput(attrs={"class": "form-control", "aria-label": "Seats"}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in ("source", "destination", "date"):
+            self.fields[name].required = True
+
+    def clean(self):
+        cleaned = super().clean()
+        cleaned["max_legs"] = cleaned.get("max_legs") or 2
+        if cleaned.get("min_layover") is None:
+            cleaned["min_layover"] = settings.CONNECTION_MIN_LAYOVER_MINUTES
+        if cleaned.get("max_layover") is None:
+            cleaned["max_layover"] = settings.CONNECTION_MAX_LAYOVER_MINUTES
+        if cleaned["min_layover"] > cleaned["max_layover"]:
+            self.add_error("max_layover", "Must not be shorter than the minimum layover.")
+        cleaned["sort"] = cleaned.get("sort") or "arrival"
+        cleaned["seats"] = cleaned.get("seats") or 1
+        return cleaned
 
 
 class BookingForm(forms.ModelForm):
@@ -74,18 +227,25 @@ class BookingForm(forms.ModelForm):
             passengers = json.loads(payload) if payload else []
         except Exception:
             passengers = []
+        # The payload comes straight from the client (or the bulk API); check its shape
+        if not isinstance(passengers, list) or not all(isinstance(p, dict) for p in passengers):
+            raise forms.ValidationError("Passenger details must be a list of objects.")
         if seats and len(passengers) != seats:
             raise forms.ValidationError("Please provide details for all passengers.")
         # basic validation of each passenger
+        people = []
         for p in passengers:
-            name = (p.get("name") or "").strip()
-            age = int(p.get("age") or 0)
+            name = str(p.get("name") or "").strip()
+            try:
+                age = int(p.get("age") or 0)
+            except (TypeError, ValueError):
+                age = 0
             if not name or age <= 0:
                 raise forms.ValidationError("Passenger name and age are required.")
+            people.append((name, age))
         cleaned["passenger_details"] = passengers
-        if passengers:
-            cleaned["primary_passenger_name"] = passengers[0]["name"]
-            cleaned["primary_passenger_age"] = int(passengers[0]["age"])
+        if people:
+            cleaned["primary_passenger_name"], cleaned["primary_passenger_age"] = people[0]
         return cleaned
 
 
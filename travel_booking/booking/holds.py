@@ -0,0 +1,81 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import SeatHold, TravelOption
+
+
+def active_hold(user, travel_option):
+    return (
+        SeatHold.objects.filter(
+            user=user,
+            travel_option=travel_option,
+            status=SeatHold.Status.ACTIVE,
+            expires_at__gt=timezone.now(),
+        )
+        .order_by("-expires_at")
+        .first()
+    )
+
+
+def place_hold(user, travel_option, seats: int):
+    """Hold ``seats`` for ``user`` (reusing a live hold), or None when sold out."""
+    hold = active_hold(user, travel_option)
+    if hold:
+        return hold
+    with transaction.atomic():
+        if not TravelOption.objects.reserve_seats(travel_option.pk, seats):
+            return None
+        return SeatHold.objects.create(
+            user=user,
+            travel_option=travel_option,
+            seats=seats,
+            expires_at=timezone.now() + timedelta(seconds=settings.SEAT_HOLD_TTL_SECONDS),
+        )
+
+
+def convert_hold(hold) -> int:
+    """Claim an active hold for a booking; returns the seats it carried (0 if it lapsed).
+
+    Must run inside the booking transaction so a rollback hands the hold back.
+    """
+    if hold is None:
+        return 0
+    claimed = SeatHold.objects.filter(pk=hold.pk, status=SeatHold.Status.ACTIVE).update(
+        status=SeatHold.Status.CONVERTED
+    )
+    return hold.seats if claimed else 0
+
+
+def expire_holds(batch_size: int = 1000, now=None) -> tuple:
+    """Release one batch of lapsed holds; returns (holds expired, seats released).
+
+    Seats go back with a single UPDATE per departure rather than one per hold.
+    """
+    now = now or timezone.now()
+    locking = connection.features.has_select_for_update_skip_locked
+    with transaction.atomic():
+        active = SeatHold.objects.filter(status=SeatHold.Status.ACTIVE)
+        lapsed = active.filter(expires_at__lte=now)
+        if locking:
+            lapsed = lapsed.select_for_update(skip_locked=True)
+        rows = list(lapsed.order_by("expires_at").values_list("pk", "travel_option_id", "seats")[:batch_size])
+        if not rows:
+            return 0, 0
+
+        if locking:
+            active.filter(pk__in=[pk for pk, _, _ in rows]).update(status=SeatHold.Status.EXPIRED)
+        else:
+            # Unlocked rows may have been converted (or expired by another sweeper)
+            # since the select; only holds this sweep flips give their seats back
+            rows = [row for row in rows if active.filter(pk=row[0]).update(status=SeatHold.Status.EXPIRED)]
+        per_departure = defaultdict(int)
+        for _, travel_option_id, seats in rows:
+            per_departure[travel_option_id] += seats
+        # Deterministic order keeps concurrent sweepers from deadlocking
+        for travel_option_id in sorted(per_departure):
+            TravelOption.objects.release_seats(travel_option_id, per_departure[travel_option_id])
+    return len(rows), sum(per_departure.values())
@@ -0,0 +1,245 @@
+"""Opt-in per-request SQL/template timing (REQUEST_METRICS_ENABLED).
+
+When the setting is off the middleware is not in the stack at all, so the
+cost is zero. When on, every request records query count, SQL time,
+duplicate queries, template render time and time spent in row-locking
+statements (see LOCKING_SQL_MARKERS for the backends that emit them),
+aggregated per view into in-process histograms.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open-ended
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Statements whose duration is mostly waiting for a lock: row locks on MySQL and
+# PostgreSQL, the write lock under SQLITE_CONCURRENT_MODE. Plain SQLite emits
+# neither (select_for_update is a no-op and BEGIN takes no lock), so lock_wait_ms
+# stays 0 there; its waits land in sql_ms on the first write instead
+LOCKING_SQL_MARKERS = ("FOR UPDATE", "BEGIN IMMEDIATE")
+
+# A context variable rather than a thread local: async views render in the
+# event loop thread, and asgiref carries context across sync/async hops
+_current = ContextVar("request_metrics_sample", default=None)
+
+
+def _empty_stats() -> dict:
+    return {
+        "requests": 0,
+        "total_ms": 0.0,
+        "max_ms": 0.0,
+        "queries": 0,
+        "max_queries": 0,
+        "sql_ms": 0.0,
+        "duplicate_queries": 0,
+        "template_ms": 0.0,
+        "lock_wait_ms": 0.0,
+        "histogram": [0] * (len(HISTOGRAM_BUCKETS_MS) + 1),
+        "worst_duplicate": "",
+    }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._last_flush = time.monotonic()
+
+    def record(self, view: str, sample: dict) -> None:
+        bucket = next(
+            (i for i, bound in enumerate(HISTOGRAM_BUCKETS_MS) if sample["total_ms"] <= bound),
+            len(HISTOGRAM_BUCKETS_MS),
+        )
+        with self._lock:
+            stats = self._views.setdefault(view, _empty_stats())
+            stats["requests"] += 1
+            stats["histogram"][bucket] += 1
+            stats["max_ms"] = max(stats["max_ms"], sample["total_ms"])
+            stats["max_queries"] = max(stats["max_queries"], sample["queries"])
+            for key in ("total_ms", "queries", "sql_ms", "duplicate_queries", "template_ms", "lock_wait_ms"):
+                stats[key] += sample[key]
+            if sample["worst_duplicate"]:
+                stats["worst_duplicate"] = sample["worst_duplicate"]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {view: dict(stats, histogram=list(stats["histogram"])) for view, stats in self._views.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+    def flush_due(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_flush < settings.REQUEST_METRICS_FLUSH_SECONDS:
+            return False
+        self._last_flush = now
+        return True
+
+
+registry = MetricsRegistry()
+
+
+def merge_snapshots(snapshots) -> dict:
+    merged = {}
+    for snapshot in snapshots:
+        for view, stats in snapshot.items():
+            into = merged.setdefault(view, _empty_stats())
+            for key in ("requests", "total_ms", "queries", "sql_ms", "duplicate_queries", "template_ms", "lock_wait_ms"):
+                into[key] += stats[key]
+            into["max_ms"] = max(into["max_ms"], stats["max_ms"])
+            into["max_queries"] = max(into["max_queries"], stats["max_queries"])
+            into["histogram"] = [a + b for a, b in zip(into["histogram"], stats["histogram"])]
+            into["worst_duplicate"] = stats["worst_duplicate"] or into["worst_duplicate"]
+    return merged
+
+
+def summarize(snapshot: dict) -> dict:
+    """Per-view averages and histogram percentiles ready for JSON output."""
+    summary = {}
+    for view, stats in sorted(snapshot.items()):
+        n = stats["requests"] or 1
+        summary[view] = {
+            "requests": stats["requests"],
+            "avg_ms": round(stats["total_ms"] / n, 2),
+            "p50_ms": _histogram_percentile(stats["histogram"], 50),
+            "p95_ms": _histogram_percentile(stats["histogram"], 95),
+            "p99_ms": _histogram_percentile(stats["histogram"], 99),
+            "max_ms": round(stats["max_ms"], 2),
+            "avg_queries": round(stats["queries"] / n, 2),
+            "max_queries": stats["max_queries"],
+            "avg_sql_ms": round(stats["sql_ms"] / n, 2),
+            "avg_template_ms": round(stats["template_ms"] / n, 2),
+            "avg_lock_wait_ms": round(stats["lock_wait_ms"] / n, 2),
+            "duplicate_queries": stats["duplicate_queries"],
+            "worst_duplicate": stats["worst_duplicate"],
+            "histogram": dict(zip([f"<={b}ms" for b in HISTOGRAM_BUCKETS_MS] + ["inf"], stats["histogram"])),
+        }
+    return summary
+
+
+def _histogram_percentile(histogram: list, pct: float):
+    """Upper bucket bound containing the percentile (None for the open bucket)."""
+    total = sum(histogram)
+    if not total:
+        return 0
+    seen = 0
+    for i, count in enumerate(histogram):
+        seen += count
+        if seen >= total * pct / 100:
+            return HISTOGRAM_BUCKETS_MS[i] if i < len(HISTOGRAM_BUCKETS_MS) else None
+    return None
+
+
+def snapshot_dir() -> Path:
+    return Path(settings.REQUEST_METRICS_DIR)
+
+
+def write_snapshot() -> None:
+    """Publish this process's aggregates for ``manage.py request_metrics``."""
+    directory = snapshot_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    target = directory / f"{socket.gethostname()}-{os.getpid()}.json"
+    tmp = target.with_suffix(".tmp")
+    tmp.write_text(json.dumps(registry.snapshot()))
+    os.replace(tmp, target)
+
+
+def read_snapshots() -> dict:
+    snapshots = []
+    for path in sorted(snapshot_dir().glob("*.json")):
+        try:
+            snapshots.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return merge_snapshots(snapshots)
+
+
+class _QueryRecorder:
+    def __init__(self, sample: dict):
+        self.sample = sample
+        self.seen = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.sample["queries"] += 1
+            self.sample["sql_ms"] += elapsed
+            if any(marker in sql for marker in LOCKING_SQL_MARKERS):
+                self.sample["lock_wait_ms"] += elapsed
+            try:
+                key = (sql, repr(params))
+            except Exception:
+                key = (sql, None)
+            self.seen[key] += 1
+            if self.seen[key] > 1:
+                self.sample["duplicate_queries"] += 1
+                self.sample["worst_duplicate"] = sql[:300]
+
+
+def _install_template_timer():
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, "_timed", False):
+        return
+    original = Template.render
+
+    def render(self, *args, **kwargs):
+        sample = _current.get()
+        if sample is None or sample.get("_rendering"):
+            return original(self, *args, **kwargs)
+        sample["_rendering"] = True
+        started = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            sample["_rendering"] = False
+            sample["template_ms"] += (time.perf_counter() - started) * 1000
+
+    render._timed = True
+    Template.render = render
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _install_template_timer()
+
+    def __call__(self, request):
+        sample = {
+            "queries": 0,
+            "sql_ms": 0.0,
+            "duplicate_queries": 0,
+            "template_ms": 0.0,
+            "lock_wait_ms": 0.0,
+            "worst_duplicate": "",
+        }
+        recorder = _QueryRecorder(sample)
+        token = _current.set(sample)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        sample["total_ms"] = (time.perf_counter() - started) * 1000
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "<unresolved>"
+        registry.record(f"{request.method} {view}", sample)
+        if registry.flush_due():
+            write_snapshot()
+        return response
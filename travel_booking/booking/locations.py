@@ -0,0 +1,47 @@
+import re
+import unicodedata
+
+# Historic/alternate spellings that should resolve to the canonical city name.
+DEFAULT_ALIASES = {
+    "Bangalore": "Bengaluru",
+    "Bombay": "Mumbai",
+    "Madras": "Chennai",
+    "Calcutta": "Kolkata",
+    "Poona": "Pune",
+    "Cochin": "Kochi",
+    "Baroda": "Vadodara",
+    "Allahabad": "Prayagraj",
+    "Vizag": "Visakhapatnam",
+    "Gurgaon": "Gurugram",
+    "New Delhi": "Delhi",
+    "NYC": "New York",
+    "LA": "Los Angeles",
+    "SF": "San Francisco",
+}
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_location(name: str) -> str:
+    """Fold a free-text place name to its lookup key.
+
+    "  São Paulo " and "sao-paulo" both become "sao paulo". Names with no ASCII
+    fold ("दिल्ली", "東京") keep their own letters, case-folded. Empty when the
+    name has no letters or digits at all.
+    """
+    folded = unicodedata.normalize("NFKD", name or "")
+    key = _NON_WORD.sub(" ", folded.encode("ascii", "ignore").decode("ascii").lower()).strip()
+    if key:
+        return key
+    # Letters (L), marks (M, e.g. Devanagari vowel signs) and digits (N) are kept
+    folded = unicodedata.normalize("NFKC", name or "").casefold()
+    return " ".join("".join(ch if unicodedata.category(ch)[0] in "LMN" else " " for ch in folded).split())
+
+
+def prefix_range(key: str) -> dict:
+    """Lookup kwargs for a prefix match on ``key`` expressed as an index range.
+
+    ``__startswith`` becomes ``LIKE 'x%'`` which SQLite will not serve from a
+    case-sensitive index; a half-open range works on every backend.
+    """
+    return {"key__gte": key, "key__lt": key + "\uffff"}
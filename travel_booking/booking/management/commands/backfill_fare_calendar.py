@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from booking.fares import rebuild_fare_calendar
+
+
+class Command(BaseCommand):
+    help = "Rebuild the FareDay fare calendar from the current departures."
+
+    def handle(self, *args, **options):
+        created = rebuild_fare_calendar()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} fare calendar days."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from booking.popular import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the hourly RouteBookingCounter rollup from existing Booking history."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per bulk insert")
+
+    def handle(self, *args, **options):
+        created = rebuild_counters(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} route counter buckets."))
@@ -0,0 +1,329 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import tempfile
+import threading
+import time as clock
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases
+from django.urls import reverse
+
+from booking.models import Booking, Location, TravelOption
+
+ENDPOINTS = ("travel_list", "flex_search", "suggest_locations", "connections", "create_booking", "cancel_booking")
+INTERFACES = ("wsgi", "asgi")
+BENCH_START_DATE = date(2030, 1, 1)
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class Worker(threading.Thread):
+    """Drives one endpoint with its own test client and DB connection.
+
+    As a thread (``start``) it goes through the WSGI handler; with an
+    AsyncClient, ``arun`` is one coroutine of many on the ASGI handler.
+    """
+
+    def __init__(self, endpoint, make_request, requests: int, seed: int, user=None, client_class=Client):
+        super().__init__(daemon=True)
+        self.endpoint = endpoint
+        self.make_request = make_request
+        self.requests = requests
+        self.rng = random.Random(seed)
+        self.client = client_class(raise_request_exception=False)
+        if user is not None:
+            self.client.force_login(user)
+        self.user = user
+        # Booking ids this worker may cancel (cancel_booking phase only)
+        self.pending = []
+        self.latencies = []
+        self.queries = []
+        self.errors = 0
+
+    def run(self):
+        try:
+            for _ in range(self.requests):
+                with CaptureQueriesContext(connection) as captured:
+                    started = clock.perf_counter()
+                    try:
+                        response = self.make_request(self)
+                    except Exception:
+                        failed = True
+                    else:
+                        if response is None:
+                            # Nothing left to do for this worker (e.g. no bookings to cancel)
+                            continue
+                        failed = response.status_code >= 500
+                    elapsed = clock.perf_counter() - started
+                self.latencies.append(elapsed)
+                self.queries.append(len(captured.captured_queries))
+                self.errors += failed
+        finally:
+            connection.close()
+
+    async def arun(self):
+        # Queries are not counted here: they run on asgiref's executor thread
+        for _ in range(self.requests):
+            started = clock.perf_counter()
+            try:
+                response = self.make_request(self)
+                if response is not None:
+                    response = await response
+            except Exception:
+                failed = True
+            else:
+                if response is None:
+                    continue
+                failed = response.status_code >= 500
+            self.latencies.append(clock.perf_counter() - started)
+            self.errors += failed
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database and load-test travel_list, flex_search, suggest_locations, connections, "
+        "create_booking and cancel_booking from concurrent workers over WSGI and/or ASGI; report throughput, latency "
+        "percentiles and SQL counts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--options", type=int, default=20000, help="TravelOption rows to seed")
+        parser.add_argument("--users", type=int, default=200, help="Seed users owning the background bookings")
+        parser.add_argument("--bookings", type=int, default=5000, help="Background bookings to seed")
+        parser.add_argument(
+            "--workers", type=int, default=8, help="Concurrent workers (threads, or coroutines on ASGI) per endpoint"
+        )
+        parser.add_argument("--requests", type=int, default=50, help="Requests per worker per endpoint")
+        parser.add_argument("--seed", type=int, default=1, help="Seed for data and request mix")
+        parser.add_argument(
+            "--endpoints", default=",".join(ENDPOINTS), help=f"Comma separated subset of {', '.join(ENDPOINTS)}"
+        )
+        parser.add_argument(
+            "--interface",
+            choices=(*INTERFACES, "both"),
+            default="wsgi",
+            help="Drive the WSGI handler from threads, the ASGI handler from coroutines, or both on one dataset",
+        )
+        parser.add_argument("--output", default="", help="Write results as JSON to this path")
+        parser.add_argument("--compare", default="", help="Previous JSON results to diff against")
+
+    def handle(self, *args, **options):
+        endpoints = [name.strip() for name in options["endpoints"].split(",") if name.strip()]
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+        # cancel_booking needs the bookings made by the create_booking phase
+        if "cancel_booking" in endpoints and "create_booking" not in endpoints:
+            endpoints.insert(endpoints.index("cancel_booking"), "create_booking")
+
+        setup_test_environment()
+        # Failed requests are counted in the report; keep their tracebacks off the console
+        logging.getLogger("django.request").setLevel(logging.CRITICAL)
+        db_file = None
+        if connection.vendor == "sqlite":
+            # Worker threads need a real file; the default in-memory test DB is per connection
+            handle, db_file = tempfile.mkstemp(suffix=".sqlite3", prefix="bench-")
+            os.close(handle)
+            connection.settings_dict["TEST"]["NAME"] = db_file
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            self._seed(options)
+            interfaces = INTERFACES if options["interface"] == "both" else (options["interface"],)
+            results = {}
+            for interface in interfaces:
+                results.update(self._run(endpoints, options, interface))
+        finally:
+            connections.close_all()
+            teardown_databases(old_config, verbosity=0)
+            if db_file and os.path.exists(db_file):
+                os.remove(db_file)
+
+        report = {
+            "config": {
+                key: options[key]
+                for key in ("options", "users", "bookings", "workers", "requests", "seed", "interface")
+            },
+            "database": connection.vendor,
+            "results": results,
+        }
+        self._print(results)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+        if options["compare"]:
+            self._compare(results, options["compare"])
+
+    def _seed(self, options):
+        started = clock.perf_counter()
+        call_command(
+            "seed_travel_options",
+            count=options["options"],
+            seed=options["seed"],
+            users=options["users"],
+            bookings=options["bookings"],
+            start_date=BENCH_START_DATE,
+            stdout=open(os.devnull, "w"),
+        )
+        self.option_ids = list(TravelOption.objects.values_list("pk", flat=True))
+        self.place_names = list(
+            Location.objects.filter(departures__isnull=False).distinct().values_list("name", flat=True)
+        )
+        self.workers = [
+            User.objects.create_user(username=f"bench_worker_{i}", password="benchpass123", email="")
+            for i in range(options["workers"])
+        ]
+        self.stdout.write(
+            f"Seeded {len(self.option_ids)} options in {clock.perf_counter() - started:.1f}s "
+            f"({connection.vendor})."
+        )
+
+    # Request mix per endpoint; each receives the worker and returns the response
+
+    def _travel_list(self, worker):
+        params = {}
+        roll = worker.rng.random()
+        if roll < 0.6:
+            params["source"] = worker.rng.choice(self.place_names)[: worker.rng.randint(2, 6)]
+        if roll < 0.3:
+            params["destination"] = worker.rng.choice(self.place_names)
+        if worker.rng.random() < 0.3:
+            params["date"] = BENCH_START_DATE.replace(day=worker.rng.randint(1, 28)).isoformat()
+        return worker.client.get(reverse("booking:travel_list"), params)
+
+    def _flex_search(self, worker):
+        # travel_list over date ± flex_days on one route
+        return worker.client.get(
+            reverse("booking:travel_list"),
+            {
+                "source": worker.rng.choice(self.place_names),
+                "destination": worker.rng.choice(self.place_names),
+                "date": BENCH_START_DATE.replace(day=worker.rng.randint(1, 28)).isoformat(),
+                "flex_days": worker.rng.randint(1, settings.SEARCH_FLEX_MAX_DAYS),
+            },
+        )
+
+    def _suggest_locations(self, worker):
+        name = worker.rng.choice(self.place_names)
+        return worker.client.get(
+            reverse("booking:suggest_locations"),
+            {"q": name[: worker.rng.randint(1, 4)], "field": worker.rng.choice(["", "source", "destination"])},
+        )
+
+    def _connections(self, worker):
+        return worker.client.get(
+            reverse("booking:connections_api"),
+            {
+                "source": worker.rng.choice(self.place_names),
+                "destination": worker.rng.choice(self.place_names),
+                "date": BENCH_START_DATE.replace(day=worker.rng.randint(1, 28)).isoformat(),
+                "max_legs": worker.rng.choice([2, 3]),
+                "sort": worker.rng.choice(["arrival", "price"]),
+            },
+        )
+
+    def _create_booking(self, worker):
+        travel_id = worker.rng.choice(self.option_ids)
+        return worker.client.post(
+            reverse("booking:create_booking", args=[travel_id]),
+            {"number_of_seats": 1, "passenger_payload": '[{"name": "Bench", "age": 30}]'},
+        )
+
+    def _cancel_booking(self, worker):
+        if not worker.pending:
+            return None
+        return worker.client.get(reverse("booking:cancel_booking", args=[worker.pending.pop()]))
+
+    async def _drive(self, workers):
+        await asyncio.gather(*(worker.arun() for worker in workers))
+        # The async ORM ran on asgiref's executor thread; release its connection there
+        await sync_to_async(connections.close_all)()
+
+    def _run(self, endpoints, options, interface: str = "wsgi"):
+        results = {}
+        for endpoint in endpoints:
+            make_request = getattr(self, f"_{endpoint}")
+            needs_user = endpoint in ("create_booking", "cancel_booking")
+            workers = [
+                Worker(
+                    endpoint,
+                    make_request,
+                    options["requests"],
+                    seed=options["seed"] * 1000 + i,
+                    user=self.workers[i] if needs_user else None,
+                    client_class=AsyncClient if interface == "asgi" else Client,
+                )
+                for i in range(options["workers"])
+            ]
+            if endpoint == "cancel_booking":
+                for worker in workers:
+                    worker.pending = list(
+                        Booking.objects.filter(user=worker.user, status=Booking.Status.CONFIRMED).values_list(
+                            "pk", flat=True
+                        )
+                    )
+            started = clock.perf_counter()
+            if interface == "asgi":
+                asyncio.run(self._drive(workers))
+            else:
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+            wall = clock.perf_counter() - started
+
+            latencies = sorted(latency for worker in workers for latency in worker.latencies)
+            queries = [count for worker in workers for count in worker.queries]
+            # WSGI rows keep the bare endpoint name so older --compare files still line up
+            results[endpoint if interface == "wsgi" else f"{endpoint}@{interface}"] = {
+                "requests": len(latencies),
+                "errors": sum(worker.errors for worker in workers),
+                "throughput_rps": round(len(latencies) / wall, 1) if wall else 0.0,
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                "queries_avg": round(sum(queries) / len(queries), 2) if queries else None,
+                "queries_max": max(queries, default=None),
+            }
+        return results
+
+    def _print(self, results):
+        header = f"{'endpoint':<24}{'reqs':>7}{'errs':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'SQL avg':>9}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for endpoint, r in results.items():
+            queries = "-" if r["queries_avg"] is None else r["queries_avg"]
+            self.stdout.write(
+                f"{endpoint:<24}{r['requests']:>7}{r['errors']:>6}{r['throughput_rps']:>9}"
+                f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{queries:>9}"
+            )
+
+    def _compare(self, results, path):
+        with open(path) as fh:
+            previous = json.load(fh)["results"]
+        self.stdout.write(f"Change vs {path}:")
+        for endpoint, r in results.items():
+            before = previous.get(endpoint)
+            if not before:
+                continue
+            changes = []
+            for key in ("throughput_rps", "p95_ms", "queries_avg"):
+                if before.get(key) and r[key] is not None:
+                    changes.append(f"{key} {100 * (r[key] - before[key]) / before[key]:+.1f}%")
+            self.stdout.write(f"  {endpoint:<24}" + ", ".join(changes))
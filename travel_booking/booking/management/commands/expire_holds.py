@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking.holds import expire_holds
+
+
+class Command(BaseCommand):
+    help = "Release seats from expired SeatHold rows, one UPDATE per departure."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Holds released per transaction")
+        parser.add_argument("--interval", type=float, default=30.0, help="Seconds between sweeps")
+        parser.add_argument("--once", action="store_true", help="Sweep what has lapsed now and exit")
+
+    def handle(self, *args, **options):
+        batch_size: int = options["batch_size"]
+        total_holds = total_seats = 0
+        try:
+            while True:
+                holds, seats = expire_holds(batch_size=batch_size)
+                total_holds += holds
+                total_seats += seats
+                if holds:
+                    self.stdout.write(f"Expired {holds} holds, released {seats} seats.")
+                if holds < batch_size:
+                    if options["once"]:
+                        break
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Expired {total_holds} holds, released {total_seats} seats."))
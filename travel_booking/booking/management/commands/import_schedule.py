@@ -0,0 +1,54 @@
+import sys
+import time as clock
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.schedule_import import FEED_FORMATS, import_schedule
+
+
+class Command(BaseCommand):
+    help = (
+        "Upsert an operator timetable feed (CSV or NDJSON) into TravelOption on "
+        "(type, source, destination, departure_date, departure_time)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Feed file, or - for stdin")
+        parser.add_argument(
+            "--format", choices=FEED_FORMATS, default=None, help="Feed format (default: from the file extension)"
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Rows validated and written per transaction")
+
+    def handle(self, *args, **options):
+        path: str = options["path"]
+        fmt = options["format"] or Path(path).suffix.lstrip(".").lower()
+        if fmt == "jsonl":
+            fmt = "ndjson"
+        if fmt not in FEED_FORMATS:
+            raise CommandError("Cannot tell the feed format; pass --format csv or --format ndjson.")
+        if options["chunk_size"] <= 0:
+            raise CommandError("--chunk-size must be positive.")
+
+        started = clock.perf_counter()
+        if path == "-":
+            report = import_schedule(sys.stdin, fmt, chunk_size=options["chunk_size"])
+        else:
+            try:
+                # utf-8-sig drops the BOM spreadsheet exports like to add
+                with open(path, newline="", encoding="utf-8-sig") as stream:
+                    report = import_schedule(stream, fmt, chunk_size=options["chunk_size"])
+            except OSError as exc:
+                raise CommandError(f"Cannot read {path}: {exc}")
+
+        for line, message in report.errors:
+            self.stderr.write(f"line {line}: {message}")
+        if report.rejected > len(report.errors):
+            self.stderr.write(f"... and {report.rejected - len(report.errors)} more rejected rows")
+        elapsed = clock.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Inserted {report.inserted}, updated {report.updated}, rejected {report.rejected} "
+                f"in {elapsed:.1f}s."
+            )
+        )
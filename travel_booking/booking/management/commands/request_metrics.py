@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from booking.instrumentation import read_snapshots, snapshot_dir, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        "Report per-view request timing, SQL counts and duplicate queries collected by "
+        "REQUEST_METRICS_ENABLED, merged across every process that published a snapshot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+        parser.add_argument("--sort", default="p95_ms", help="Column to sort the table by (descending)")
+        parser.add_argument("--reset", action="store_true", help="Delete the published snapshots after reporting")
+
+    def handle(self, *args, **options):
+        summary = summarize(read_snapshots())
+        if options["json"]:
+            self.stdout.write(json.dumps(summary, indent=2))
+        elif not summary:
+            self.stdout.write(f"No request metrics in {snapshot_dir()} (is REQUEST_METRICS_ENABLED set?).")
+        else:
+            self._print(summary, options["sort"])
+        if options["reset"]:
+            for path in snapshot_dir().glob("*.json"):
+                path.unlink(missing_ok=True)
+            self.stdout.write("Snapshots cleared.")
+
+    def _print(self, summary: dict, sort_key: str):
+        header = (
+            f"{'view':<40}{'reqs':>7}{'avg ms':>9}{'p95 ms':>9}{'SQL avg':>9}"
+            f"{'SQL ms':>9}{'tpl ms':>9}{'lock ms':>9}{'dupes':>7}"
+        )
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        # A None percentile means the open-ended top bucket
+        rows = sorted(
+            summary.items(),
+            key=lambda item: float("inf") if item[1].get(sort_key, 0) is None else item[1].get(sort_key, 0),
+            reverse=True,
+        )
+        for view, r in rows:
+            p95 = r["p95_ms"] if r["p95_ms"] is not None else ">5000"
+            self.stdout.write(
+                f"{view[:39]:<40}{r['requests']:>7}{r['avg_ms']:>9}{p95:>9}{r['avg_queries']:>9}"
+                f"{r['avg_sql_ms']:>9}{r['avg_template_ms']:>9}{r['avg_lock_wait_ms']:>9}{r['duplicate_queries']:>7}"
+            )
+        for view, r in rows:
+            if r["worst_duplicate"]:
+                self.stdout.write(f"Repeated SQL in {view}: {r['worst_duplicate']}")
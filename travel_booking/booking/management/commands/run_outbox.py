@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued booking emails in batches over a reused SMTP connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Emails per SMTP connection")
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds to sleep when the outbox is empty")
+        parser.add_argument("--max-attempts", type=int, default=None, help="Give up on an email after this many tries")
+        parser.add_argument("--once", action="store_true", help="Drain what is due now and exit")
+
+    def handle(self, *args, **options):
+        batch_size: int = options["batch_size"]
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = drain_outbox(batch_size=batch_size, max_attempts=options["max_attempts"])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent}, failed {failed}.")
+                if sent + failed < batch_size:
+                    if options["once"]:
+                        break
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Outbox drained: {total_sent} sent, {total_failed} failed."))
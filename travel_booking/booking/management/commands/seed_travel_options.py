@@ -1,26 +1,126 @@
 import random
+import time as clock
 from datetime import date, timedelta, time
+from decimal import Decimal
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
 
-from booking.models import TravelOption
+from accounts.models import Profile
+from booking.connections import invalidate_graph
+from booking.fares import rebuild_fare_calendar
+from booking.models import Booking, Location, SeatHold, TravelOption, departure_moment, start_of_day
+from booking.popular import rebuild_counters
+from booking.search_cache import bump_all
+from booking.suggest import invalidate_index
+
+SEED_USER_PREFIX = "seed_user_"
+# SQLite page cache while seeding; random-order index inserts thrash the default 2 MB
+SQLITE_SEED_CACHE_KIB = 256 * 1024
+# Journey times in minutes per travel type (start, stop, step)
+DURATION_MINUTES = {"Flight": (60, 241, 5), "Train": (180, 1201, 15), "Bus": (120, 901, 15)}
+
+TRAVEL_OPTION_FIELDS = (
+    "id",
+    "type",
+    "source",
+    "destination",
+    "source_location",
+    "destination_location",
+    "departure_date",
+    "departure_time",
+    "departure_at",
+    "duration",
+    "price",
+    "available_seats",
+    "created_at",
+    "updated_at",
+)
+BOOKING_FIELDS = (
+    "user",
+    "travel_option",
+    "number_of_seats",
+    "primary_passenger_name",
+    "primary_passenger_age",
+    "passenger_details",
+    "unit_price",
+    "total_price",
+    "booking_date",
+    "status",
+)
+
+
+class KeySpace:
+    """Packs a seed departure's natural key into one int (cheap to hold a million in a set)."""
+
+    def __init__(self, types: list, cities: list, dates: list, times: list):
+        self.types = {name: i for i, name in enumerate(types)}
+        self.cities = {name: i for i, name in enumerate(cities)}
+        self.dates = {d: i for i, d in enumerate(dates)}
+        self.times = {t: i for i, t in enumerate(times)}
+        self.size = len(types) * len(cities) * (len(cities) - 1) * len(dates) * len(times)
+
+    def pack(self, travel_type: str, source: str, destination: str, day: int, slot: int) -> int:
+        key = self.types[travel_type]
+        key = key * len(self.cities) + self.cities[source]
+        key = key * len(self.cities) + self.cities[destination]
+        key = key * len(self.dates) + day
+        return key * len(self.times) + slot
+
+    def existing(self) -> set:
+        """Keys of rows already in the table that fall inside this key space."""
+        rows = TravelOption.objects.filter(
+            departure_at__gte=start_of_day(min(self.dates)),
+            departure_at__lt=start_of_day(max(self.dates) + timedelta(days=1)),
+        ).values_list("type", "source", "destination", "departure_date", "departure_time")
+        taken = set()
+        for travel_type, source, destination, day, slot in rows.iterator(chunk_size=10000):
+            if travel_type in self.types and source in self.cities and destination in self.cities:
+                if slot in self.times:
+                    taken.add(self.pack(travel_type, source, destination, self.dates[day], self.times[slot]))
+        return taken
 
 
 class Command(BaseCommand):
-    help = "Seed the database with many TravelOption entries (India-heavy)."
+    help = "Seed the database with many TravelOption entries (India-heavy), plus optional users and bookings."
 
     def add_arguments(self, parser):
         parser.add_argument("--count", type=int, default=75, help="How many rows to add")
         parser.add_argument(
             "--clear", action="store_true", help="Delete existing TravelOption entries first"
         )
+        parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible output")
+        parser.add_argument(
+            "--start-date",
+            type=date.fromisoformat,
+            default=None,
+            help="First departure date (YYYY-MM-DD); defaults to 30 days from today",
+        )
+        parser.add_argument("--batch-size", type=int, default=50000, help="Rows per insert batch/transaction")
+        parser.add_argument("--users", type=int, default=0, help="How many seed users to create")
+        parser.add_argument(
+            "--bookings", type=int, default=0, help="Roughly how many confirmed bookings to create"
+        )
 
     def handle(self, *args, **options):
         count: int = options["count"]
         clear: bool = options["clear"]
+        batch_size: int = options["batch_size"]
+        if batch_size <= 0:
+            raise CommandError("--batch-size must be positive.")
+        rng = random.Random(options["seed"])
 
         if clear:
-            TravelOption.objects.all().delete()
+            # Raw deletes, dependents first: a model delete() would load every row for the
+            # post_delete receivers and queue per-row hooks. The search cache, suggestion
+            # index, connection graph and fare calendar are reset once at the end instead
+            for model in (SeatHold, Booking, TravelOption):
+                model.objects.all()._raw_delete(connection.alias)
 
         indian_cities = [
             "Delhi",
@@ -76,32 +176,199 @@ class Command(BaseCommand):
         types = ["Flight", "Train", "Bus"]
 
         all_cities = indian_cities * 3 + other_cities  # weight towards India
+        # Rows bypass TravelOption.save(), so resolve every place once up front
+        location_ids = {name: Location.objects.resolve(name).pk for name in set(all_cities)}
+
+        user_ids = self._create_users(options["users"], batch_size) if options["users"] else []
+        bookings_wanted: int = options["bookings"]
+        if bookings_wanted and not user_ids:
+            user_ids = list(User.objects.values_list("pk", flat=True))
+            if not user_ids:
+                raise CommandError("--bookings needs users; pass --users N or create some first.")
+        bookings_per_option = bookings_wanted / count if count else 0
+
+        base_date = options["start_date"] or date.today() + timedelta(days=30)
+        raw_dates = [base_date + timedelta(days=n) for n in range(91)]
+        raw_times = [time(hour=h, minute=0) for h in [6, 8, 9, 10, 12, 14, 16, 18, 21]]
+        # Rows go straight to executemany, so adapt every low-cardinality value once here
+        ops = connection.ops
+        now = ops.adapt_datetimefield_value(timezone.now())
+        dates = [ops.adapt_datefield_value(d) for d in raw_dates]
+        times = [ops.adapt_timefield_value(t) for t in raw_times]
+        moments = [
+            [ops.adapt_datetimefield_value(departure_moment(d, t)) for t in raw_times] for d in raw_dates
+        ]
+        duration_field = TravelOption._meta.get_field("duration")
+        durations = {
+            travel_type: [
+                duration_field.get_db_prep_value(timedelta(minutes=minutes), connection)
+                for minutes in range(*DURATION_MINUTES[travel_type])
+            ]
+            for travel_type in types
+        }
+        # Own generator, so adding durations left the rest of a --seed's output unchanged
+        duration_rng = random.Random(f"{options['seed']}:durations")
+
+        # (type, source, destination, date, time) is unique; track used keys as packed ints
+        cities = sorted(set(all_cities))
+        key_space = KeySpace(types, cities, raw_dates, raw_times)
+        taken = set() if clear else key_space.existing()
+        free = key_space.size - len(taken)
+        if count > free:
+            raise CommandError(f"Only {free} unused (type, route, date, time) combinations left for --count.")
+        confirmed = Booking.Status.CONFIRMED.value
+        # Explicit ids let bookings for a departure be generated in the same pass
+        first_pk = (TravelOption.objects.order_by("-pk").values_list("pk", flat=True).first() or 0) + 1
+
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute(f"PRAGMA cache_size = -{SQLITE_SEED_CACHE_KIB}")
+
+        self.started = clock.perf_counter()
+        created = booked = 0
+        option_rows, booking_rows = [], []
+        for pk in range(first_pk, first_pk + count):
+            key = None
+            # Redraw departures that would repeat a natural key
+            while key is None or key in taken:
+                src = dst = None
+                # ensure source and destination differ
+                while not src or src == dst:
+                    src = rng.choice(all_cities)
+                    dst = rng.choice(all_cities)
 
-        base_date = date.today() + timedelta(days=30)
-        created = 0
-        for i in range(count):
-            src = dst = None
-            # ensure source and destination differ
-            while not src or src == dst:
-                src = random.choice(all_cities)
-                dst = random.choice(all_cities)
-
-            d = base_date + timedelta(days=random.randint(0, 90))
-            t = time(hour=random.choice([6, 8, 9, 10, 12, 14, 16, 18, 21]), minute=0)
-            price = round(random.uniform(10, 299.99), 2)
-            seats = random.choice([40, 50, 60, 80, 120])
-
-            TravelOption.objects.create(
-                type=random.choice(types),
-                source=src,
-                destination=dst,
-                departure_date=d,
-                departure_time=t,
-                price=price,
-                available_seats=seats,
+                day = rng.choice(range(len(dates)))
+                slot = rng.choice(range(len(times)))
+                price = Decimal(round(rng.uniform(10, 299.99), 2)).quantize(Decimal("0.01"))
+                seats = rng.choice([40, 50, 60, 80, 120])
+                travel_type = rng.choice(types)
+                key = key_space.pack(travel_type, src, dst, day, slot)
+            taken.add(key)
+            d = dates[day]
+            t = times[slot]
+
+            n_bookings = int(bookings_per_option) + (rng.random() < bookings_per_option % 1)
+            for _ in range(n_bookings):
+                booking_seats = rng.randint(1, 4)
+                if booking_seats > seats:
+                    break
+                seats -= booking_seats
+                passengers = [{"name": f"Passenger {n + 1}", "age": rng.randint(1, 90)} for n in range(booking_seats)]
+                booking_rows.append(
+                    (
+                        rng.choice(user_ids),
+                        pk,
+                        booking_seats,
+                        passengers[0]["name"],
+                        passengers[0]["age"],
+                        ops.adapt_json_value(passengers, None),
+                        ops.adapt_decimalfield_value(price, 10, 2),
+                        ops.adapt_decimalfield_value(booking_seats * price, 10, 2),
+                        now,
+                        confirmed,
+                    )
+                )
+
+            option_rows.append(
+                (
+                    pk,
+                    travel_type,
+                    src,
+                    dst,
+                    location_ids[src],
+                    location_ids[dst],
+                    d,
+                    t,
+                    moments[day][slot],
+                    duration_rng.choice(durations[travel_type]),
+                    ops.adapt_decimalfield_value(price, 10, 2),
+                    seats,
+                    now,
+                    now,
+                )
             )
-            created += 1
+            if len(option_rows) >= batch_size:
+                created, booked = self._flush(option_rows, booking_rows, created, booked)
+
+        if option_rows:
+            created, booked = self._flush(option_rows, booking_rows, created, booked)
+        # Explicit ids leave sequence-backed backends (PostgreSQL) behind; catch them up
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [TravelOption]):
+                cursor.execute(sql)
 
+        invalidate_index()
+        bump_all()
+        invalidate_graph()
+        # Raw inserts skip the model hooks that keep the fare calendar current
+        rebuild_fare_calendar()
+        if booked:
+            rebuild_counters(batch_size=batch_size)
+        elapsed = clock.perf_counter() - self.started
         self.stdout.write(self.style.SUCCESS(f"Created {created} travel options."))
+        if booked:
+            self.stdout.write(self.style.SUCCESS(f"Created {booked} bookings."))
+        self.stdout.write(f"Finished in {elapsed:.1f}s ({(created + booked) / max(elapsed, 1e-9):,.0f} rows/s).")
 
+    def _flush(self, option_rows: list, booking_rows: list, created: int, booked: int) -> tuple:
+        with transaction.atomic():
+            self._insert_rows(TravelOption, TRAVEL_OPTION_FIELDS, option_rows)
+            self._insert_rows(Booking, BOOKING_FIELDS, booking_rows)
+        created += len(option_rows)
+        booked += len(booking_rows)
+        option_rows.clear()
+        booking_rows.clear()
+        elapsed = clock.perf_counter() - self.started
+        self.stdout.write(
+            f"  {created} travel options, {booked} bookings, {(created + booked) / elapsed:,.0f} rows/s"
+        )
+        return created, booked
+
+    def _insert_rows(self, model, field_names: tuple, rows: list) -> None:
+        """INSERT already-adapted ``rows`` (ordered like ``field_names``) with one executemany.
+
+        bulk_create re-prepares every field of every instance, which caps it
+        at a few thousand rows/s; million-row seeds need the raw path.
+        """
+        if not rows:
+            return
+        opts = model._meta
+        quote = connection.ops.quote_name
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            quote(opts.db_table),
+            ", ".join(quote(opts.get_field(name).column) for name in field_names),
+            ", ".join(["%s"] * len(field_names)),
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+
+    def _insert_objects(self, model, objects, batch_size: int, label: str) -> int:
+        done = 0
+        started = clock.perf_counter()
+        while True:
+            batch = list(islice(objects, batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                model.objects.bulk_create(batch, batch_size=batch_size)
+            done += len(batch)
+            elapsed = clock.perf_counter() - started
+            self.stdout.write(f"  {label}: {done} rows, {done / elapsed:,.0f} rows/s")
+        return done
 
+    def _create_users(self, count: int, batch_size: int) -> list:
+        # Hashing is deliberately slow; every seed user shares one hash
+        password = make_password("seedpass123")
+        existing = User.objects.filter(username__startswith=SEED_USER_PREFIX).count()
+        names = (f"{SEED_USER_PREFIX}{existing + i}" for i in range(count))
+        users = (User(username=name, email=f"{name}@example.com", password=password) for name in names)
+        self._insert_objects(User, users, batch_size, "users")
+        user_ids = list(
+            User.objects.filter(username__startswith=SEED_USER_PREFIX)
+            .order_by("pk")
+            .values_list("pk", flat=True)[existing:]
+        )
+        # post_save does not fire for bulk_create, so add the profiles here
+        self._insert_objects(Profile, (Profile(user_id=pk) for pk in user_ids), batch_size, "profiles")
+        self.stdout.write(self.style.SUCCESS(f"Created {len(user_ids)} users."))
+        return user_ids
@@ -0,0 +1,177 @@
+import json
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import time as clock
+from datetime import date, time
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Sum
+from django.test import Client
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases
+from django.urls import reverse
+
+from booking.models import Booking, TravelOption
+
+TRANSACTION_MODES = ("IMMEDIATE", "DEFERRED")
+
+
+def _book(job: dict) -> dict:
+    """One booking process: POST create_booking ``job["attempts"]`` times as its own user."""
+    # Spawned processes load settings afresh; point them at the throwaway database
+    setup_test_environment()
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+    settings_dict = connections["default"].settings_dict
+    settings_dict["NAME"] = job["database"]
+    settings_dict["OPTIONS"]["transaction_mode"] = job["transaction_mode"]
+
+    rng = random.Random(job["seed"])
+    client = Client(raise_request_exception=False)
+    client.force_login(User.objects.get(pk=job["user_id"]))
+    outcome = {"booked": 0, "seats": 0, "cancelled": 0, "rejected": 0, "errors": 0}
+    # Wall-clock bounds of the booking loop, so process start-up is not timed
+    started = clock.time()
+    for _ in range(job["attempts"]):
+        seats = rng.randint(1, 3)
+        response = client.post(
+            reverse("booking:create_booking", args=[rng.choice(job["option_ids"])]),
+            {
+                "number_of_seats": seats,
+                "passenger_payload": json.dumps([{"name": "Stress", "age": 30}] * seats),
+            },
+        )
+        if response.status_code == 302:
+            outcome["booked"] += 1
+            outcome["seats"] += seats
+            # Cancelling reads the booking before writing: the lock upgrade DEFERRED can not wait for
+            if rng.random() < job["cancel_rate"]:
+                booking = Booking.objects.filter(user_id=job["user_id"]).latest("pk")
+                response = client.get(reverse("booking:cancel_booking", args=[booking.pk]))
+                if response.status_code == 302:
+                    outcome["cancelled"] += 1
+                    outcome["seats"] -= seats
+                else:
+                    outcome["errors"] += 1
+        elif response.status_code >= 500:
+            outcome["errors"] += 1
+        else:
+            # Sold out: the form is shown again with an error
+            outcome["rejected"] += 1
+    outcome["window"] = (started, clock.time())
+    connections.close_all()
+    return outcome
+
+
+class Command(BaseCommand):
+    help = (
+        "Book the same few departures from many processes against a throwaway database, then "
+        "check no departure was oversold and report bookings/sec and failed requests (cancellations included)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=4, help="Concurrent booking processes")
+        parser.add_argument("--attempts", type=int, default=100, help="Booking attempts per process")
+        parser.add_argument("--departures", type=int, default=3, help="Departures everybody competes for")
+        parser.add_argument("--seats", type=int, default=150, help="Seats per departure")
+        parser.add_argument("--cancel-rate", type=float, default=0.3, help="Share of bookings cancelled right away")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--transaction-mode",
+            choices=TRANSACTION_MODES,
+            default=None,
+            help="Override the SQLite transaction mode (DEFERRED shows what IMMEDIATE prevents)",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("stress_bookings exercises the SQLite locking mode; DATABASES must use SQLite.")
+        settings_dict = connection.settings_dict
+        transaction_mode = options["transaction_mode"] or settings_dict["OPTIONS"].get("transaction_mode")
+
+        setup_test_environment()
+        handle, db_file = tempfile.mkstemp(suffix=".sqlite3", prefix="stress-")
+        os.close(handle)
+        settings_dict["TEST"]["NAME"] = db_file
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            jobs = self._seed(options, db_file, transaction_mode)
+            journal_mode = connection.cursor().execute("PRAGMA journal_mode").fetchone()[0]
+            connections.close_all()
+            # Spawned, not forked: no inherited SQLite handles. django.setup runs before
+            # the first job is unpickled (which imports this module and the models)
+            with multiprocessing.get_context("spawn").Pool(options["processes"], initializer=django.setup) as pool:
+                outcomes = pool.map(_book, jobs)
+            oversold = self._check(options, outcomes)
+        finally:
+            connections.close_all()
+            teardown_databases(old_config, verbosity=0)
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db_file + suffix):
+                    os.remove(db_file + suffix)
+
+        windows = [outcome.pop("window") for outcome in outcomes]
+        elapsed = max(end for _, end in windows) - min(start for start, _ in windows)
+        totals = {key: sum(outcome[key] for outcome in outcomes) for key in outcomes[0]}
+        requests = totals["booked"] + totals["cancelled"] + totals["rejected"] + totals["errors"]
+        self.stdout.write(
+            f"journal_mode={journal_mode} transaction_mode={transaction_mode or 'DEFERRED'} "
+            f"busy_timeout={settings_dict['OPTIONS'].get('timeout', 5)}s processes={options['processes']}"
+        )
+        self.stdout.write(
+            f"{totals['booked']} bookings, {totals['cancelled']} cancelled ({totals['seats']} seats held), "
+            f"{totals['rejected']} sold out, "
+            f"{totals['errors']} failed requests in {elapsed:.1f}s: "
+            f"{totals['booked'] / elapsed:.1f} bookings/s, {requests / elapsed:.1f} requests/s"
+        )
+        if oversold:
+            raise CommandError("Oversold: " + "; ".join(oversold))
+        self.stdout.write(self.style.SUCCESS("No departure was oversold."))
+
+    def _seed(self, options, db_file: str, transaction_mode) -> list:
+        option_ids = [
+            TravelOption.objects.create(
+                type="Bus",
+                source="Stress Town",
+                destination=f"Stress City {i}",
+                departure_date=date(2030, 1, 1),
+                departure_time=time(8, 0),
+                price=10,
+                available_seats=options["seats"],
+            ).pk
+            for i in range(options["departures"])
+        ]
+        return [
+            {
+                "database": db_file,
+                "transaction_mode": transaction_mode,
+                "user_id": User.objects.create_user(username=f"stress_{i}", password="stresspass123").pk,
+                "option_ids": option_ids,
+                "attempts": options["attempts"],
+                "cancel_rate": options["cancel_rate"],
+                "seed": options["seed"] * 1000 + i,
+            }
+            for i in range(options["processes"])
+        ]
+
+    def _check(self, options, outcomes) -> list:
+        """Seats left + seats in confirmed bookings must equal capacity on every departure."""
+        problems = []
+        booked = dict(
+            Booking.objects.filter(status=Booking.Status.CONFIRMED)
+            .values_list("travel_option")
+            .annotate(seats=Sum("number_of_seats"))
+            .order_by()
+        )
+        for option in TravelOption.objects.all():
+            sold = booked.get(option.pk, 0)
+            if option.available_seats < 0 or option.available_seats + sold != options["seats"]:
+                problems.append(f"{option}: {sold} seats booked, {option.available_seats} left of {options['seats']}")
+        reported = sum(outcome["seats"] for outcome in outcomes)
+        if reported != sum(booked.values()):
+            problems.append(f"{reported} seats confirmed to clients but {sum(booked.values())} stored")
+        return problems
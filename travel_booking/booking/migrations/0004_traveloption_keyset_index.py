@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("booking", "0003_booking_passenger_details"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="traveloption",
+            index=models.Index(
+                fields=["departure_date", "departure_time", "id"],
+                name="travel_departure_keyset_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+from booking.locations import DEFAULT_ALIASES, normalize_location
+
+
+def backfill_locations(apps, schema_editor):
+    Location = apps.get_model("booking", "Location")
+    LocationAlias = apps.get_model("booking", "LocationAlias")
+    TravelOption = apps.get_model("booking", "TravelOption")
+
+    by_key = {}
+
+    def get_location(name):
+        key = normalize_location(name)
+        if key not in by_key:
+            by_key[key], _ = Location.objects.get_or_create(key=key, defaults={"name": name.strip()})
+        return by_key[key]
+
+    for alias, canonical in DEFAULT_ALIASES.items():
+        location = get_location(canonical)
+        alias_key = normalize_location(alias)
+        LocationAlias.objects.get_or_create(key=alias_key, defaults={"name": alias, "location": location})
+        by_key[alias_key] = location
+
+    names = set(TravelOption.objects.values_list("source", flat=True))
+    names |= set(TravelOption.objects.values_list("destination", flat=True))
+    for name in names:
+        location = get_location(name)
+        # One UPDATE per distinct free-text value rather than per row
+        TravelOption.objects.filter(source=name).update(source_location=location, source=location.name)
+        TravelOption.objects.filter(destination=name).update(
+            destination_location=location, destination=location.name
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("booking", "0005_location"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_locations, migrations.RunPython.noop),
+    ]
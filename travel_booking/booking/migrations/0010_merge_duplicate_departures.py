@@ -0,0 +1,44 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+NATURAL_KEY = ("type", "source", "destination", "departure_date", "departure_time")
+
+
+def merge_duplicate_departures(apps, schema_editor):
+    """Fold departures sharing a natural key into the oldest row.
+
+    Bookings and holds move to the survivor and the duplicates' remaining
+    seats are added to it, so no booking or unsold seat is lost.
+    """
+    TravelOption = apps.get_model("booking", "TravelOption")
+    Booking = apps.get_model("booking", "Booking")
+    SeatHold = apps.get_model("booking", "SeatHold")
+
+    groups = (
+        TravelOption.objects.values(*NATURAL_KEY)
+        .annotate(n=Count("id"), keep=Min("id"))
+        .filter(n__gt=1)
+        .order_by()
+    )
+    for group in groups.iterator():
+        key = {name: group[name] for name in NATURAL_KEY}
+        duplicates = list(
+            TravelOption.objects.filter(**key).exclude(pk=group["keep"]).values_list("pk", "available_seats")
+        )
+        duplicate_ids = [pk for pk, _ in duplicates]
+        Booking.objects.filter(travel_option_id__in=duplicate_ids).update(travel_option_id=group["keep"])
+        SeatHold.objects.filter(travel_option_id__in=duplicate_ids).update(travel_option_id=group["keep"])
+        TravelOption.objects.filter(pk=group["keep"]).update(
+            available_seats=models.F("available_seats") + sum(seats for _, seats in duplicates)
+        )
+        TravelOption.objects.filter(pk__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("booking", "0009_seathold"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_departures, migrations.RunPython.noop),
+    ]
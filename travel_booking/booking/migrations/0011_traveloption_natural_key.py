@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Separate from the merge so PostgreSQL does not alter the table with
+    # deferred FK checks from the re-pointed bookings still pending
+    dependencies = [
+        ("booking", "0010_merge_duplicate_departures"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="traveloption",
+            constraint=models.UniqueConstraint(
+                fields=("type", "source", "destination", "departure_date", "departure_time"),
+                name="travel_natural_key_unique",
+            ),
+        ),
+    ]
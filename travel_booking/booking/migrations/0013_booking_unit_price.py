@@ -0,0 +1,40 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery
+
+
+def snapshot_unit_price(apps, schema_editor):
+    Booking = apps.get_model("booking", "Booking")
+    TravelOption = apps.get_model("booking", "TravelOption")
+    # The stored total is what the customer was charged; recover the per-seat fare from it
+    Booking.objects.filter(number_of_seats__gt=0).update(
+        unit_price=ExpressionWrapper(
+            F("total_price") / F("number_of_seats"),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+    )
+    Booking.objects.filter(unit_price__isnull=True).update(
+        unit_price=Subquery(TravelOption.objects.filter(pk=OuterRef("travel_option_id")).values("price")[:1])
+    )
+    Booking.objects.filter(unit_price__isnull=True).update(unit_price=Decimal("0.00"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("booking", "0012_booking_history_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="booking",
+            name="unit_price",
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(snapshot_unit_price, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="booking",
+            name="unit_price",
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+    ]
@@ -0,0 +1,88 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def backfill_fare_days(apps, schema_editor):
+    TravelOption = apps.get_model("booking", "TravelOption")
+    FareDay = apps.get_model("booking", "FareDay")
+    rows = (
+        TravelOption.objects.filter(source_location__isnull=False, destination_location__isnull=False)
+        .values("type", "source_location_id", "destination_location_id", "departure_date")
+        .annotate(min_price=Min("price"), departures=Count("id"), seats_left=Sum("available_seats"))
+        .order_by()
+    )
+    FareDay.objects.bulk_create(
+        (
+            FareDay(
+                type=row["type"],
+                source_location_id=row["source_location_id"],
+                destination_location_id=row["destination_location_id"],
+                date=row["departure_date"],
+                min_price=row["min_price"],
+                departures=row["departures"],
+                seats_left=row["seats_left"],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("booking", "0013_booking_unit_price"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FareDay",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "type",
+                    models.CharField(
+                        choices=[("Flight", "Flight"), ("Train", "Train"), ("Bus", "Bus")],
+                        max_length=10,
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("min_price", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("departures", models.PositiveIntegerField()),
+                ("seats_left", models.IntegerField()),
+                (
+                    "destination_location",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="booking.location",
+                    ),
+                ),
+                (
+                    "source_location",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="booking.location",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("source_location", "destination_location", "date", "type"),
+                        name="fare_day_unique",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_fare_days, migrations.RunPython.noop),
+    ]
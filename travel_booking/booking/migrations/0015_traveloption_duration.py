@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("booking", "0014_fare_day"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="traveloption",
+            name="duration",
+            field=models.DurationField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("booking", "0015_traveloption_duration"),
+    ]
+
+    operations = [
+        # Superseded by travel_route_time_idx, which starts with the same columns
+        migrations.RemoveIndex(
+            model_name="traveloption",
+            name="travel_route_date_idx",
+        ),
+        migrations.AddIndex(
+            model_name="traveloption",
+            index=models.Index(
+                fields=["source_location", "destination_location", "departure_date", "departure_time"],
+                name="travel_route_time_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="traveloption",
+            index=models.Index(
+                fields=["source_location", "destination_location", "departure_date", "price"],
+                name="travel_route_price_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_departure_at(apps, schema_editor):
+    TravelOption = apps.get_model("booking", "TravelOption")
+    zone = timezone.get_default_timezone()
+    batch = []
+    rows = TravelOption.objects.only("departure_date", "departure_time").order_by("pk")
+    for option in rows.iterator(chunk_size=2000):
+        option.departure_at = timezone.make_aware(datetime.combine(option.departure_date, option.departure_time), zone)
+        batch.append(option)
+        if len(batch) >= 2000:
+            TravelOption.objects.bulk_update(batch, ["departure_at"])
+            batch = []
+    TravelOption.objects.bulk_update(batch, ["departure_at"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("booking", "0016_traveloption_facet_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="traveloption",
+            name="departure_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_departure_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="traveloption",
+            name="departure_at",
+            field=models.DateTimeField(editable=False),
+        ),
+        # Listing order and date ranges move to departure_at
+        migrations.RemoveIndex(
+            model_name="traveloption",
+            name="travel_departure_keyset_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="traveloption",
+            name="travel_route_time_idx",
+        ),
+        migrations.AddIndex(
+            model_name="traveloption",
+            index=models.Index(fields=["departure_at", "id"], name="travel_departure_at_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="traveloption",
+            index=models.Index(
+                fields=["source_location", "destination_location", "departure_at"],
+                name="travel_route_departure_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("booking", "0017_traveloption_departure_at"),
+    ]
+
+    operations = [
+        # Seats left are summed from the departures when the calendar is read
+        migrations.RemoveField(
+            model_name="fareday",
+            name="seats_left",
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("booking", "0018_remove_fareday_seats_left"),
+    ]
+
+    operations = [
+        # Every history tab filters on status, so booking_user_status_idx serves them all
+        migrations.RemoveIndex(
+            model_name="booking",
+            name="booking_user_recent_idx",
+        ),
+    ]
@@ -1,5 +1,99 @@
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .locations import normalize_location, prefix_range
+
+
+def departure_moment(day, moment) -> datetime:
+    """The aware datetime of a departure's local date and time (in TIME_ZONE)."""
+    return timezone.make_aware(datetime.combine(day, moment), timezone.get_default_timezone())
+
+
+def start_of_day(day) -> datetime:
+    return departure_moment(day, datetime.min.time())
+
+
+class LocationQuerySet(models.QuerySet):
+    def get_by_natural_key(self, key: str):
+        return self.get(key=key)
+
+    def resolve(self, name: str):
+        """Return the Location for ``name`` (or one of its aliases), creating it if unknown."""
+        key = normalize_location(name)
+        if not key:
+            # An empty key would merge every such name into one place
+            raise ValidationError(f"{name!r} is not a place name.")
+        alias = LocationAlias.objects.filter(key=key).select_related("location").first()
+        if alias:
+            return alias.location
+        location, _ = self.get_or_create(key=key, defaults={"name": name.strip()})
+        return location
+
+    def matching(self, term: str, prefix: bool = True):
+        """Ids of locations whose name or alias matches ``term``, as a subquery."""
+        key = normalize_location(term)
+        lookup = prefix_range(key) if prefix else {"key": key}
+        alias_ids = LocationAlias.objects.filter(**lookup).values("location_id")
+        return self.filter(models.Q(**lookup) | models.Q(pk__in=alias_ids)).values("pk")
+
+
+class Location(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    # Lowercase, ASCII-folded form of name used for all lookups (see normalize_location)
+    key = models.CharField(max_length=100, unique=True)
+
+    objects = LocationQuerySet.as_manager()
+
+    def __str__(self) -> str:
+        return self.name
+
+    def natural_key(self):
+        return (self.key,)
+
+    def save(self, *args, **kwargs):
+        self.key = normalize_location(self.name)
+        super().save(*args, **kwargs)
+
+
+class LocationAlias(models.Model):
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name="aliases")
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        verbose_name_plural = "location aliases"
+
+    def __str__(self) -> str:
+        return f"{self.name} -> {self.location}"
+
+    def save(self, *args, **kwargs):
+        self.key = normalize_location(self.name)
+        super().save(*args, **kwargs)
+
+
+class TravelOptionQuerySet(models.QuerySet):
+    def reserve_seats(self, pk: int, seats: int) -> bool:
+        """Take ``seats`` from a departure in one conditional UPDATE.
+
+        Returns False without writing anything when fewer seats are left, so
+        concurrent bookings never need to hold a row lock for the seat check.
+        """
+        reserved = self.filter(pk=pk, available_seats__gte=seats).update(
+            available_seats=models.F("available_seats") - seats, updated_at=timezone.now()
+        )
+        return bool(reserved)
+
+    def upcoming(self, after=None):
+        """Departures at or after ``after`` (default: now), soonest first, seeked on departure_at."""
+        return self.filter(departure_at__gte=after or timezone.now()).order_by("departure_at", "id")
+
+    def release_seats(self, pk: int, seats: int) -> None:
+        # updated_at feeds the listing ETags and card fragment cache keys
+        self.filter(pk=pk).update(available_seats=models.F("available_seats") + seats, updated_at=timezone.now())
 
 
 class TravelOption(models.Model):
@@ -11,16 +105,68 @@ class TravelOption(models.Model):
     type = models.CharField(max_length=10, choices=TravelType.choices)
     source = models.CharField(max_length=100)
     destination = models.CharField(max_length=100)
+    # Normalized copies of source/destination, kept in sync on save
+    source_location = models.ForeignKey(
+        Location, on_delete=models.PROTECT, related_name="departures", null=True, editable=False
+    )
+    destination_location = models.ForeignKey(
+        Location, on_delete=models.PROTECT, related_name="arrivals", null=True, editable=False
+    )
     departure_date = models.DateField()
     departure_time = models.TimeField()
+    # departure_date + departure_time as one aware datetime, kept in sync on save;
+    # listing order, date ranges and "next departures" seek on it
+    departure_at = models.DateTimeField(editable=False)
+    # Journey time; departures without one can not be chained into connections
+    duration = models.DurationField(null=True, blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     available_seats = models.PositiveIntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TravelOptionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination seek on (departure_at, id), and date ranges
+            models.Index(fields=["departure_at", "id"], name="travel_departure_at_idx"),
+            # A route's departures in listing order: date ranges and "next departures"
+            models.Index(
+                fields=["source_location", "destination_location", "departure_at"],
+                name="travel_route_departure_idx",
+            ),
+            # A route's day by price: price-range filters and the fare calendar refresh
+            models.Index(
+                fields=["source_location", "destination_location", "departure_date", "price"],
+                name="travel_route_price_idx",
+            ),
+        ]
+        constraints = [
+            # Natural key operator feeds upsert on (see booking.schedule_import)
+            models.UniqueConstraint(
+                fields=["type", "source", "destination", "departure_date", "departure_time"],
+                name="travel_natural_key_unique",
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"{self.type} {self.source} -> {self.destination} on {self.departure_date} {self.departure_time}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"source", "destination"} & set(update_fields):
+            self.source_location = Location.objects.resolve(self.source)
+            self.destination_location = Location.objects.resolve(self.destination)
+            self.source = self.source_location.name
+            self.destination = self.destination_location.name
+            if update_fields is not None:
+                kwargs["update_fields"] = set(update_fields) | {"source_location", "destination_location"}
+        if update_fields is None or {"departure_date", "departure_time"} & set(update_fields):
+            self.departure_at = departure_moment(self.departure_date, self.departure_time)
+            if update_fields is not None:
+                kwargs["update_fields"] = set(kwargs["update_fields"]) | {"departure_at"}
+        super().save(*args, **kwargs)
+
 
 User = get_user_model()
 
@@ -36,20 +182,131 @@ class Booking(models.Model):
     primary_passenger_name = models.CharField(max_length=100, default="")
     primary_passenger_age = models.PositiveIntegerField(default=18)
     passenger_details = models.JSONField(default=list)
+    # Fare per seat when booked; later price changes on the departure do not reprice it
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     booking_date = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.CONFIRMED)
 
+    class Meta:
+        indexes = [
+            # Booking history tabs, newest first (scanned backwards); every tab filters on status
+            models.Index(fields=["user", "status", "booking_date"], name="booking_user_status_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"Booking #{self.pk} - {self.user} - {self.travel_option}"
 
     def calculate_total_price(self) -> None:
-        self.total_price = self.number_of_seats * self.travel_option.price
+        self.total_price = self.number_of_seats * self.unit_price
 
     def save(self, *args, **kwargs):
-        # Ensure total price is always in sync before saving
-        self.calculate_total_price()
+        if self.unit_price is None:
+            self.unit_price = self.travel_option.price
+        # Keep the total in sync, but leave partial saves (e.g. a status flip) alone
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            self.calculate_total_price()
+        elif {"number_of_seats", "unit_price"} & set(update_fields):
+            self.calculate_total_price()
+            kwargs["update_fields"] = {*update_fields, "total_price"}
         super().save(*args, **kwargs)
 
 
+class RouteBookingCounter(models.Model):
+    """Hourly count of confirmed bookings per route, maintained by booking.popular."""
+
+    source = models.CharField(max_length=100)
+    destination = models.CharField(max_length=100)
+    hour = models.DateTimeField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["hour", "source", "destination"], name="route_counter_bucket_unique"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.source} -> {self.destination} @ {self.hour:%Y-%m-%d %H:00}: {self.count}"
+
+
+class FareDay(models.Model):
+    """Cheapest fare and departure count per route, type and day.
+
+    Read by the fare calendar. Schedule changes recompute the days they touch
+    (booking.fares.refresh_fare_days). Seats left are summed from the
+    departures when the calendar is read, so bookings never write here.
+    """
+
+    type = models.CharField(max_length=10, choices=TravelOption.TravelType.choices)
+    source_location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name="+")
+    destination_location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name="+")
+    date = models.DateField()
+    min_price = models.DecimalField(max_digits=10, decimal_places=2)
+    departures = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            # Also the index a calendar reads: one route, a date range, any or one type
+            models.UniqueConstraint(
+                fields=["source_location", "destination_location", "date", "type"], name="fare_day_unique"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.type} {self.source_location_id} -> {self.destination_location_id} on {self.date}: {self.min_price}"
+
+
+class SeatHold(models.Model):
+    """Seats set aside while a user fills in the booking form; see booking.holds."""
+
+    class Status(models.TextChoices):
+        ACTIVE = "Active", "Active"
+        CONVERTED = "Converted", "Converted"
+        EXPIRED = "Expired", "Expired"
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    travel_option = models.ForeignKey(TravelOption, on_delete=models.CASCADE)
+    seats = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.ACTIVE)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "expires_at"], name="seathold_expiry_idx"),
+            models.Index(fields=["user", "travel_option", "status"], name="seathold_owner_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Hold #{self.pk} - {self.seats} seat(s) on {self.travel_option_id} ({self.status})"
+
+
+class OutboxEmail(models.Model):
+    """Email queued inside a booking transaction and delivered by ``manage.py run_outbox``."""
+
+    class Status(models.TextChoices):
+        PENDING = "Pending", "Pending"
+        SENT = "Sent", "Sent"
+        FAILED = "Failed", "Failed"
+
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    recipient = models.EmailField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.subject} -> {self.recipient} ({self.status})"
+
+
 # Create your models here.
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+
+def enqueue_email(subject: str, message: str, recipient: str) -> OutboxEmail:
+    """Queue an email; it is only visible to the sender once the caller's transaction commits."""
+    return OutboxEmail.objects.create(subject=subject, body=message, recipient=recipient)
+
+
+def _backoff(attempts: int) -> timedelta:
+    seconds = settings.OUTBOX_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+    return timedelta(seconds=min(seconds, settings.OUTBOX_RETRY_MAX_SECONDS))
+
+
+def drain_outbox(batch_size: int = 100, max_attempts: int = None) -> tuple:
+    """Send one batch of due emails over a single SMTP connection.
+
+    Returns (sent, failed) for the batch. Rows are claimed with
+    ``SKIP LOCKED`` where the backend supports it so several workers can
+    drain the same table.
+    """
+    max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+    now = timezone.now()
+    sent = failed = 0
+    with transaction.atomic():
+        due = OutboxEmail.objects.filter(status=OutboxEmail.Status.PENDING, next_attempt_at__lte=now)
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        batch = list(due.order_by("next_attempt_at", "id")[:batch_size])
+        if not batch:
+            return 0, 0
+
+        mail_connection = get_connection(fail_silently=False)
+        try:
+            mail_connection.open()
+        except Exception as exc:
+            # SMTP server unreachable: push the whole batch back
+            for email in batch:
+                email.attempts += 1
+                email.last_error = str(exc)
+                email.next_attempt_at = now + _backoff(email.attempts)
+                if email.attempts >= max_attempts:
+                    email.status = OutboxEmail.Status.FAILED
+            OutboxEmail.objects.bulk_update(batch, ["attempts", "last_error", "next_attempt_at", "status"])
+            return 0, len(batch)
+
+        try:
+            for email in batch:
+                message = EmailMessage(
+                    subject=email.subject,
+                    body=email.body,
+                    from_email=None,
+                    to=[email.recipient],
+                    connection=mail_connection,
+                )
+                email.attempts += 1
+                try:
+                    message.send()
+                except Exception as exc:
+                    email.last_error = str(exc)
+                    email.next_attempt_at = now + _backoff(email.attempts)
+                    if email.attempts >= max_attempts:
+                        email.status = OutboxEmail.Status.FAILED
+                    failed += 1
+                else:
+                    email.status = OutboxEmail.Status.SENT
+                    email.sent_at = timezone.now()
+                    email.last_error = ""
+                    sent += 1
+        finally:
+            mail_connection.close()
+
+        OutboxEmail.objects.bulk_update(
+            batch, ["attempts", "last_error", "next_attempt_at", "status", "sent_at"]
+        )
+    return sent, failed
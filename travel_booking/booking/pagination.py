@@ -0,0 +1,147 @@
+import base64
+import binascii
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# Listing order shared by every travel search; backed by the composite
+# index declared on TravelOption.Meta.
+KEYSET_ORDERING = ("departure_at", "id")
+
+
+def _value(obj, path: str):
+    for part in path.split("__"):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _field(model, path: str):
+    for part in path.split("__"):
+        model_field = model._meta.get_field(part)
+        model = model_field.related_model
+    return model_field
+
+
+def encode_cursor(obj, ordering: tuple = KEYSET_ORDERING) -> str:
+    values = [_value(obj, name.lstrip("-")) for name in ordering]
+    raw = "|".join(value.isoformat() if hasattr(value, "isoformat") else str(value) for value in values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, model=None, ordering: tuple = KEYSET_ORDERING):
+    """Return the tuple of ordering values a cursor points at, or None for a bad token."""
+    if not token:
+        return None
+    if model is None:
+        from .models import TravelOption
+
+        model = TravelOption
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        parts = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        if len(parts) != len(ordering):
+            return None
+        return tuple(_field(model, name.lstrip("-")).to_python(part) for name, part in zip(ordering, parts))
+    except (binascii.Error, UnicodeDecodeError, ValueError, ValidationError):
+        return None
+
+
+def _seek(key, ordering: tuple, forward: bool) -> Q:
+    """Rows strictly after (``forward``) or before ``key`` in ``ordering``.
+
+    Expands the row comparison lexicographically, e.g. for (departure_at, id):
+    departure_at > a OR (departure_at = a AND id > i).
+    """
+    condition = Q()
+    for i, name in enumerate(ordering):
+        ascending = not name.startswith("-")
+        equal = {ordering[j].lstrip("-"): key[j] for j in range(i)}
+        step = Q(**equal, **{f"{name.lstrip('-')}__{'gt' if ascending == forward else 'lt'}": key[i]})
+        condition = step if i == 0 else condition | step
+    return condition
+
+
+def _reverse(ordering: tuple) -> tuple:
+    return tuple(name[1:] if name.startswith("-") else f"-{name}" for name in ordering)
+
+
+@dataclass
+class KeysetPage:
+    object_list: list = field(default_factory=list)
+    next_cursor: str | None = None
+    previous_cursor: str | None = None
+    # Full query strings for the pager links, filled in by the view
+    next_query: str = ""
+    previous_query: str = ""
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+
+def _keyset_slice(queryset, page_size: int, after: str, before: str, ordering: tuple):
+    """Return the (at most ``page_size + 1`` rows) queryset for a page and a
+    function turning its rows into the KeysetPage, so the sync and async
+    paginators share everything but the fetch."""
+    after_key = decode_cursor(after, queryset.model, ordering)
+    before_key = decode_cursor(before, queryset.model, ordering) if after_key is None else None
+
+    if before_key is not None:
+        queryset = queryset.filter(_seek(before_key, ordering, forward=False))
+
+        def to_page(rows: list) -> KeysetPage:
+            has_more = len(rows) > page_size
+            rows = rows[:page_size][::-1]
+            return KeysetPage(
+                object_list=rows,
+                next_cursor=encode_cursor(rows[-1], ordering) if rows else before,
+                previous_cursor=encode_cursor(rows[0], ordering) if rows and has_more else None,
+            )
+
+        return queryset.order_by(*_reverse(ordering))[: page_size + 1], to_page
+
+    if after_key is not None:
+        queryset = queryset.filter(_seek(after_key, ordering, forward=True))
+
+    def to_page(rows: list) -> KeysetPage:
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        return KeysetPage(
+            object_list=rows,
+            next_cursor=encode_cursor(rows[-1], ordering) if rows and has_more else None,
+            previous_cursor=encode_cursor(rows[0], ordering) if rows and after_key is not None else None,
+        )
+
+    return queryset.order_by(*ordering)[: page_size + 1], to_page
+
+
+def keyset_paginate(
+    queryset, page_size: int, after: str = "", before: str = "", ordering: tuple = KEYSET_ORDERING
+) -> KeysetPage:
+    """Slice ``queryset`` into one page using seek predicates on ``ordering``.
+
+    Only ``page_size + 1`` rows are ever read, so the cost of a page does not
+    depend on how deep into the listing it is. ``ordering`` must end in a
+    unique column (id) so every row has a distinct position.
+    """
+    rows, to_page = _keyset_slice(queryset, page_size, after, before, ordering)
+    return to_page(list(rows))
+
+
+async def akeyset_paginate(
+    queryset, page_size: int, after: str = "", before: str = "", ordering: tuple = KEYSET_ORDERING
+) -> KeysetPage:
+    """Async keyset_paginate for async views (fetches through the async ORM)."""
+    rows, to_page = _keyset_slice(queryset, page_size, after, before, ordering)
+    return to_page([row async for row in rows])
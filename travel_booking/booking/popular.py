@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import Booking, RouteBookingCounter
+
+POPULAR_ROUTES_CACHE_KEY = "booking:popular-routes"
+
+
+def _bucket(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def record_booking(source: str, destination: str, booked_at=None, delta: int = 1) -> None:
+    """Add ``delta`` to the hourly bucket of a route.
+
+    Call inside the booking/cancellation transaction so the rollup commits
+    (or rolls back) together with the Booking row.
+    """
+    hour = _bucket(booked_at or timezone.now())
+    bucket = RouteBookingCounter.objects.filter(hour=hour, source=source, destination=destination)
+    if bucket.update(count=F("count") + delta):
+        return
+    try:
+        with transaction.atomic():
+            RouteBookingCounter.objects.create(hour=hour, source=source, destination=destination, count=delta)
+    except IntegrityError:
+        # Another booking created the bucket first
+        bucket.update(count=F("count") + delta)
+
+
+def _popular_key(limit: int, window) -> str:
+    return f"{POPULAR_ROUTES_CACHE_KEY}:{limit}:{int(window.total_seconds())}"
+
+
+def _popular_rows(limit: int, window):
+    since = _bucket(timezone.now() - window)
+    return (
+        RouteBookingCounter.objects.filter(hour__gte=since)
+        .values("source", "destination")
+        .annotate(total=Sum("count"))
+        .filter(total__gt=0)
+        .order_by("-total", "source", "destination")[:limit]
+    )
+
+
+def _route(row) -> dict:
+    return {"source": row["source"], "destination": row["destination"], "count": row["total"]}
+
+
+def popular_routes(limit: int = 6, window=timedelta(days=1)) -> list:
+    """Top routes by bookings over the sliding ``window``, cached briefly."""
+    cache_key = _popular_key(limit, window)
+    routes = cache.get(cache_key)
+    if routes is None:
+        routes = [_route(row) for row in _popular_rows(limit, window)]
+        cache.set(cache_key, routes, settings.POPULAR_ROUTES_CACHE_SECONDS)
+    return routes
+
+
+async def apopular_routes(limit: int = 6, window=timedelta(days=1)) -> list:
+    cache_key = _popular_key(limit, window)
+    routes = await cache.aget(cache_key)
+    if routes is None:
+        routes = [_route(row) async for row in _popular_rows(limit, window)]
+        await cache.aset(cache_key, routes, settings.POPULAR_ROUTES_CACHE_SECONDS)
+    return routes
+
+
+@transaction.atomic
+def rebuild_counters(batch_size: int = 1000) -> int:
+    """Recreate every bucket from confirmed Booking history; returns bucket count."""
+    RouteBookingCounter.objects.all().delete()
+    rows = (
+        Booking.objects.filter(status=Booking.Status.CONFIRMED)
+        .annotate(hour=TruncHour("booking_date"))
+        .values("hour", "travel_option__source", "travel_option__destination")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    buckets = [
+        RouteBookingCounter(
+            hour=r["hour"],
+            source=r["travel_option__source"],
+            destination=r["travel_option__destination"],
+            count=r["total"],
+        )
+        for r in rows.iterator()
+    ]
+    RouteBookingCounter.objects.bulk_create(buckets, batch_size=batch_size)
+    return len(buckets)
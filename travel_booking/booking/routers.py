@@ -0,0 +1,112 @@
+"""Optional read replica for read-only views (DATABASE_REPLICA).
+
+Views decorated with ``replica_reads`` read from the ``replica`` alias;
+everything else, every write and all auth/session reads use ``default``.
+A request that writes sets a short-lived signed cookie, and while it is
+valid that browser reads from the primary too, so a user always sees
+their own booking even if the replica lags behind.
+"""
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+REPLICA_ALIAS = "replica"
+STICKY_COOKIE = "primary_reads"
+# Login, sessions and profiles must never be read from a lagging copy
+PRIMARY_ONLY_APPS = {"accounts", "admin", "auth", "contenttypes", "sessions"}
+
+# Per-request routing state; a mutable dict so writes routed from the async
+# ORM's worker thread are still seen by the middleware
+_request_state = ContextVar("replica_request_state", default=None)
+
+
+def replica_reads(view):
+    """Mark a read-only view as safe to serve from the replica."""
+    view.replica_reads = True
+    return view
+
+
+def reads_replica() -> bool:
+    """Whether the current request reads from the replica.
+
+    Shared caches keyed by version tokens must not be filled from such reads:
+    a lagging replica would pin stale rows under the fresh token.
+    """
+    state = _request_state.get()
+    return bool(state and state["replica"])
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state and state["replica"] and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            return REPLICA_ALIAS
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state["wrote"] = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = {"replica": False, "wrote": False}
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self._stick(response, state)
+
+    async def __acall__(self, request):
+        state = {"replica": False, "wrote": False}
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self._stick(response, state)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _request_state.get()
+        if state is not None and getattr(view_func, "replica_reads", False) and not self._pinned(request):
+            state["replica"] = True
+        return None
+
+    def _pinned(self, request) -> bool:
+        return (
+            request.get_signed_cookie(
+                STICKY_COOKIE, default=None, salt=STICKY_COOKIE, max_age=settings.REPLICA_STICKY_SECONDS
+            )
+            is not None
+        )
+
+    def _stick(self, response, state: dict):
+        if state["wrote"]:
+            response.set_signed_cookie(
+                STICKY_COOKIE,
+                "1",
+                salt=STICKY_COOKIE,
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,277 @@
+import csv
+import json
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from .connections import invalidate_graph, record_changes
+from .fares import refresh_fare_days
+from .locations import normalize_location
+from .models import Booking, Location, SeatHold, TravelOption, departure_moment
+from .search_cache import bump_routes
+from .suggest import invalidate_index
+
+FEED_FORMATS = ("csv", "ndjson")
+NATURAL_KEY = ("type", "source", "destination", "departure_date", "departure_time")
+# Only the first rejections are kept with their reason; the rest are just counted
+MAX_REPORTED_ERRORS = 50
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    updated: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+
+    def reject(self, line: int, message: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def read_feed(stream, fmt: str):
+    """Yield (line number, raw row dict or None) without reading the whole feed."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line, text in enumerate(stream, 1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError:
+            row = None
+        yield line, row if isinstance(row, dict) else None
+
+
+def clean_row(raw: dict) -> tuple:
+    """Return (cleaned row, error message) for one feed row.
+
+    Plain checks rather than a Form: building a Form per row costs more than
+    the database work for feeds of this size.
+    """
+    errors = []
+    travel_type = str(raw.get("type") or "").strip().capitalize()
+    if travel_type not in TravelOption.TravelType.values:
+        errors.append(f"type: unknown travel type {travel_type!r}.")
+    source = str(raw.get("source") or "").strip()
+    destination = str(raw.get("destination") or "").strip()
+    if not source or not destination:
+        errors.append("source and destination are required.")
+    elif not normalize_location(source) or not normalize_location(destination):
+        errors.append("place names need a letter or digit.")
+    elif normalize_location(source) == normalize_location(destination):
+        errors.append("source and destination must differ.")
+    elif max(len(source), len(destination)) > 100:
+        errors.append("place names are limited to 100 characters.")
+    try:
+        departure_date = date.fromisoformat(str(raw.get("departure_date") or ""))
+    except ValueError:
+        departure_date = None
+        errors.append("departure_date: expected YYYY-MM-DD.")
+    try:
+        departure_time = time.fromisoformat(str(raw.get("departure_time") or ""))
+    except ValueError:
+        departure_time = None
+        errors.append("departure_time: expected HH:MM or HH:MM:SS.")
+    try:
+        price = Decimal(str(raw.get("price"))).quantize(Decimal("0.01"))
+        if price < 0 or price >= 10**8:
+            raise InvalidOperation
+    except (InvalidOperation, ValueError):
+        errors.append("price: expected a non-negative amount.")
+    # Vehicle capacity; seats already sold are subtracted on import
+    seats = raw.get("seats", raw.get("available_seats"))
+    try:
+        seats = int(seats)
+        if seats < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        errors.append("seats: expected a non-negative whole number.")
+    # Optional journey time in minutes; needed for connection search
+    duration = raw.get("duration")
+    if duration in (None, ""):
+        duration = None
+    else:
+        try:
+            duration = int(duration)
+            if duration <= 0:
+                raise ValueError
+            duration = timedelta(minutes=duration)
+        except (TypeError, ValueError):
+            errors.append("duration: expected minutes as a positive whole number.")
+    if errors:
+        return None, " ".join(errors)
+    return {
+        "type": travel_type,
+        "source": source,
+        "destination": destination,
+        "departure_date": departure_date,
+        "departure_time": departure_time.replace(tzinfo=None),
+        "duration": duration,
+        "price": price,
+        "seats": seats,
+    }, None
+
+
+def import_schedule(stream, fmt: str, chunk_size: int = 1000) -> ImportReport:
+    """Upsert a timetable feed on the departure natural key, one transaction per chunk."""
+    report = ImportReport()
+    locations = {}
+    chunk = {}
+    for line, raw in read_feed(stream, fmt):
+        if raw is None:
+            report.reject(line, "Row is not a JSON object.")
+            continue
+        row, error = clean_row(raw)
+        if error:
+            report.reject(line, error)
+            continue
+        # Canonical place names, as TravelOption.save() would store them
+        for end in ("source", "destination"):
+            name = row[end]
+            if name not in locations:
+                locations[name] = Location.objects.resolve(name)
+            row[f"{end}_location"] = locations[name]
+            row[end] = locations[name].name
+        if row["source_location"] == row["destination_location"]:
+            report.reject(line, "Source and destination must differ.")
+            continue
+        # A later row for the same departure replaces an earlier one
+        chunk[tuple(row[name] for name in NATURAL_KEY)] = (line, row)
+        if len(chunk) >= chunk_size:
+            _apply_chunk(chunk, report)
+            chunk = {}
+    if chunk:
+        _apply_chunk(chunk, report)
+    return report
+
+
+def _existing_departures(keys: list) -> dict:
+    """Map natural key -> pk for the keys already stored, locking those rows.
+
+    A row-value IN list probes the natural-key unique index directly; the ORM
+    can only spell this as an OR of per-row lookups, which costs more to
+    compile than to run and overflows SQLite's expression depth.
+    """
+    ops = connection.ops
+    quote = ops.quote_name
+    opts = TravelOption._meta
+    columns = ", ".join(quote(opts.get_field(name).column) for name in NATURAL_KEY)
+    batch_size = (connection.features.max_query_params or 999) // len(NATURAL_KEY)
+    lock = " FOR UPDATE" if connection.features.has_select_for_update else ""
+    existing = {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start : start + batch_size]
+            params = []
+            for travel_type, source, destination, departure_date, departure_time in batch:
+                params += [
+                    travel_type,
+                    source,
+                    destination,
+                    ops.adapt_datefield_value(departure_date),
+                    ops.adapt_timefield_value(departure_time),
+                ]
+            placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(batch))
+            cursor.execute(
+                f"SELECT {quote('id')} FROM {quote(opts.db_table)} "
+                f"WHERE ({columns}) IN ({placeholders}) ORDER BY {quote('id')}{lock}",
+                params,
+            )
+            ids = [pk for (pk,) in cursor.fetchall()]
+            # Read the keys back through the ORM so dates/times come out as Python values
+            for pk, *key in TravelOption.objects.filter(pk__in=ids).values_list("pk", *NATURAL_KEY):
+                existing[tuple(key)] = pk
+    return existing
+
+
+def _seats_taken(option_ids: list) -> dict:
+    """Seats held by confirmed bookings and not-yet-released holds, per departure."""
+    taken = defaultdict(int)
+    for queryset, seats in (
+        (Booking.objects.filter(status=Booking.Status.CONFIRMED), "number_of_seats"),
+        (SeatHold.objects.filter(status=SeatHold.Status.ACTIVE), "seats"),
+    ):
+        rows = (
+            queryset.filter(travel_option_id__in=option_ids)
+            .values("travel_option_id")
+            .annotate(n=Sum(seats))
+            .order_by()
+        )
+        for row in rows:
+            taken[row["travel_option_id"]] += row["n"]
+    return taken
+
+
+def _apply_chunk(chunk: dict, report: ImportReport) -> None:
+    with transaction.atomic():
+        # Lock the departures being updated so bookings can not slip in between
+        # counting their seats and overwriting available_seats
+        existing = _existing_departures(list(chunk))
+        taken = _seats_taken(list(existing.values()))
+
+        objects, inserted, routes, days = [], 0, set(), set()
+        for key, (line, row) in chunk.items():
+            capacity = row["seats"]
+            pk = existing.get(key)
+            if pk is not None and capacity < taken[pk]:
+                report.reject(line, f"Capacity {capacity} is below the {taken[pk]} seats already booked.")
+                continue
+            objects.append(
+                TravelOption(
+                    type=row["type"],
+                    source=row["source"],
+                    destination=row["destination"],
+                    source_location=row["source_location"],
+                    destination_location=row["destination_location"],
+                    departure_date=row["departure_date"],
+                    departure_time=row["departure_time"],
+                    departure_at=departure_moment(row["departure_date"], row["departure_time"]),
+                    duration=row["duration"],
+                    price=row["price"],
+                    available_seats=capacity - taken[pk] if pk is not None else capacity,
+                )
+            )
+            inserted += pk is None
+            routes.add((row["source_location"].pk, row["destination_location"].pk))
+            days.add((row["type"], row["source_location"].pk, row["destination_location"].pk, row["departure_date"]))
+        if not objects:
+            return
+        TravelOption.objects.bulk_create(
+            objects,
+            update_conflicts=True,
+            # MySQL takes no conflict target; its ON DUPLICATE KEY hits travel_natural_key_unique
+            unique_fields=NATURAL_KEY if connection.features.supports_update_conflicts_with_target else None,
+            update_fields=[
+                "departure_at",
+                "duration",
+                "price",
+                "available_seats",
+                "source_location",
+                "destination_location",
+                "updated_at",
+            ],
+        )
+        report.inserted += inserted
+        report.updated += len(objects) - inserted
+        # bulk_create sends no signals; redo what the model hooks would have
+        refresh_fare_days(days)
+        transaction.on_commit(lambda: bump_routes(routes))
+        if all(option.pk is not None for option in objects):
+            # Patched into each process's graph like single saves; a departure's
+            # natural key pins its route, so no old position is needed
+            changes = [(option.pk, None) for option in objects]
+            transaction.on_commit(lambda: record_changes(changes))
+        else:
+            # No ids back from the upsert (MySQL): every process rebuilds
+            transaction.on_commit(invalidate_graph)
+        if inserted:
+            transaction.on_commit(invalidate_index)
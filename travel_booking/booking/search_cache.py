@@ -0,0 +1,303 @@
+import hashlib
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Min, Window
+from django.db.models.functions import RowNumber
+
+from .facets import FACET_FIELDS, build_facets, facet_aggregates, facet_filters
+from .fares import CENTS
+from .locations import normalize_location
+from .models import Location, TravelOption, start_of_day
+from .pagination import KeysetPage, akeyset_paginate
+from .routers import reads_replica
+
+SEARCH_VERSION_PREFIX = "booking:search-version"
+SEARCH_RESULT_PREFIX = "booking:search"
+SEARCH_STATS_PREFIX = "booking:search-stats"
+# Above this many (source, destination) pairs a search is versioned per place instead
+MAX_ROUTE_VERSION_KEYS = 32
+
+
+def _version_keys(source_ids, destination_ids) -> list:
+    """Version tokens a search depends on, from most to least specific.
+
+    A change to route (s, d) bumps ``route:s:d``, ``src:s``, ``dst:d`` and
+    ``all``, so each search only watches the narrowest keys that cover it.
+    """
+    keys = [f"{SEARCH_VERSION_PREFIX}:generation"]
+    if source_ids is not None and destination_ids is not None:
+        if len(source_ids) * len(destination_ids) <= MAX_ROUTE_VERSION_KEYS:
+            keys += [f"{SEARCH_VERSION_PREFIX}:route:{s}:{d}" for s in source_ids for d in destination_ids]
+        else:
+            keys += [f"{SEARCH_VERSION_PREFIX}:src:{s}" for s in source_ids]
+            keys += [f"{SEARCH_VERSION_PREFIX}:dst:{d}" for d in destination_ids]
+    elif source_ids is not None:
+        keys += [f"{SEARCH_VERSION_PREFIX}:src:{s}" for s in source_ids]
+    elif destination_ids is not None:
+        keys += [f"{SEARCH_VERSION_PREFIX}:dst:{d}" for d in destination_ids]
+    else:
+        keys.append(f"{SEARCH_VERSION_PREFIX}:all")
+    return keys
+
+
+async def _aversions(keys: list) -> list:
+    found = await cache.aget_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # A fresh random token (never a fixed default) so an evicted version
+        # can not resurrect results cached under the old one
+        for key in missing:
+            await cache.aadd(key, uuid.uuid4().hex, timeout=None)
+        found.update(await cache.aget_many(missing))
+    return [found.get(key, "") for key in keys]
+
+
+def bump_routes(routes) -> None:
+    """Invalidate cached searches touching any (source_location_id, destination_location_id)."""
+    keys = {f"{SEARCH_VERSION_PREFIX}:all"}
+    for source_id, destination_id in routes:
+        keys.add(f"{SEARCH_VERSION_PREFIX}:route:{source_id}:{destination_id}")
+        keys.add(f"{SEARCH_VERSION_PREFIX}:src:{source_id}")
+        keys.add(f"{SEARCH_VERSION_PREFIX}:dst:{destination_id}")
+    cache.set_many({key: uuid.uuid4().hex for key in keys}, timeout=None)
+
+
+def bump_all() -> None:
+    """Invalidate every cached search (bulk loads that bypass the model signals)."""
+    cache.set(f"{SEARCH_VERSION_PREFIX}:generation", uuid.uuid4().hex, timeout=None)
+
+
+async def _astore(cache_key: str, value) -> None:
+    # Replica reads may lag the version tokens they would be stored under
+    if not reads_replica():
+        await cache.aset(cache_key, value, timeout=settings.SEARCH_CACHE_SECONDS)
+
+
+async def _acount(outcome: str) -> None:
+    key = f"{SEARCH_STATS_PREFIX}:{outcome}"
+    if not await cache.aadd(key, 1, timeout=None):
+        try:
+            await cache.aincr(key)
+        except ValueError:
+            # Evicted between add() and incr()
+            await cache.aadd(key, 1, timeout=None)
+
+
+def search_cache_stats() -> dict:
+    stats = cache.get_many([f"{SEARCH_STATS_PREFIX}:hits", f"{SEARCH_STATS_PREFIX}:misses"])
+    hits = stats.get(f"{SEARCH_STATS_PREFIX}:hits", 0)
+    misses = stats.get(f"{SEARCH_STATS_PREFIX}:misses", 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+    }
+
+
+def _matching_ids(term):
+    if not term:
+        return None
+    return sorted(Location.objects.matching(term).values_list("pk", flat=True))
+
+
+async def _amatching_ids(term):
+    if not term:
+        return None
+    return sorted([pk async for pk in Location.objects.matching(term).values_list("pk", flat=True)])
+
+
+async def aresolve_places(cleaned_data: dict) -> tuple:
+    """(source ids, destination ids, cache versions) of a search; ids are None
+    where no place was given.
+
+    The search functions below resolve these themselves unless passed
+    ``places``, so a view running several of them resolves once.
+    """
+    source_ids = await _amatching_ids(cleaned_data.get("source"))
+    destination_ids = await _amatching_ids(cleaned_data.get("destination"))
+    if source_ids == [] or destination_ids == []:
+        return source_ids, destination_ids, []
+    return source_ids, destination_ids, await _aversions(_version_keys(source_ids, destination_ids))
+
+
+def _scoped(cleaned_data: dict, source_ids, destination_ids):
+    """The search's places and dates, without the facet filters."""
+    queryset = TravelOption.objects.all()
+    if source_ids == [] or destination_ids == []:
+        return queryset.none()
+    if source_ids is not None:
+        queryset = queryset.filter(source_location__in=source_ids)
+    if destination_ids is not None:
+        queryset = queryset.filter(destination_location__in=destination_ids)
+    if cleaned_data.get("date"):
+        # The day (or date ± flex_days) as one departure_at range, seeked in the
+        # keyset index, or after the places in the route index
+        flex = timedelta(days=cleaned_data.get("flex_days") or 0)
+        start, end = cleaned_data["date"] - flex, cleaned_data["date"] + flex + timedelta(days=1)
+        queryset = queryset.filter(departure_at__gte=start_of_day(start), departure_at__lt=start_of_day(end))
+    return queryset
+
+
+def _filtered(cleaned_data: dict, source_ids, destination_ids):
+    return _scoped(cleaned_data, source_ids, destination_ids).filter(*facet_filters(cleaned_data).values())
+
+
+def filter_travel_options(cleaned_data: dict):
+    """Every departure matching a SearchForm search, uncached and unordered."""
+    return _filtered(
+        cleaned_data,
+        _matching_ids(cleaned_data.get("source")),
+        _matching_ids(cleaned_data.get("destination")),
+    )
+
+
+def _cache_key(cleaned_data: dict, places: tuple, *extra) -> str:
+    source_ids, destination_ids, versions = places
+    travel_date = cleaned_data.get("date")
+    fingerprint = repr(
+        (
+            cleaned_data.get("type") or "",
+            normalize_location(cleaned_data.get("source") or ""),
+            normalize_location(cleaned_data.get("destination") or ""),
+            source_ids,
+            destination_ids,
+            travel_date.isoformat() if travel_date else "",
+            cleaned_data.get("flex_days") or 0,
+            *(str(cleaned_data.get(name) or "") for names in FACET_FIELDS.values() for name in names),
+            *extra,
+            versions,
+        )
+    )
+    return f"{SEARCH_RESULT_PREFIX}:{hashlib.md5(fingerprint.encode()).hexdigest()}"
+
+
+async def asearch_travel_options(
+    cleaned_data: dict, page_size: int, after: str = "", before: str = "", places=None
+) -> KeysetPage:
+    """One keyset page of travel options for a search, served from the cache when possible.
+
+    Only the matching ids and cursors are cached; rows are re-read by primary
+    key, so seat counts on a cached page are always live and bookings do not
+    need to invalidate anything. Runs on the async ORM and cache APIs.
+    """
+    places = places or await aresolve_places(cleaned_data)
+    source_ids, destination_ids, _ = places
+    queryset = _filtered(cleaned_data, source_ids, destination_ids)
+    if source_ids == [] or destination_ids == []:
+        return await akeyset_paginate(queryset, page_size, after, before)
+
+    cache_key = _cache_key(cleaned_data, places, page_size, after, before)
+    cached = await cache.aget(cache_key)
+    if cached is not None:
+        ids, next_cursor, previous_cursor = cached
+        rows = await TravelOption.objects.ain_bulk(ids)
+        if len(rows) == len(ids):
+            await _acount("hits")
+            return KeysetPage(
+                object_list=[rows[pk] for pk in ids],
+                next_cursor=next_cursor,
+                previous_cursor=previous_cursor,
+            )
+
+    await _acount("misses")
+    page = await akeyset_paginate(queryset, page_size, after, before)
+    await _astore(cache_key, ([option.pk for option in page.object_list], page.next_cursor, page.previous_cursor))
+    return page
+
+
+@dataclass
+class FlexDay:
+    date: date
+    min_price: Decimal | None = None
+    departures: int = 0
+    # The day's cheapest few departures
+    options: list = field(default_factory=list)
+    # Filled in by the view: query string of the single-day search, and
+    # whether this is the cheapest day of the window
+    query: str = ""
+    cheapest: bool = False
+
+
+def _flex_rows(queryset, per_day: int):
+    """The ``per_day`` cheapest departures of every day in the window, each
+    annotated with its day's cheapest price and departure count.
+
+    One statement: the window functions run over the whole range scan and the
+    rank filter is applied outside them (Django wraps the query in a subquery).
+    """
+    day = [F("departure_date")]
+    cheapest_first = [F("price").asc(), F("departure_time").asc(), F("id").asc()]
+    return (
+        queryset.annotate(
+            day_rank=Window(RowNumber(), partition_by=day, order_by=cheapest_first),
+            day_min_price=Window(Min("price"), partition_by=day),
+            day_departures=Window(Count("id"), partition_by=day),
+        )
+        .filter(day_rank__lte=per_day)
+        .order_by("departure_date", "day_rank")
+    )
+
+
+async def asearch_flex_days(cleaned_data: dict, per_day: int, places=None) -> list:
+    """Every day of a ``date`` ± ``flex_days`` search with its cheapest price,
+    number of departures and cheapest ``per_day`` departures, cached like
+    asearch_travel_options (summaries and ids only; rows are re-read live).
+    Days without departures are included with no price.
+    """
+    travel_date, flex = cleaned_data["date"], cleaned_data.get("flex_days") or 0
+    days = {travel_date + timedelta(days=n): FlexDay(travel_date + timedelta(days=n)) for n in range(-flex, flex + 1)}
+    places = places or await aresolve_places(cleaned_data)
+    source_ids, destination_ids, _ = places
+    if source_ids == [] or destination_ids == []:
+        return list(days.values())
+
+    cache_key = _cache_key(cleaned_data, places, "flex", per_day)
+    cached = await cache.aget(cache_key)
+    if cached is not None:
+        ids = [pk for *_, day_ids in cached for pk in day_ids]
+        rows = await TravelOption.objects.ain_bulk(ids)
+        if len(rows) == len(ids):
+            await _acount("hits")
+            for day, min_price, departures, day_ids in cached:
+                days[day].min_price, days[day].departures = min_price, departures
+                days[day].options = [rows[pk] for pk in day_ids]
+            return list(days.values())
+
+    await _acount("misses")
+    async for option in _flex_rows(_filtered(cleaned_data, source_ids, destination_ids), per_day):
+        summary = days[option.departure_date]
+        # SQLite hands the window MIN back unquantized
+        summary.min_price = Decimal(option.day_min_price).quantize(CENTS)
+        summary.departures = option.day_departures
+        summary.options.append(option)
+    await _astore(
+        cache_key,
+        [(d.date, d.min_price, d.departures, [o.pk for o in d.options]) for d in days.values() if d.options],
+    )
+    return list(days.values())
+
+
+async def asearch_facets(cleaned_data: dict, places=None) -> dict:
+    """Facet buckets for a search (see booking.facets), from one aggregate query.
+
+    Cached per route version like result pages and shared by every page of
+    the search; seat bands may therefore lag bookings by up to
+    SEARCH_CACHE_SECONDS.
+    """
+    places = places or await aresolve_places(cleaned_data)
+    source_ids, destination_ids, _ = places
+    aggregates = facet_aggregates(cleaned_data)
+    if source_ids == [] or destination_ids == []:
+        return build_facets(dict.fromkeys(aggregates, 0), cleaned_data)
+
+    cache_key = _cache_key(cleaned_data, places, "facets")
+    counts = await cache.aget(cache_key)
+    if counts is None:
+        counts = await _scoped(cleaned_data, source_ids, destination_ids).aaggregate(**aggregates)
+        await _astore(cache_key, counts)
+    return build_facets(counts, cleaned_data)
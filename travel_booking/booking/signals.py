@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .connections import graph_key, record_change, to_minutes
+from .fares import DAY_FIELDS, fare_day, refresh_fare_days
+from .models import Location, LocationAlias, TravelOption
+from .search_cache import bump_routes
+from .suggest import invalidate_index
+
+# Fields that decide which searches list a departure, and in what order or price
+# bucket (seat counts are re-read live)
+SEARCH_FIELDS = {"type", "source", "destination", "departure_date", "departure_time", "price"}
+# Fields the fare calendar aggregates
+FARE_FIELDS = SEARCH_FIELDS | {"available_seats"}
+# Fields the connection graph holds
+CONNECTION_FIELDS = SEARCH_FIELDS | {"duration"}
+
+
+def _route(option) -> tuple:
+    return option.source_location_id, option.destination_location_id
+
+
+@receiver(pre_save, sender=TravelOption)
+def travel_option_saving(sender, instance, update_fields=None, **kwargs):
+    # Remember the route, day and time being left so their cached searches, fare
+    # calendar and connection graph drop the departure too
+    instance._previous = None
+    if instance.pk and (update_fields is None or SEARCH_FIELDS & set(update_fields)):
+        instance._previous = (
+            TravelOption.objects.filter(pk=instance.pk).values_list(*DAY_FIELDS, "departure_time").first()
+        )
+
+
+@receiver(post_save, sender=TravelOption)
+def travel_option_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Seat/price edits do not change which places exist or their departure counts
+    if created or update_fields is None or {"source", "destination"} & set(update_fields):
+        transaction.on_commit(invalidate_index)
+    previous = getattr(instance, "_previous", None)
+    previous_day = previous[:4] if previous else None
+    if created or update_fields is None or SEARCH_FIELDS & set(update_fields):
+        routes = {_route(instance)}
+        if previous_day:
+            routes.add(previous_day[1:3])
+        transaction.on_commit(lambda: bump_routes(routes))
+    if created or update_fields is None or FARE_FIELDS & set(update_fields):
+        # In the saving transaction, so the calendar never shows an uncommitted schedule
+        refresh_fare_days({fare_day(instance), previous_day} - {None})
+    if created or update_fields is None or CONNECTION_FIELDS & set(update_fields):
+        if previous:
+            old_key = (previous[1], previous[2], to_minutes(previous[3], previous[4]))
+        else:
+            old_key = None if created else graph_key(instance)
+        pk = instance.pk
+        transaction.on_commit(lambda: record_change(pk, old_key))
+
+
+@receiver(post_delete, sender=TravelOption)
+def travel_option_deleted(sender, instance, **kwargs):
+    routes = {_route(instance)}
+    transaction.on_commit(lambda: bump_routes(routes))
+    transaction.on_commit(invalidate_index)
+    refresh_fare_days([fare_day(instance)])
+    # The instance loses its pk once every post_delete handler has run
+    pk, old_key = instance.pk, graph_key(instance)
+    transaction.on_commit(lambda: record_change(pk, old_key))
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+@receiver(post_save, sender=LocationAlias)
+@receiver(post_delete, sender=LocationAlias)
+def locations_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_index)
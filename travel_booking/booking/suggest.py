@@ -0,0 +1,103 @@
+import heapq
+import threading
+import uuid
+from bisect import bisect_left
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Count
+
+from .locations import normalize_location
+from .models import LocationAlias, TravelOption
+
+# Shared token telling every process when its local index is stale
+INDEX_VERSION_KEY = "booking:suggest-index-version"
+FIELDS = ("source", "destination")
+
+
+class SuggestionIndex:
+    """Sorted array of location keys answering prefix queries with bisect.
+
+    Every word start of a name is indexed ("york" finds "New York") along
+    with alias spellings, and results are ranked by departure count.
+    """
+
+    def __init__(self, counts: dict, aliases: dict):
+        self.counts = counts
+        # Shared invalidation token this index was built for (set by get_index)
+        self.version = None
+        entries = set()
+        for name in counts["any"]:
+            words = normalize_location(name).split()
+            for i in range(len(words)):
+                entries.add((" ".join(words[i:]), name))
+        for alias, name in aliases.items():
+            if name in counts["any"]:
+                entries.add((normalize_location(alias), name))
+        ordered = sorted(entries)
+        self.keys = [key for key, _ in ordered]
+        self.names = [name for _, name in ordered]
+        # Answer for an empty prefix, precomputed per field
+        self.top = {
+            field: sorted(field_counts, key=lambda n, c=field_counts: (-c[n], n))
+            for field, field_counts in counts.items()
+        }
+
+    def suggest(self, term: str, field: str = "", limit: int = 10) -> list:
+        if field not in self.counts:
+            field = "any"
+        field_counts = self.counts[field]
+        key = normalize_location(term)
+        if not key:
+            return self.top[field][:limit]
+        lo = bisect_left(self.keys, key)
+        hi = bisect_left(self.keys, key + "\uffff", lo)
+        matches = {self.names[i] for i in range(lo, hi) if self.names[i] in field_counts}
+        return heapq.nsmallest(limit, matches, key=lambda n: (-field_counts[n], n))
+
+
+def build_index() -> SuggestionIndex:
+    # Always from the primary: the index is kept until the next invalidate_index(),
+    # so one built from a lagging replica would stay stale
+    counts = {"any": {}}
+    for field in FIELDS:
+        rows = TravelOption.objects.using("default").values_list(field).annotate(n=Count("id")).order_by()
+        counts[field] = dict(rows)
+        for name, n in counts[field].items():
+            counts["any"][name] = counts["any"].get(name, 0) + n
+    aliases = dict(LocationAlias.objects.using("default").values_list("name", "location__name"))
+    return SuggestionIndex(counts, aliases)
+
+
+_lock = threading.Lock()
+_index = None
+_index_version = None
+
+
+def get_index() -> SuggestionIndex:
+    """Return this process's index, (re)building it when another writer invalidated it."""
+    global _index, _index_version
+    version = cache.get(INDEX_VERSION_KEY)
+    if version is None:
+        # Agree on one shared token so every process emits the same suggest ETags
+        cache.add(INDEX_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(INDEX_VERSION_KEY)
+    if _index is None or version != _index_version:
+        with _lock:
+            if _index is None or version != _index_version:
+                _index = build_index()
+                _index.version = version
+                _index_version = version
+    return _index
+
+
+async def aget_index() -> SuggestionIndex:
+    """get_index for async views; only a (rare) rebuild leaves the event loop."""
+    version = await cache.aget(INDEX_VERSION_KEY)
+    if _index is not None and version is not None and version == _index_version:
+        return _index
+    return await sync_to_async(get_index)()
+
+
+def invalidate_index() -> None:
+    cache.set(INDEX_VERSION_KEY, uuid.uuid4().hex, None)
@@ -1,8 +1,39 @@
-from django.test import TestCase
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time as clock
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db.models import QuerySet, Sum
+from django.db.models.signals import post_delete
+from django.db import OperationalError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.urls import reverse
-from .models import TravelOption, Booking
-from datetime import date, time
+from django.utils import timezone
+from . import connections as connection_graph
+from .fares import fare_day, rebuild_fare_calendar, refresh_fare_days
+from .holds import convert_hold, expire_holds, place_hold
+from .instrumentation import _QueryRecorder, registry
+from .models import FareDay, Location, LocationAlias, OutboxEmail, RouteBookingCounter, SeatHold, TravelOption, Booking
+from .outbox import drain_outbox, enqueue_email
+from .popular import popular_routes
+from .routers import REPLICA_ALIAS, STICKY_COOKIE
+from .search_cache import asearch_facets, asearch_flex_days, search_cache_stats
+from .suggest import invalidate_index
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
 
 
 class BookingModelTests(TestCase):
@@ -30,6 +61,8 @@ class BookingModelTests(TestCase):
 
 class BookingViewsTests(TestCase):
     def setUp(self):
+        # Search pages are cached across tests otherwise
+        cache.clear()
         self.user = User.objects.create_user(username="bob", password="pass12345")
         self.travel = TravelOption.objects.create(
             type="Train",
@@ -63,4 +96,1579 @@ class BookingViewsTests(TestCase):
         self.assertEqual(Booking.objects.filter(user=self.user).count(), 1)
 
 
+@override_settings(TRAVEL_LIST_PAGE_SIZE=2)
+class TravelListPaginationTests(TestCase):
+    def setUp(self):
+        # Search pages are cached across tests otherwise
+        cache.clear()
+        self.options = [
+            TravelOption.objects.create(
+                type="Bus",
+                source="P",
+                # Pairs share a departure slot (tie broken by id) on different routes
+                destination="Q" if i % 2 == 0 else "R",
+                departure_date=date(2025, 12, 20 + i // 2),
+                departure_time=time(8, 0),
+                price=20,
+                available_seats=10,
+            )
+            for i in range(5)
+        ]
+
+    def test_pages_follow_cursors_in_both_directions(self):
+        url = reverse("booking:travel_list")
+        first = self.client.get(url)
+        page = first.context["page"]
+        self.assertEqual([t.pk for t in page], [o.pk for o in self.options[:2]])
+        self.assertFalse(page.has_previous)
+
+        second = self.client.get(f"{url}?{page.next_query}").context["page"]
+        self.assertEqual([t.pk for t in second], [o.pk for o in self.options[2:4]])
+
+        third = self.client.get(f"{url}?{second.next_query}").context["page"]
+        self.assertEqual([t.pk for t in third], [self.options[4].pk])
+        self.assertFalse(third.has_next)
+
+        back = self.client.get(f"{url}?{third.previous_query}").context["page"]
+        self.assertEqual([t.pk for t in back], [o.pk for o in self.options[2:4]])
+
+    def test_cursor_links_keep_filters(self):
+        resp = self.client.get(reverse("booking:travel_list_by_type", args=["bus"]), {"source": "P"})
+        self.assertIn("source=P", resp.context["page"].next_query)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        resp = self.client.get(reverse("booking:travel_list"), {"after": "not-a-cursor"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context["page"].object_list[0].pk, self.options[0].pk)
+
+
+class LocationSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # The default aliases are installed by migration; make the test self-contained anyway
+        bengaluru = Location.objects.resolve("Bengaluru")
+        LocationAlias.objects.get_or_create(key="bangalore", defaults={"location": bengaluru, "name": "Bangalore"})
+        self.travel = TravelOption.objects.create(
+            type="Flight",
+            source="bangalore",
+            destination="Delhi",
+            departure_date=date(2025, 12, 20),
+            departure_time=time(7, 0),
+            price=120,
+            available_seats=30,
+        )
+
+    def test_save_resolves_aliases_to_canonical_location(self):
+        self.assertEqual(self.travel.source, "Bengaluru")
+        self.assertEqual(self.travel.source_location.key, "bengaluru")
+        self.assertEqual(self.travel.destination_location.name, "Delhi")
+
+    def test_search_matches_prefix_alias_and_folded_case(self):
+        url = reverse("booking:travel_list")
+        for term in ("Beng", "BANGALORE", "bangal"):
+            resp = self.client.get(url, {"source": term})
+            self.assertEqual([t.pk for t in resp.context["page"]], [self.travel.pk], term)
+        resp = self.client.get(url, {"source": "galuru"})
+        self.assertEqual(len(resp.context["page"]), 0)
+
+    def test_names_without_an_ascii_fold_stay_distinct(self):
+        delhi, tokyo = Location.objects.resolve("दिल्ली"), Location.objects.resolve("東京")
+        self.assertNotEqual(delhi, tokyo)
+        self.assertEqual(delhi.key, "दिल्ली")
+        self.assertEqual(Location.objects.resolve(" दिल्ली "), delhi)
+        option = TravelOption.objects.create(
+            type="Train", source="東京", destination="दिल्ली", departure_date=date(2025, 12, 20),
+            departure_time=time(7, 0), price=120, available_seats=30,
+        )
+        self.assertEqual((option.source, option.destination), ("東京", "दिल्ली"))
+        with self.assertRaises(ValidationError):
+            Location.objects.resolve("--")
+
+
+class SuggestLocationsTests(TestCase):
+    def setUp(self):
+        for source, destination in [("Mumbai", "Delhi"), ("Mumbai", "Pune"), ("New York", "Madurai")]:
+            TravelOption.objects.create(
+                type="Train",
+                source=source,
+                destination=destination,
+                departure_date=date(2025, 12, 20),
+                departure_time=time(6, 0),
+                price=40,
+                available_seats=50,
+            )
+        # on_commit hooks never fire inside TestCase, drop whatever index an earlier test built
+        invalidate_index()
+
+    def suggest(self, **params):
+        return self.client.get(reverse("booking:suggest_locations"), params).json()["results"]
+
+    def test_ranked_by_departure_count(self):
+        self.assertEqual(self.suggest(q="m"), ["Mumbai", "Madurai"])
+        self.assertEqual(self.suggest(q="m", field="destination"), ["Madurai"])
+
+    def test_matches_word_starts_and_aliases(self):
+        self.assertEqual(self.suggest(q="york"), ["New York"])
+        self.assertEqual(self.suggest(q="bomb"), ["Mumbai"])
+
+    def test_answers_from_memory_and_rebuilds_on_change(self):
+        self.suggest(q="p")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest(q="p"), ["Pune"])
+        with self.captureOnCommitCallbacks(execute=True):
+            TravelOption.objects.create(
+                type="Bus",
+                source="Patna",
+                destination="Pune",
+                departure_date=date(2025, 12, 21),
+                departure_time=time(6, 0),
+                price=10,
+                available_seats=20,
+            )
+        self.assertEqual(self.suggest(q="p"), ["Pune", "Patna"])
+
+
+class PopularRoutesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="dora", password="pass12345")
+        self.travel = TravelOption.objects.create(
+            type="Bus",
+            source="Agra",
+            destination="Jaipur",
+            departure_date=date(2025, 12, 22),
+            departure_time=time(11, 0),
+            price=15,
+            available_seats=40,
+        )
+        self.client.login(username="dora", password="pass12345")
+        cache.clear()
+
+    def book(self):
+        self.client.post(
+            reverse("booking:create_booking", args=[self.travel.id]),
+            {"number_of_seats": 1, "passenger_payload": '[{"name": "Dora", "age": 30}]'},
+        )
+        return Booking.objects.latest("pk")
+
+    def test_booking_and_cancel_maintain_hourly_bucket(self):
+        self.book()
+        booking = self.book()
+        self.assertEqual(RouteBookingCounter.objects.get(source="Agra", destination="Jaipur").count, 2)
+        self.client.get(reverse("booking:cancel_booking", args=[booking.id]))
+        self.assertEqual(RouteBookingCounter.objects.get().count, 1)
+        self.assertEqual(popular_routes(), [{"source": "Agra", "destination": "Jaipur", "count": 1}])
+
+    def test_backfill_command_rebuilds_from_history(self):
+        self.book()
+        RouteBookingCounter.objects.all().delete()
+        call_command("backfill_route_counters", stdout=StringIO())
+        self.assertEqual(RouteBookingCounter.objects.get().count, 1)
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="erin", password="pass12345", email="erin@example.com")
+        self.travel = TravelOption.objects.create(
+            type="Flight",
+            source="Delhi",
+            destination="Goa",
+            departure_date=date(2025, 12, 23),
+            departure_time=time(13, 0),
+            price=90,
+            available_seats=10,
+        )
+        self.client.login(username="erin", password="pass12345")
+
+    def test_booking_queues_email_instead_of_sending(self):
+        self.client.post(
+            reverse("booking:create_booking", args=[self.travel.id]),
+            {"number_of_seats": 1, "passenger_payload": '[{"name": "Erin", "age": 41}]'},
+        )
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboxEmail.objects.get()
+        self.assertEqual(queued.recipient, "erin@example.com")
+
+        self.assertEqual(drain_outbox(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, "Booking Confirmed")
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, OutboxEmail.Status.SENT)
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_send_backs_off_then_gives_up(self):
+        email = enqueue_email("Subject", "Body", "x@example.com")
+        with mock.patch("booking.outbox.EmailMessage.send", side_effect=OSError("smtp down")):
+            self.assertEqual(drain_outbox(), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutboxEmail.Status.PENDING)
+            self.assertGreater(email.next_attempt_at, timezone.now())
+            # Not due yet
+            self.assertEqual(drain_outbox(), (0, 0))
+            OutboxEmail.objects.update(next_attempt_at=timezone.now())
+            drain_outbox()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.Status.FAILED)
+        self.assertEqual(email.last_error, "smtp down")
+
+
+class SeatReservationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="finn", password="pass12345")
+        self.travel = TravelOption.objects.create(
+            type="Train",
+            source="Pune",
+            destination="Nagpur",
+            departure_date=date(2025, 12, 24),
+            departure_time=time(22, 0),
+            price=35,
+            available_seats=2,
+        )
+        self.client.login(username="finn", password="pass12345")
+
+    def test_reserve_seats_is_conditional(self):
+        self.assertTrue(TravelOption.objects.reserve_seats(self.travel.pk, 2))
+        self.assertFalse(TravelOption.objects.reserve_seats(self.travel.pk, 1))
+        self.travel.refresh_from_db()
+        self.assertEqual(self.travel.available_seats, 0)
+
+    def test_overbooking_is_rejected_without_inserting_booking(self):
+        payload = '[{"name": "A", "age": 20}, {"name": "B", "age": 21}, {"name": "C", "age": 22}]'
+        resp = self.client.post(
+            reverse("booking:create_booking", args=[self.travel.id]),
+            {"number_of_seats": 3, "passenger_payload": payload},
+        )
+        self.assertContains(resp, "Not enough seats available.")
+        self.assertFalse(Booking.objects.exists())
+        self.travel.refresh_from_db()
+        self.assertEqual(self.travel.available_seats, 2)
+
+    def test_form_get_does_not_lock(self):
+        with mock.patch.object(QuerySet, "select_for_update") as select_for_update:
+            resp = self.client.get(reverse("booking:create_booking", args=[self.travel.id]))
+        self.assertEqual(resp.status_code, 200)
+        select_for_update.assert_not_called()
+
+
+class SeatHoldTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="gus", password="pass12345")
+        self.travel = TravelOption.objects.create(
+            type="Bus",
+            source="Surat",
+            destination="Rajkot",
+            departure_date=date(2025, 12, 26),
+            departure_time=time(5, 0),
+            price=12,
+            available_seats=5,
+        )
+        self.url = reverse("booking:create_booking", args=[self.travel.id])
+        self.client.login(username="gus", password="pass12345")
+
+    def seats_left(self):
+        self.travel.refresh_from_db()
+        return self.travel.available_seats
+
+    def test_opening_form_holds_seats_once(self):
+        self.client.get(self.url, {"seats": 2})
+        self.client.get(self.url, {"seats": 2})
+        self.assertEqual(SeatHold.objects.get().seats, 2)
+        self.assertEqual(self.seats_left(), 3)
+
+    def test_submit_converts_hold_and_tops_up_difference(self):
+        self.client.get(self.url, {"seats": 1})
+        payload = '[{"name": "Gus", "age": 33}, {"name": "Ida", "age": 31}]'
+        self.client.post(self.url, {"number_of_seats": 2, "passenger_payload": payload})
+        self.assertEqual(SeatHold.objects.get().status, SeatHold.Status.CONVERTED)
+        self.assertEqual(Booking.objects.get().number_of_seats, 2)
+        self.assertEqual(self.seats_left(), 3)
+
+    def test_sweeper_releases_expired_holds_per_departure(self):
+        other = User.objects.create_user(username="hal", password="pass12345")
+        self.client.get(self.url, {"seats": 2})
+        place_hold(other, self.travel, 1)
+        self.assertEqual(self.seats_left(), 2)
+        SeatHold.objects.update(expires_at=timezone.now())
+        # savepoint, select, mark expired (once per hold where the select cannot lock),
+        # one seat UPDATE, release savepoint
+        with self.assertNumQueries(5 if connection.features.has_select_for_update_skip_locked else 6):
+            self.assertEqual(expire_holds(), (2, 3))
+        self.assertEqual(self.seats_left(), 5)
+        self.assertFalse(SeatHold.objects.filter(status=SeatHold.Status.ACTIVE).exists())
+
+    def test_sweeper_skips_holds_converted_after_its_select(self):
+        hold = place_hold(self.user, self.travel, 2)
+        SeatHold.objects.update(expires_at=timezone.now())
+
+        def converted_meanwhile(rows):
+            rows = [*rows]
+            convert_hold(hold)
+            return rows
+
+        with mock.patch.object(connection.features, "has_select_for_update_skip_locked", False):
+            with mock.patch("booking.holds.list", side_effect=converted_meanwhile, create=True):
+                self.assertEqual(expire_holds(), (0, 0))
+        self.assertEqual(SeatHold.objects.get().status, SeatHold.Status.CONVERTED)
+        self.assertEqual(self.seats_left(), 3)
+
+
+class BulkBookingApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="ivy", password="pass12345")
+        self.first, self.second = [
+            TravelOption.objects.create(
+                type="Flight",
+                source="Chennai",
+                destination=destination,
+                departure_date=date(2025, 12, 27),
+                departure_time=time(9, 0),
+                price=100,
+                available_seats=3,
+            )
+            for destination in ("Kolkata", "Madurai")
+        ]
+        self.client.login(username="ivy", password="pass12345")
+
+    def post(self, items, mode="all_or_nothing"):
+        return self.client.post(
+            reverse("booking:bulk_create_bookings"),
+            data=json.dumps({"mode": mode, "items": items}),
+            content_type="application/json",
+        )
+
+    def item(self, option, seats):
+        return {
+            "travel_option_id": option.pk,
+            "seats": seats,
+            "passengers": [{"name": f"P{i}", "age": 30} for i in range(seats)],
+        }
+
+    def seats_left(self, option):
+        option.refresh_from_db()
+        return option.available_seats
+
+    def test_batch_books_everything_in_one_transaction(self):
+        resp = self.post([self.item(self.first, 2), self.item(self.second, 1), self.item(self.first, 1)])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([r["status"] for r in resp.json()["results"]], ["confirmed"] * 3)
+        self.assertEqual(self.seats_left(self.first), 0)
+        self.assertEqual(self.seats_left(self.second), 2)
+        self.assertEqual(Booking.objects.get(pk=resp.json()["results"][0]["booking_id"]).total_price, 200)
+
+    def test_all_or_nothing_rolls_back_on_any_rejection(self):
+        resp = self.post([self.item(self.second, 1), self.item(self.first, 4)])
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual([r["status"] for r in resp.json()["results"]], ["aborted", "rejected"])
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(self.seats_left(self.second), 3)
+
+    def test_partial_mode_books_what_fits(self):
+        resp = self.post([self.item(self.first, 2), self.item(self.first, 2), {"seats": 1}], mode="partial")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([r["status"] for r in resp.json()["results"]], ["confirmed", "rejected", "rejected"])
+        self.assertEqual(self.seats_left(self.first), 1)
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.post([self.item(self.first, 1)]).status_code, 401)
+
+    def test_malformed_passengers_are_rejected_not_raised(self):
+        items = [
+            {"travel_option_id": self.first.pk, "seats": 1, "passengers": ["x"]},
+            {"travel_option_id": self.first.pk, "seats": 1, "passengers": [{"name": "a", "age": "abc"}]},
+            {"travel_option_id": self.second.pk, "seats": 1, "passengers": {"a": 1}},
+        ]
+        resp = self.post(items, mode="partial")
+        self.assertEqual(resp.status_code, 409)
+        results = resp.json()["results"]
+        self.assertEqual([r["status"] for r in results], ["rejected"] * 3)
+        self.assertIn("list of objects", results[0]["error"])
+        self.assertIn("name and age", results[1]["error"])
+        self.assertIn("list of objects", results[2]["error"])
+        self.assertFalse(Booking.objects.exists())
+
+    def test_booking_ids_without_bulk_insert_returning(self):
+        self.user.email = "ivy@example.com"
+        self.user.save()
+        # A property on SQLite's features, so patch the class
+        with mock.patch.object(type(connection.features), "can_return_rows_from_bulk_insert", False):
+            with mock.patch.object(Booking.objects, "bulk_create", side_effect=AssertionError):
+                resp = self.post([self.item(self.first, 1), self.item(self.second, 1)])
+        ids = [r["booking_id"] for r in resp.json()["results"]]
+        self.assertEqual(sorted(ids), sorted(Booking.objects.values_list("pk", flat=True)))
+        self.assertIn(f"#{ids[0]}:", OutboxEmail.objects.get().body)
+
+    def test_failed_seat_reservation_rolls_the_batch_back(self):
+        with mock.patch.object(TravelOption.objects, "reserve_seats", return_value=False):
+            resp = self.post([self.item(self.first, 1), self.item(self.second, 1)], mode="partial")
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual([r["status"] for r in resp.json()["results"]], ["rejected", "aborted"])
+        self.assertFalse(Booking.objects.exists())
+
+
+class SeedCommandTests(TestCase):
+    def seed(self, **options):
+        call_command("seed_travel_options", start_date=date(2026, 1, 1), stdout=StringIO(), **options)
+        return list(
+            TravelOption.objects.order_by("pk").values_list(
+                "type", "source", "destination", "departure_date", "departure_time", "price", "available_seats"
+            )
+        )
+
+    def test_same_seed_gives_same_rows(self):
+        first = self.seed(count=50, seed=42, batch_size=7)
+        second = self.seed(count=50, seed=42, clear=True)
+        self.assertEqual(len(first), 50)
+        self.assertEqual(first, second)
+
+    def test_clear_skips_the_per_row_delete_hooks(self):
+        self.seed(count=20, seed=1, users=2, bookings=10)
+        with mock.patch.object(post_delete, "send", wraps=post_delete.send) as send:
+            rows = self.seed(count=5, seed=2, clear=True)
+        self.assertEqual(sum(call.kwargs.get("sender") is TravelOption for call in send.call_args_list), 0)
+        self.assertEqual(len(rows), 5)
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(FareDay.objects.aggregate(n=Sum("departures"))["n"], 5)
+
+    def test_bookings_are_consistent_with_seats(self):
+        self.seed(count=20, seed=1, users=3, bookings=40)
+        self.assertEqual(User.objects.filter(username__startswith="seed_user_").count(), 3)
+        self.assertTrue(Booking.objects.exists())
+        for option in TravelOption.objects.all():
+            booked = sum(b.number_of_seats for b in option.booking_set.all())
+            self.assertIn(option.available_seats + booked, (40, 50, 60, 80, 120))
+            self.assertIsNotNone(option.source_location_id)
+        self.assertEqual(
+            sum(RouteBookingCounter.objects.values_list("count", flat=True)), Booking.objects.count()
+        )
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        self.metrics_dir = tempfile.mkdtemp()
+        override = override_settings(
+            MIDDLEWARE=["booking.instrumentation.RequestMetricsMiddleware", *settings.MIDDLEWARE],
+            REQUEST_METRICS_ENABLED=True,
+            REQUEST_METRICS_DIR=self.metrics_dir,
+            REQUEST_METRICS_FLUSH_SECONDS=0,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        registry.reset()
+        self.addCleanup(registry.reset)
+        TravelOption.objects.create(
+            type="Bus",
+            source="Pune",
+            destination="Goa",
+            departure_date=date(2030, 3, 1),
+            departure_time=time(8, 0),
+            price=20,
+            available_seats=30,
+        )
+
+    def test_records_sql_and_template_time_per_view(self):
+        self.client.get(reverse("booking:travel_list"))
+        self.client.get(reverse("booking:travel_list"))
+        stats = registry.snapshot()["GET booking:travel_list"]
+        self.assertEqual(stats["requests"], 2)
+        self.assertGreater(stats["queries"], 0)
+        self.assertGreater(stats["template_ms"], 0)
+        self.assertEqual(sum(stats["histogram"]), 2)
+
+    def test_endpoint_is_staff_only(self):
+        self.client.get(reverse("booking:travel_list"))
+        url = reverse("booking:request_metrics")
+        User.objects.create_user(username="plain", password="pass12345")
+        self.client.login(username="plain", password="pass12345")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        User.objects.create_user(username="ops", password="pass12345", is_staff=True)
+        self.client.login(username="ops", password="pass12345")
+        views = self.client.get(url, {"scope": "all"}).json()["views"]
+        self.assertEqual(views["GET booking:travel_list"]["requests"], 1)
+
+    def test_command_merges_published_snapshots(self):
+        self.client.get(reverse("booking:travel_list"))
+        out = StringIO()
+        call_command("request_metrics", "--json", stdout=out)
+        self.assertEqual(json.loads(out.getvalue())["GET booking:travel_list"]["requests"], 1)
+
+
+class SearchCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("booking:travel_list")
+        self.option = self.create("Pune", "Goa")
+
+    def create(self, source, destination, **extra):
+        with self.captureOnCommitCallbacks(execute=True):
+            return TravelOption.objects.create(
+                type="Bus",
+                source=source,
+                destination=destination,
+                departure_date=extra.pop("departure_date", date(2030, 3, 1)),
+                departure_time=time(8, 0),
+                price=20,
+                available_seats=30,
+                **extra,
+            )
+
+    def search(self, **params):
+        return [t.pk for t in self.client.get(self.url, params).context["page"]]
+
+    def test_repeat_search_is_served_from_cache(self):
+        self.assertEqual(self.search(source="pune", destination="goa"), [self.option.pk])
+        self.assertEqual(search_cache_stats()["misses"], 1)
+        self.assertEqual(self.search(source="pune", destination="goa"), [self.option.pk])
+        self.assertEqual(search_cache_stats()["hits"], 1)
+
+    def test_new_departure_on_route_invalidates(self):
+        self.search(source="pune", destination="goa")
+        other_route = self.search(source="pune", destination="delhi")
+        added = self.create("Pune", "Goa", departure_date=date(2030, 3, 2))
+        self.assertEqual(self.search(source="pune", destination="goa"), [self.option.pk, added.pk])
+        self.search(source="pune", destination="delhi")
+        # The unrelated route kept its cached page
+        self.assertEqual(search_cache_stats()["hits"], 1)
+        self.assertEqual(other_route, [])
+
+    def test_cached_page_shows_live_seat_counts(self):
+        self.client.get(self.url, {"source": "pune"})
+        TravelOption.objects.reserve_seats(self.option.pk, 5)
+        page = self.client.get(self.url, {"source": "pune"}).context["page"]
+        self.assertEqual(search_cache_stats()["hits"], 1)
+        self.assertEqual(page.object_list[0].available_seats, 25)
+
+    def test_moving_departure_drops_it_from_old_route(self):
+        self.assertEqual(self.search(source="pune", destination="goa"), [self.option.pk])
+        self.option.destination = "Mumbai"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.option.save()
+        self.assertEqual(self.search(source="pune", destination="goa"), [])
+
+
+class ConditionalListingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("booking:travel_list")
+        self.first, self.second = [
+            TravelOption.objects.create(
+                type="Train",
+                source="Surat",
+                destination=destination,
+                departure_date=date(2030, 4, 1),
+                departure_time=time(6, 0),
+                price=30,
+                available_seats=40,
+            )
+            for destination in ("Agra", "Patna")
+        ]
+
+    def test_unchanged_listing_answers_304_without_rendering(self):
+        resp = self.client.get(self.url, {"source": "surat"})
+        self.assertTrue(resp.has_header("ETag"))
+        self.assertTrue(resp.has_header("Last-Modified"))
+        again = self.client.get(self.url, {"source": "surat"}, HTTP_IF_NONE_MATCH=resp["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.templates, [])
+
+    def test_seat_change_produces_new_etag(self):
+        etag = self.client.get(self.url, {"source": "surat"})["ETag"]
+        TravelOption.objects.reserve_seats(self.first.pk, 2)
+        resp = self.client.get(self.url, {"source": "surat"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], etag)
+        self.assertContains(resp, "38 seats")
+
+    def test_only_changed_cards_are_rerendered(self):
+        self.client.get(self.url, {"source": "surat"})
+        TravelOption.objects.reserve_seats(self.first.pk, 5)
+        # Bypasses updated_at, so the cached card for this departure is reused
+        TravelOption.objects.filter(pk=self.second.pk).update(available_seats=1)
+        resp = self.client.get(self.url, {"source": "surat"})
+        self.assertContains(resp, "35 seats")
+        self.assertContains(resp, "40 seats")
+        self.assertNotContains(resp, "1 seats")
+
+    def test_suggest_revalidates(self):
+        invalidate_index()
+        url = reverse("booking:suggest_locations")
+        resp = self.client.get(url, {"q": "sur"})
+        self.assertEqual(resp.json()["results"], ["Surat"])
+        self.assertEqual(self.client.get(url, {"q": "SUR"}, HTTP_IF_NONE_MATCH=resp["ETag"]).status_code, 304)
+        invalidate_index()
+        self.assertEqual(self.client.get(url, {"q": "sur"}, HTTP_IF_NONE_MATCH=resp["ETag"]).status_code, 200)
+
+
+class SearchApiTests(TestCase):
+    def setUp(self):
+        self.url = reverse("booking:search_api")
+        self.options = [
+            TravelOption.objects.create(
+                type=travel_type,
+                source="Kochi",
+                destination="Madurai",
+                departure_date=date(2030, 5, 1),
+                departure_time=time(hour, 0),
+                price=15,
+                available_seats=20,
+            )
+            for travel_type, hour in (("Bus", 9), ("Train", 7), ("Bus", 11))
+        ]
+
+    def body(self, resp):
+        self.assertTrue(resp.streaming)
+        return b"".join(resp.streaming_content).decode()
+
+    def test_ndjson_streams_matching_rows_in_listing_order(self):
+        resp = self.client.get(self.url, {"source": "koc", "type": "Bus", "fields": "id,departure_time,price"})
+        self.assertEqual(resp["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in self.body(resp).splitlines()]
+        self.assertEqual(
+            rows,
+            [
+                {"id": self.options[0].pk, "departure_time": "09:00:00", "price": "15.00"},
+                {"id": self.options[2].pk, "departure_time": "11:00:00", "price": "15.00"},
+            ],
+        )
+
+    @override_settings(SEARCH_EXPORT_CHUNK_SIZE=2)
+    def test_json_document_across_chunks(self):
+        data = json.loads(self.body(self.client.get(self.url, {"format": "json", "fields": "id"})))
+        self.assertEqual(data["fields"], ["id"])
+        expected = [self.options[1].pk, self.options[0].pk, self.options[2].pk]
+        self.assertEqual([r["id"] for r in data["results"]], expected)
+
+    def test_rejects_bad_parameters(self):
+        self.assertEqual(self.client.get(self.url, {"fields": "id,password"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"format": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"date": "not-a-date"}).status_code, 400)
+
+
+class ImportScheduleTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="ops", password="pass12345")
+
+    def run_import(self, text, fmt="csv", **options):
+        path = tempfile.NamedTemporaryFile("w", suffix=f".{fmt}", delete=False)
+        with path:
+            path.write(text)
+        self.addCleanup(os.remove, path.name)
+        out, err = StringIO(), StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("import_schedule", path.name, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_inserts_then_upserts_on_natural_key(self):
+        header = "type,source,destination,departure_date,departure_time,price,seats\n"
+        out, _ = self.run_import(
+            header + "bus,Pune,Goa,2030-06-01,08:00,25.50,40\ntrain,Bangalore,Delhi,2030-06-01,21:00,60,300\n"
+        )
+        self.assertIn("Inserted 2, updated 0, rejected 0", out)
+        self.assertEqual(TravelOption.objects.get(type="Train").source, "Bengaluru")
+
+        out, _ = self.run_import(header + "Bus,pune,goa,2030-06-01,08:00:00,30,45\n", chunk_size=1)
+        self.assertIn("Inserted 0, updated 1, rejected 0", out)
+        bus = TravelOption.objects.get(type="Bus")
+        self.assertEqual((bus.price, bus.available_seats), (30, 45))
+        self.assertEqual(TravelOption.objects.count(), 2)
+
+    def test_capacity_never_drops_below_seats_sold(self):
+        option = TravelOption.objects.create(
+            type="Bus",
+            source="Pune",
+            destination="Goa",
+            departure_date=date(2030, 6, 1),
+            departure_time=time(8, 0),
+            price=25,
+            available_seats=40,
+        )
+        Booking.objects.create(user=self.user, travel_option=option, number_of_seats=6, total_price=0)
+        TravelOption.objects.reserve_seats(option.pk, 6)
+        feed = (
+            '{"type": "Bus", "source": "Pune", "destination": "Goa", "departure_date": "2030-06-01",'
+            ' "departure_time": "08:00", "price": "25", "seats": 50}\n'
+        )
+        self.run_import(feed, fmt="ndjson")
+        option.refresh_from_db()
+        self.assertEqual(option.available_seats, 44)
+
+        out, err = self.run_import(feed.replace('"seats": 50', '"seats": 5'), fmt="ndjson")
+        self.assertIn("rejected 1", out)
+        self.assertIn("already booked", err)
+        option.refresh_from_db()
+        self.assertEqual(option.available_seats, 44)
+
+    def test_upsert_names_no_conflict_target_where_the_backend_takes_none(self):
+        feed = "type,source,destination,departure_date,departure_time,price,seats\nBus,Pune,Goa,2030-06-01,08:00,25,40\n"
+        with mock.patch.object(connection.features, "supports_update_conflicts_with_target", False):
+            with mock.patch.object(TravelOption.objects, "bulk_create") as bulk_create:
+                self.run_import(feed)
+        self.assertIsNone(bulk_create.call_args.kwargs["unique_fields"])
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        out, err = self.run_import(
+            "type,source,destination,departure_date,departure_time,price,seats\n"
+            "Boat,Pune,Goa,2030-06-01,08:00,25,40\n"
+            "Bus,Pune,Pune,2030-06-01,08:00,25,40\n"
+            "Bus,Pune,Goa,tomorrow,08:00,25,40\n"
+            "Bus,Pune,Goa,2030-06-01,08:00,25,40\n"
+        )
+        self.assertIn("Inserted 1, updated 0, rejected 3", out)
+        self.assertIn("line 2: type: unknown travel type 'Boat'.", err)
+
+
+class BookingHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="carol", password="pass12345")
+        self.client.login(username="carol", password="pass12345")
+        self.url = reverse("booking:booking_history")
+        today = timezone.localdate()
+        self.later, self.earlier = [
+            TravelOption.objects.create(
+                type="Bus",
+                source="Pune",
+                destination="Goa",
+                departure_date=day,
+                departure_time=time(9, 0),
+                price=20,
+                available_seats=100,
+            )
+            for day in (today + timedelta(days=30), today - timedelta(days=30))
+        ]
+
+    def _book(self, travel, status=Booking.Status.CONFIRMED):
+        return Booking.objects.create(
+            user=self.user,
+            travel_option=travel,
+            number_of_seats=1,
+            primary_passenger_name="Carol",
+            passenger_details=[{"name": "Carol", "age": 30}],
+            status=status,
+        )
+
+    def _ids(self, resp):
+        return [b.pk for b in resp.context["bookings"]]
+
+    def test_tabs_split_bookings(self):
+        upcoming = self._book(self.later)
+        past = self._book(self.earlier)
+        cancelled = self._book(self.later, status=Booking.Status.CANCELLED)
+        Booking.objects.create(
+            user=User.objects.create_user(username="dave"), travel_option=self.later, number_of_seats=1
+        )
+        self.assertEqual(self._ids(self.client.get(self.url)), [upcoming.pk])
+        self.assertEqual(self._ids(self.client.get(self.url, {"tab": "past"})), [past.pk])
+        self.assertEqual(self._ids(self.client.get(self.url, {"tab": "cancelled"})), [cancelled.pk])
+
+    @override_settings(BOOKING_HISTORY_PAGE_SIZE=2)
+    def test_pages_newest_first(self):
+        bookings = [self._book(self.later) for _ in range(5)]
+        expected = [b.pk for b in sorted(bookings, key=lambda b: (b.booking_date, b.pk), reverse=True)]
+        seen, params = [], {"tab": "upcoming"}
+        while True:
+            page = self.client.get(self.url, params).context["page"]
+            seen += [b.pk for b in page]
+            if not page.has_next:
+                break
+            params = {"tab": "upcoming", "after": page.next_cursor}
+        self.assertEqual(seen, expected)
+        back = self.client.get(self.url, {"tab": "upcoming", "before": page.previous_cursor})
+        self.assertEqual(self._ids(back), expected[2:4])
+
+    def test_passenger_details_not_loaded(self):
+        self._book(self.later)
+        resp = self.client.get(self.url)
+        booking = resp.context["bookings"].object_list[0]
+        self.assertIn("passenger_details", booking.get_deferred_fields())
+        self.assertContains(resp, "Pune")
+
+
+class BookingQueryCountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="erin", password="pass12345")
+        self.client.login(username="erin", password="pass12345")
+        self.travel = TravelOption.objects.create(
+            type="Bus",
+            source="Pune",
+            destination="Goa",
+            departure_date=date(2031, 1, 1),
+            departure_time=time(9, 0),
+            price=20,
+            available_seats=10,
+        )
+        self.url = reverse("booking:create_booking", args=[self.travel.pk])
+        self.client.get(self.url, {"seats": 2})
+        self.payload = {
+            "number_of_seats": 2,
+            "passenger_payload": json.dumps([{"name": "Erin", "age": 30}, {"name": "Finn", "age": 31}]),
+        }
+
+    def test_booking_queries(self):
+        # session, user, option, hold, convert hold, insert booking,
+        # counter update + insert (first of the hour), savepoints
+        with self.assertNumQueries(12):
+            resp = self.client.post(self.url, self.payload)
+        self.assertEqual(resp.status_code, 302)
+        booking = Booking.objects.get()
+        self.assertEqual((booking.unit_price, booking.total_price), (20, 40))
+
+    def test_cancel_only_writes_status(self):
+        self.client.post(self.url, self.payload)
+        booking = Booking.objects.get()
+        TravelOption.objects.filter(pk=self.travel.pk).update(price=99)
+        url = reverse("booking:cancel_booking", args=[booking.pk])
+        # session, user, booking, locked option, seats, status, counter, savepoints
+        with self.assertNumQueries(9) as ctx:
+            self.client.get(url)
+        update = next(q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "booking_booking"'))
+        self.assertNotIn("total_price", update)
+        booking.refresh_from_db()
+        self.assertEqual((booking.status, booking.total_price), (Booking.Status.CANCELLED, 40))
+
+    def test_price_is_snapshotted(self):
+        booking = Booking.objects.create(user=self.user, travel_option=self.travel, number_of_seats=3)
+        self.travel.price = 50
+        self.travel.save()
+        booking = Booking.objects.get(pk=booking.pk)
+        booking.number_of_seats = 1
+        booking.save(update_fields=["number_of_seats"])
+        booking.refresh_from_db()
+        self.assertEqual((booking.unit_price, booking.total_price), (20, 20))
+
+
+class AsyncViewTests(TestCase):
+    """Search and suggestions through the ASGI handler (async ORM, no sync DB access)."""
+
+    def setUp(self):
+        cache.clear()
+        invalidate_index()
+        self.user = User.objects.create_user(username="gina", password="pass12345")
+        self.travel = TravelOption.objects.create(
+            type="Flight",
+            source="Kochi",
+            destination="Chennai",
+            departure_date=date(2031, 3, 1),
+            departure_time=time(7, 30),
+            price=80,
+            available_seats=30,
+        )
+
+    async def test_search_pages_render_for_signed_in_user(self):
+        await self.async_client.aforce_login(self.user)
+        resp = await self.async_client.get(reverse("booking:travel_list"), {"source": "koc"})
+        self.assertContains(resp, "Chennai")
+        self.assertContains(resp, "My Bookings")
+        resp = await self.async_client.get(reverse("booking:travel_list_by_type", args=["flight"]))
+        self.assertEqual([t.pk for t in resp.context["page"]], [self.travel.pk])
+        again = await self.async_client.get(reverse("booking:travel_list"), {"source": "koc"})
+        self.assertEqual(search_cache_stats()["hits"], 1)
+        self.assertEqual(again.status_code, 200)
+
+    async def test_suggestions(self):
+        resp = await self.async_client.get(reverse("booking:suggest_locations"), {"q": "ch"})
+        self.assertEqual(resp.json()["results"], ["Chennai"])
+        again = await self.async_client.get(
+            reverse("booking:suggest_locations"), {"q": "ch"}, headers={"if-none-match": resp["ETag"]}
+        )
+        self.assertEqual(again.status_code, 304)
+
+    async def test_booking_still_served_by_sync_view(self):
+        await self.async_client.aforce_login(self.user)
+        resp = await self.async_client.post(
+            reverse("booking:create_booking", args=[self.travel.pk]),
+            {"number_of_seats": 1, "passenger_payload": json.dumps([{"name": "Gina", "age": 40}])},
+        )
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(await Booking.objects.filter(user=self.user).acount(), 1)
+
+
+CONCURRENT_ALIAS = "concurrent"
+
+
+def lock_wait_behind_holder(alias: str, pk: int, hold_seconds: float = 0.2) -> float:
+    """lock_wait_ms recorded for a locking read issued while another thread holds the lock."""
+    options = TravelOption.objects.db_manager(alias)
+    locked = threading.Event()
+
+    def hold():
+        try:
+            with transaction.atomic(using=alias):
+                options.select_for_update().get(pk=pk)
+                locked.set()
+                clock.sleep(hold_seconds)
+        finally:
+            connections[alias].close()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    locked.wait(5)
+    sample = {"queries": 0, "sql_ms": 0.0, "duplicate_queries": 0, "lock_wait_ms": 0.0}
+    with connections[alias].execute_wrapper(_QueryRecorder(sample)):
+        with transaction.atomic(using=alias):
+            options.select_for_update().get(pk=pk)
+    holder.join()
+    return sample["lock_wait_ms"]
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite concurrent mode")
+class SQLiteConcurrentModeTests(TransactionTestCase):
+    """Threads booking on a copy of the test database in a file opened with SQLITE_CONCURRENT_OPTIONS."""
+
+    @classmethod
+    def setUpClass(cls):
+        handle, cls.db_file = tempfile.mkstemp(suffix=".sqlite3", prefix="concurrent-")
+        os.close(handle)
+        connections.settings[CONCURRENT_ALIAS] = {
+            **connections.settings["default"],
+            "NAME": cls.db_file,
+            "OPTIONS": {**settings.SQLITE_CONCURRENT_OPTIONS, "timeout": 5},
+        }
+        cls.databases = {"default", CONCURRENT_ALIAS}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[CONCURRENT_ALIAS].close()
+        del connections[CONCURRENT_ALIAS]
+        del connections.settings[CONCURRENT_ALIAS]
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(cls.db_file + suffix):
+                os.remove(cls.db_file + suffix)
+
+    def setUp(self):
+        self.travel = TravelOption.objects.create(
+            type="Bus", source="A", destination="B", departure_date=date.today() + timedelta(days=3),
+            departure_time=time(9, 0), price=10, available_seats=40,
+        )
+        connections.settings[CONCURRENT_ALIAS]["OPTIONS"]["transaction_mode"] = "IMMEDIATE"
+        connections[CONCURRENT_ALIAS].close()
+        connection.ensure_connection()
+        target = sqlite3.connect(self.db_file)
+        connection.connection.backup(target)
+        target.close()
+
+    def book_from_threads(self, transaction_mode: str, workers: int = 4, rounds: int = 5) -> list:
+        """Each thread reads the departure, then takes a seat in the same transaction, like a booking."""
+        connections.settings[CONCURRENT_ALIAS]["OPTIONS"]["transaction_mode"] = transaction_mode
+        errors = []
+        options = TravelOption.objects.db_manager(CONCURRENT_ALIAS)
+
+        def book():
+            try:
+                for _ in range(rounds):
+                    with transaction.atomic(using=CONCURRENT_ALIAS):
+                        travel = options.select_for_update().get(pk=self.travel.pk)
+                        # Hold the read open so the other threads start their transactions meanwhile
+                        clock.sleep(0.01)
+                        options.reserve_seats(travel.pk, 1)
+            except OperationalError as exc:
+                errors.append(str(exc))
+            finally:
+                connections[CONCURRENT_ALIAS].close()
+
+        threads = [threading.Thread(target=book) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_connection_is_in_wal_and_waits_for_the_lock(self):
+        with connections[CONCURRENT_ALIAS].cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+        self.assertEqual(connections[CONCURRENT_ALIAS].transaction_mode, "IMMEDIATE")
+
+    def test_concurrent_bookings_wait_instead_of_failing(self):
+        self.assertEqual(self.book_from_threads("IMMEDIATE"), [])
+        self.assertEqual(TravelOption.objects.using(CONCURRENT_ALIAS).get(pk=self.travel.pk).available_seats, 20)
+
+    def test_deferred_transactions_fail_on_the_lock_upgrade(self):
+        # What IMMEDIATE prevents: readers that later write can not wait for the lock
+        errors = self.book_from_threads("DEFERRED")
+        self.assertTrue(errors)
+        self.assertIn("database is locked", errors[0])
+
+    def test_cancel_keeps_seats_consistent(self):
+        user = User.objects.create_user(username="locker", password="pass12345")
+        travel = self.travel
+        self.client.force_login(user)
+        self.client.post(
+            reverse("booking:create_booking", args=[travel.pk]),
+            {"number_of_seats": 2, "passenger_payload": json.dumps([{"name": "L", "age": 30}] * 2)},
+        )
+        booking = Booking.objects.get(user=user)
+        self.assertEqual(self.client.get(reverse("booking:cancel_booking", args=[booking.pk])).status_code, 302)
+        travel.refresh_from_db()
+        self.assertEqual(travel.available_seats, 40)
+
+    def test_lock_wait_metric_times_begin_immediate(self):
+        self.assertGreaterEqual(lock_wait_behind_holder(CONCURRENT_ALIAS, self.travel.pk), 100)
+
+
+@skipUnless(connection.vendor == "mysql", "row locks need SELECT ... FOR UPDATE")
+class MySQLLockWaitTests(TransactionTestCase):
+    def test_lock_wait_metric_times_select_for_update(self):
+        travel = TravelOption.objects.create(
+            type="Bus", source="A", destination="B", departure_date=date.today() + timedelta(days=3),
+            departure_time=time(9, 0), price=10, available_seats=40,
+        )
+        self.assertGreaterEqual(lock_wait_behind_holder("default", travel.pk), 100)
+
+
+@skipUnless(connection.vendor == "sqlite", "replica fixture copies SQLite databases")
+@override_settings(
+    DATABASE_ROUTERS=["booking.routers.ReplicaRouter"],
+    MIDDLEWARE=[*settings.MIDDLEWARE, "booking.routers.ReplicaMiddleware"],
+)
+class ReadReplicaTests(TransactionTestCase):
+    """A second SQLite file as the replica; it only changes when sync_replica() copies the primary."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Registered here rather than in settings, so the runner does not create a test DB for it
+        handle, cls.replica_file = tempfile.mkstemp(suffix=".sqlite3", prefix="replica-")
+        os.close(handle)
+        connections.settings[REPLICA_ALIAS] = {**connections.settings["default"], "NAME": cls.replica_file}
+        cls.databases = {"default", REPLICA_ALIAS}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA_ALIAS].close()
+        del connections[REPLICA_ALIAS]
+        del connections.settings[REPLICA_ALIAS]
+        os.remove(cls.replica_file)
+
+    def setUp(self):
+        cache.clear()
+        self.travel = TravelOption.objects.create(
+            type="Train",
+            source="Nagpur",
+            destination="Indore",
+            departure_date=date(2031, 5, 1),
+            departure_time=time(8, 0),
+            price=25,
+            available_seats=40,
+        )
+        self.sync_replica()
+
+    def sync_replica(self):
+        connections[REPLICA_ALIAS].close()
+        primary = connections["default"]
+        primary.ensure_connection()
+        target = sqlite3.connect(self.replica_file)
+        primary.connection.backup(target)
+        target.close()
+
+    def test_search_reads_replica(self):
+        TravelOption.objects.create(
+            type="Train",
+            source="Nagpur",
+            destination="Bhopal",
+            departure_date=date(2031, 5, 1),
+            departure_time=time(9, 0),
+            price=25,
+            available_seats=40,
+        )
+        resp = self.client.get(reverse("booking:travel_list"), {"source": "nagpur"})
+        self.assertEqual([t.pk for t in resp.context["page"]], [self.travel.pk])
+        self.assertNotIn(STICKY_COOKIE, resp.cookies)
+
+    def test_search_api_streams_from_replica(self):
+        TravelOption.objects.create(
+            type="Train",
+            source="Nagpur",
+            destination="Indore",
+            departure_date=date(2031, 5, 1),
+            departure_time=time(9, 0),
+            price=25,
+            available_seats=40,
+        )
+        # The rows are read while the response streams, after the view has returned
+        resp = self.client.get(reverse("booking:search_api"), {"source": "nagpur", "fields": "id"})
+        rows = [json.loads(line) for line in b"".join(resp.streaming_content).decode().splitlines()]
+        self.assertEqual(rows, [{"id": self.travel.pk}])
+
+    def test_own_booking_is_read_from_primary(self):
+        # Created after the sync: login and auth reads must come from the primary
+        User.objects.create_user(username="hana", password="pass12345")
+        self.client.login(username="hana", password="pass12345")
+        resp = self.client.post(
+            reverse("booking:create_booking", args=[self.travel.pk]),
+            {"number_of_seats": 1, "passenger_payload": json.dumps([{"name": "Hana", "age": 28}])},
+        )
+        self.assertIn(STICKY_COOKIE, resp.cookies)
+        history = reverse("booking:booking_history")
+        self.assertEqual(len(self.client.get(history).context["bookings"]), 1)
+        # Once the stickiness lapses, history comes from the (stale) replica
+        del self.client.cookies[STICKY_COOKIE]
+        resp = self.client.get(history)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.context["bookings"]), 0)
+        self.sync_replica()
+        self.assertEqual(len(self.client.get(history).context["bookings"]), 1)
+
+    def test_replica_reads_fill_no_shared_caches(self):
+        TravelOption.objects.create(
+            type="Train", source="Nagpur", destination="Bhopal", departure_date=date(2031, 5, 1),
+            departure_time=time(9, 0), price=25, available_seats=40,
+        )
+        # Rebuilt from the primary even though the request reads the replica
+        resp = self.client.get(reverse("booking:suggest_locations"), {"q": "bho"})
+        self.assertEqual(resp.json()["results"], ["Bhopal"])
+        params = {"source": "nagpur", "date": "2031-05-01", "flex_days": 1}
+        self.assertEqual(len(self.client.get(reverse("booking:travel_list"), params).context["page"]), 1)
+        self.sync_replica()
+        resp = self.client.get(reverse("booking:travel_list"), params)
+        self.assertEqual(len(resp.context["page"]), 2)
+        self.assertEqual(resp.context["facets"]["total"], 2)
+        self.assertEqual(sum(day.departures for day in resp.context["flex_days"]), 2)
+
+    def test_connection_graph_is_patched_from_the_primary(self):
+        connection_graph._graph = None
+
+        def departure(hour):
+            return TravelOption.objects.create(
+                type="Bus", source="Nagpur", destination="Indore", departure_date=date(2031, 5, 1),
+                departure_time=time(hour, 0), duration=timedelta(hours=2), price=10, available_seats=5,
+            )
+
+        departure(10)
+        params = {"source": "Nagpur", "destination": "Indore", "date": "2031-05-01"}
+        self.client.get(reverse("booking:connections_api"), params)
+        # Not on the replica yet; patching from it would drop the departure for good
+        departure(12)
+        self.client.get(reverse("booking:connections_api"), params)
+        self.assertEqual(len(connection_graph.get_graph()), 2)
+        self.sync_replica()
+        self.assertEqual(len(self.client.get(reverse("booking:connections_api"), params).json()["results"]), 2)
+
+
+class FareCalendarTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="fara", password="pass12345")
+        self.day = date.today() + timedelta(days=10)
+
+        def departure(travel_type, price, seats, day=self.day, destination="Goa", hour=8):
+            return TravelOption.objects.create(
+                type=travel_type,
+                source="Pune",
+                destination=destination,
+                departure_date=day,
+                departure_time=time(hour, 0),
+                price=price,
+                available_seats=seats,
+            )
+
+        self.early = departure("Bus", 30, 10)
+        self.late = departure("Bus", 20, 5, hour=20)
+        self.train = departure("Train", 15, 100, day=self.day + timedelta(days=1))
+        departure("Bus", 5, 50, destination="Delhi")
+        self.api = reverse("booking:fare_calendar_api")
+
+    def calendar(self, **params):
+        params = {"source": "pune", "destination": "goa", "date": self.day.isoformat(), **params}
+        resp = self.client.get(self.api, params)
+        self.assertEqual(resp.status_code, 200)
+        return [(r["date"], r["min_price"], r["departures"], r["seats_left"]) for r in resp.json()["results"]]
+
+    def test_one_range_read_per_calendar(self):
+        # Fare days, then the live seat sums
+        with self.assertNumQueries(2):
+            self.client.get(self.api, {"source": "Pune", "destination": "Goa", "days": 90})
+        first, second = self.day.isoformat(), (self.day + timedelta(days=1)).isoformat()
+        self.assertEqual(self.calendar(), [(first, "20.00", 2, 15), (second, "15.00", 1, 100)])
+        self.assertEqual(self.calendar(type="Bus", days=1), [(first, "20.00", 2, 15)])
+
+    def test_seats_left_follows_bookings_and_cancellations(self):
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse("booking:create_booking", args=[self.late.pk]),
+            {"number_of_seats": 2, "passenger_payload": json.dumps([{"name": "F", "age": 30}] * 2)},
+        )
+        self.assertEqual(self.calendar(type="Bus")[0][3], 13)
+        self.client.get(reverse("booking:cancel_booking", args=[Booking.objects.get().pk]))
+        self.assertEqual(self.calendar(type="Bus")[0][3], 15)
+
+    def test_schedule_changes_recompute_the_days(self):
+        self.late.price = 40
+        self.late.save()
+        self.assertEqual(self.calendar(type="Bus")[0][1], "30.00")
+        # Moving a departure updates both the day it leaves and the day it joins
+        self.early.departure_date = self.day + timedelta(days=1)
+        self.early.save(update_fields=["departure_date"])
+        self.assertEqual(
+            [(day, departures) for day, _, departures, _ in self.calendar(type="Bus")],
+            [(self.day.isoformat(), 1), ((self.day + timedelta(days=1)).isoformat(), 1)],
+        )
+        self.late.delete()
+        self.early.delete()
+        self.assertEqual(self.calendar(type="Bus"), [])
+        self.assertFalse(FareDay.objects.filter(type="Bus", destination_location__name="Goa").exists())
+
+    def test_imports_and_rebuild_agree_with_incremental_upkeep(self):
+        feed = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False)
+        with feed:
+            feed.write(
+                "type,source,destination,departure_date,departure_time,price,seats\n"
+                f"Bus,Pune,Goa,{self.day},08:00,12,10\nBus,Pune,Goa,{self.day},23:00,25,7\n"
+            )
+        self.addCleanup(os.remove, feed.name)
+        call_command("import_schedule", feed.name, stdout=StringIO())
+        self.assertEqual(self.calendar(type="Bus", days=1), [(self.day.isoformat(), "12.00", 3, 22)])
+
+        fields = ("type", "source_location", "destination_location", "date", "min_price", "departures")
+        maintained = sorted(FareDay.objects.values_list(*fields))
+        self.assertEqual(rebuild_fare_calendar(), len(maintained))
+        self.assertEqual(sorted(FareDay.objects.values_list(*fields)), maintained)
+
+    def test_booking_writes_no_fare_day(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(TravelOption.objects.reserve_seats(self.late.pk, 2))
+            TravelOption.objects.release_seats(self.late.pk, 1)
+        self.assertFalse([q for q in queries if "booking_fareday" in q["sql"]])
+        self.assertEqual(self.calendar(type="Bus")[0][3], 14)
+
+    def test_upsert_names_no_conflict_target_where_the_backend_takes_none(self):
+        with mock.patch.object(connection.features, "supports_update_conflicts_with_target", False):
+            with mock.patch.object(FareDay.objects, "bulk_create") as bulk_create:
+                refresh_fare_days([fare_day(self.early)])
+        self.assertIsNone(bulk_create.call_args.kwargs["unique_fields"])
+        self.assertTrue(bulk_create.call_args.kwargs["update_conflicts"])
+
+    def test_page_highlights_cheapest_day_and_api_validates(self):
+        resp = self.client.get(reverse("booking:fare_calendar"), {"source": "Pune", "destination": "Goa"})
+        self.assertContains(resp, "Cheapest", count=1)
+        self.assertContains(resp, f"date={self.day + timedelta(days=1):%Y-%m-%d}")
+        resp = self.client.get(self.api, {"source": "Pune", "days": 10000})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(set(resp.json()["errors"]), {"destination", "days"})
+
+
+class ConnectionSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        connection_graph._graph = None
+        self.day = date.today() + timedelta(days=5)
+
+        def departure(travel_type, source, destination, hour, minutes, price, day=self.day, minute=0):
+            return TravelOption.objects.create(
+                type=travel_type,
+                source=source,
+                destination=destination,
+                departure_date=day,
+                departure_time=time(hour, minute),
+                duration=timedelta(minutes=minutes),
+                price=price,
+                available_seats=5,
+            )
+
+        self.departure = departure
+        self.to_mumbai = departure("Flight", "Delhi", "Mumbai", 8, 120, 100)
+        # Arrives 10:00: 12:00 leaves a 2h change, 10:30 is under the 45 minute minimum
+        self.train = departure("Train", "Mumbai", "Kochi", 12, 600, 40)
+        departure("Bus", "Mumbai", "Kochi", 10, 600, 10, minute=30)
+        self.bus = departure("Bus", "Mumbai", "Kochi", 15, 840, 25)
+        self.direct = departure("Bus", "Delhi", "Kochi", 6, 1800, 200)
+        self.api = reverse("booking:connections_api")
+
+    def search(self, **params):
+        params = {"source": "Delhi", "destination": "Kochi", "date": self.day.isoformat(), **params}
+        resp = self.client.get(self.api, params)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return [[leg["id"] for leg in result["legs"]] for result in resp.json()["results"]]
+
+    def test_changes_respect_layovers_and_rank_by_arrival_or_price(self):
+        mumbai, train, bus, direct = self.to_mumbai.pk, self.train.pk, self.bus.pk, self.direct.pk
+        self.assertEqual(self.search(), [[mumbai, train], [mumbai, bus], [direct]])
+        self.assertEqual(self.search(sort="price"), [[mumbai, bus], [mumbai, train], [direct]])
+        self.assertEqual(self.search(max_legs=1), [[direct]])
+        self.assertEqual(self.search(types=["Flight", "Train"]), [[mumbai, train]])
+        self.assertEqual(self.search(max_layover=90), [[direct]])
+        result = self.client.get(self.api, {"source": "Delhi", "destination": "Kochi", "date": self.day}).json()
+        self.assertEqual(result["results"][0]["layover_minutes"], [120])
+
+    def test_three_legs_and_live_seats(self):
+        self.departure("Train", "Delhi", "Pune", 5, 60, 5)
+        self.departure("Bus", "Pune", "Goa", 7, 60, 5)
+        self.departure("Bus", "Goa", "Kochi", 9, 60, 5)
+        self.assertEqual(len(self.search(max_legs=3, sort="price")[0]), 3)
+        TravelOption.objects.filter(pk=self.train.pk).update(available_seats=1)
+        self.assertNotIn([self.to_mumbai.pk, self.train.pk], self.search(seats=2))
+
+    def test_saves_and_deletes_patch_the_graph_in_place(self):
+        self.search()
+        graph = connection_graph.get_graph()
+        with self.captureOnCommitCallbacks(execute=True):
+            early = self.departure("Train", "Mumbai", "Kochi", 11, 60, 50)
+            self.train.departure_time = time(14, 0)
+            self.train.save(update_fields=["departure_time"])
+            self.bus.delete()
+        self.assertEqual(
+            self.search(), [[self.to_mumbai.pk, early.pk], [self.to_mumbai.pk, self.train.pk], [self.direct.pk]]
+        )
+        self.assertIs(connection_graph.get_graph(), graph)
+        # One departure added, one deleted
+        self.assertEqual(len(graph), 5)
+
+    def test_page_and_validation(self):
+        params = {"source": "Delhi", "destination": "Kochi", "date": self.day}
+        resp = self.client.get(reverse("booking:connection_search"), params)
+        self.assertContains(resp, "Delhi → Mumbai")
+        params = {"source": "Delhi", "destination": "Kochi", "min_layover": 90, "max_layover": 60}
+        resp = self.client.get(self.api, params)
+        self.assertEqual(set(resp.json()["errors"]), {"date", "max_layover"})
+        params = {"source": "Delhi", "destination": "Kochi", "date": self.day, "max_layover": 100000}
+        resp = self.client.get(self.api, params)
+        self.assertEqual(set(resp.json()["errors"]), {"max_layover"})
+
+    def test_imports_patch_the_graph_in_place(self):
+        self.search()
+        graph = connection_graph.get_graph()
+        feed = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False)
+        with feed:
+            feed.write(
+                "type,source,destination,departure_date,departure_time,price,seats,duration\n"
+                f"Train,Mumbai,Kochi,{self.day},11:00,30,10,60\nBus,Delhi,Kochi,{self.day},06:00,150,5,1800\n"
+            )
+        self.addCleanup(os.remove, feed.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("import_schedule", feed.name, stdout=StringIO())
+        early = TravelOption.objects.get(type="Train", departure_time=time(11, 0))
+        self.assertEqual(self.search()[0], [self.to_mumbai.pk, early.pk])
+        self.assertIs(connection_graph.get_graph(), graph)
+        self.assertEqual(len(graph), 6)
+
+
+class FlexDateSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.day = date(2030, 5, 20)
+        self.url = reverse("booking:travel_list")
+
+        def departure(offset, price, hour=8, destination="Goa"):
+            return TravelOption.objects.create(
+                type="Bus",
+                source="Pune",
+                destination=destination,
+                departure_date=self.day + timedelta(days=offset),
+                departure_time=time(hour, 0),
+                price=price,
+                available_seats=20,
+            )
+
+        self.before = [departure(-1, 40), departure(-1, 25, hour=9), departure(-1, 30, hour=10)]
+        self.after = departure(1, 15)
+        departure(2, 5)
+        departure(0, 1, destination="Delhi")
+
+    def search(self, **params):
+        return self.client.get(self.url, {"source": "pune", "destination": "goa", "date": self.day, **params})
+
+    def test_window_grouped_per_day_with_cheapest_fare(self):
+        days = self.search(flex_days=1).context["flex_days"]
+        self.assertEqual(
+            [(d.date, d.min_price, d.departures, d.cheapest) for d in days],
+            [
+                (self.day - timedelta(days=1), Decimal("25.00"), 3, False),
+                (self.day, None, 0, False),
+                (self.day + timedelta(days=1), Decimal("15.00"), 1, True),
+            ],
+        )
+        # Cheapest first within a day
+        self.assertEqual(days[0].options, [self.before[1], self.before[2], self.before[0]])
+        self.assertIn(f"date={days[0].date.isoformat()}", days[0].query)
+        self.assertNotIn("flex_days", days[0].query)
+
+    @override_settings(SEARCH_FLEX_PER_DAY=2)
+    def test_flex_search_costs_one_query_like_an_exact_one(self):
+        # Warm the popular-routes cache so both searches run the same extras
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as exact:
+            self.search()
+        with CaptureQueriesContext(connection) as flex:
+            response = self.search(flex_days=3)
+        self.assertEqual(len(flex), len(exact))
+        days = response.context["flex_days"]
+        self.assertEqual(len(days), 7)
+        self.assertEqual([len(d.options) for d in days], [0, 0, 2, 0, 1, 1, 0])
+        self.assertEqual(days[2].departures, 3)
+        self.assertContains(response, "All 3")
+
+    def test_cached_window_shows_live_seats(self):
+        cleaned = {"source": "pune", "destination": "goa", "date": self.day, "flex_days": 1}
+        async_to_sync(asearch_flex_days)(cleaned, per_day=5)
+        TravelOption.objects.reserve_seats(self.after.pk, 4)
+        days = async_to_sync(asearch_flex_days)(cleaned, per_day=5)
+        self.assertEqual(search_cache_stats(), {"hits": 1, "misses": 1, "hit_rate": 0.5})
+        self.assertEqual(days[2].options[0].available_seats, 16)
+        self.assertEqual(days[0].min_price, Decimal("25.00"))
+
+    def test_price_edit_refreshes_cached_window(self):
+        cleaned = {"source": "pune", "destination": "goa", "date": self.day, "flex_days": 1}
+        async_to_sync(asearch_flex_days)(cleaned, per_day=5)
+        self.after.price = 50
+        with self.captureOnCommitCallbacks(execute=True):
+            self.after.save(update_fields=["price"])
+        days = async_to_sync(asearch_flex_days)(cleaned, per_day=5)
+        self.assertEqual(search_cache_stats()["hits"], 0)
+        self.assertEqual(days[2].min_price, Decimal("50.00"))
+
+    def test_exact_date_without_flex(self):
+        response = self.search(flex_days=0)
+        self.assertIsNone(response.context["flex_days"])
+        self.assertEqual(list(response.context["page"]), [])
+        # flex_days needs a date to widen; on its own it is ignored
+        response = self.client.get(self.url, {"source": "pune", "destination": "goa", "flex_days": 2})
+        self.assertEqual(len(response.context["page"].object_list), 5)
+
+
+class FacetSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("booking:travel_list")
+
+        def departure(travel_type, price, hour, seats, destination="Goa"):
+            return TravelOption.objects.create(
+                type=travel_type,
+                source="Pune",
+                destination=destination,
+                departure_date=date(2030, 6, 1),
+                departure_time=time(hour, 0),
+                price=price,
+                available_seats=seats,
+            )
+
+        self.morning_bus = departure("Bus", 30, 8, 20)
+        self.evening_bus = departure("Bus", 80, 19, 0)
+        self.train = departure("Train", 120, 7, 5)
+        self.flight = departure("Flight", 600, 13, 50)
+        departure("Bus", 10, 9, 40, destination="Delhi")
+
+    def facets(self, **data):
+        facets = async_to_sync(asearch_facets)({"source": "pune", "destination": "goa", **data})
+        return {name: value if name == "total" else [b.count for b in value] for name, value in facets.items()}
+
+    def test_all_facets_in_one_aggregate_query(self):
+        # Two place lookups, then one query for every bucket
+        with self.assertNumQueries(3):
+            facets = self.facets()
+        self.assertEqual(
+            facets,
+            {
+                "total": 4,
+                "type": [1, 1, 2],
+                "price": [1, 1, 1, 0, 1, 0],
+                "time": [0, 2, 1, 1],
+                "seats": [1, 1, 2],
+            },
+        )
+        # Served from the cache on the next page of the same search
+        with self.assertNumQueries(2):
+            self.facets()
+
+    def test_facets_leave_out_their_own_filter(self):
+        facets = self.facets(type="Bus", depart_after=time(12))
+        self.assertEqual(facets["total"], 1)
+        # Types counted with only the time filter: the flight and the evening bus
+        self.assertEqual(facets["type"], [1, 0, 1])
+        # Times counted with only the type filter: both buses
+        self.assertEqual(facets["time"], [0, 1, 0, 1])
+        self.assertEqual(facets["seats"], [1, 0, 0])
+
+    def test_price_and_time_filters_through_the_form(self):
+        def search(**params):
+            response = self.client.get(self.url, {"source": "pune", "destination": "goa", **params})
+            return response, [t.pk for t in response.context["page"]]
+
+        _, found = search(price_from="50", price_under="250")
+        self.assertEqual(found, [self.train.pk, self.evening_bus.pk])
+        _, found = search(depart_after="07:00", depart_before="09:00")
+        self.assertEqual(found, [self.train.pk, self.morning_bus.pk])
+        response, found = search(price_from="100", price_under="50")
+        self.assertIn("price_under", response.context["form"].errors)
+
+    def test_bucket_links_toggle_their_filter(self):
+        params = {"source": "pune", "destination": "goa", "depart_after": "06:00", "depart_before": "12:00"}
+        response = self.client.get(self.url, {**params, "after": "cursor"})
+        morning = response.context["facets"]["time"][1]
+        self.assertTrue(morning.selected)
+        self.assertEqual(morning.query, "source=pune&destination=goa")
+        cheap = response.context["facets"]["price"][0]
+        self.assertEqual(
+            cheap.query, "source=pune&destination=goa&depart_after=06%3A00&depart_before=12%3A00&price_under=50"
+        )
+        self.assertContains(response, "Under $50")
+        # No facets for the unscoped landing page
+        self.assertIsNone(self.client.get(self.url).context["facets"])
+
+
+class NextDeparturesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.day = date(2030, 5, 20)
+
+        def departure(hour, day=self.day, destination="Goa", seats=5, **extra):
+            return TravelOption.objects.create(
+                type=extra.pop("type", "Bus"),
+                source="Pune",
+                destination=destination,
+                departure_date=day,
+                departure_time=time(hour, 0),
+                price=Decimal("20.00"),
+                available_seats=seats,
+                **extra,
+            )
+
+        self.departure = departure
+        self.late = departure(18)
+        self.early = departure(7)
+        self.next_day = departure(6, day=self.day + timedelta(days=1))
+        self.full = departure(9, seats=0)
+        departure(8, destination="Kochi")
+        self.api = reverse("booking:next_departures_api")
+
+    def ids(self, **params):
+        params = {"source": "Pune", "destination": "Goa", "after": f"{self.day}T06:30", **params}
+        resp = self.client.get(self.api, params)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return [result["id"] for result in resp.json()["results"]]
+
+    def test_departure_at_follows_date_and_time(self):
+        self.assertEqual(self.early.departure_at, timezone.make_aware(datetime(2030, 5, 20, 7, 0)))
+        self.early.departure_time = time(19, 0)
+        self.early.save(update_fields=["departure_time"])
+        self.early.refresh_from_db()
+        self.assertEqual(self.early.departure_at.hour, 19)
+        TravelOption.objects.filter(pk=self.late.pk).update(price=Decimal("25.00"))
+        self.assertEqual(TravelOption.objects.get(pk=self.late.pk).departure_at.hour, 18)
+
+    def test_next_departures_in_order_from_after(self):
+        self.assertEqual(self.ids(), [self.early.pk, self.late.pk, self.next_day.pk])
+        self.assertEqual(self.ids(limit=2), [self.early.pk, self.late.pk])
+        self.assertEqual(self.ids(after=f"{self.day}T12:00"), [self.late.pk, self.next_day.pk])
+        # Sold out departures are skipped, as are ones short of ``seats``
+        self.assertNotIn(self.full.pk, self.ids())
+        self.assertEqual(self.ids(seats=6), [])
+        self.assertEqual(self.ids(type="Train"), [])
+        # Without ``after`` the departures are those from now on
+        past = self.departure(7, day=date.today() - timedelta(days=1))
+        self.assertNotIn(past.pk, self.ids(after=""))
+
+    def test_one_query_per_location_plus_an_index_seek(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.ids()
+        self.assertEqual(len(queries), 3)
+        plan = connection.cursor().execute("EXPLAIN QUERY PLAN " + queries[-1]["sql"]).fetchall()
+        self.assertIn("travel_route_departure_idx", str(plan))
+        self.assertNotIn("TEMP B-TREE", str(plan))
+
+    def test_validation(self):
+        resp = self.client.get(self.api, {"source": "Pune", "limit": settings.NEXT_DEPARTURES_MAX + 1})
+        self.assertEqual(set(resp.json()["errors"]), {"destination", "limit"})
+
 # Create your tests here.
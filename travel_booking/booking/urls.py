@@ -9,7 +9,15 @@ urlpatterns = [
     path("book/<int:travel_id>/", views.create_booking, name="create_booking"),
     path("bookings/", views.booking_history, name="booking_history"),
     path("cancel/<int:booking_id>/", views.cancel_booking, name="cancel_booking"),
+    path("fares/", views.fare_calendar, name="fare_calendar"),
+    path("connections/", views.connection_search, name="connection_search"),
+    path("api/travel-options/", views.search_api, name="search_api"),
     path("api/suggest/", views.suggest_locations, name="suggest_locations"),
+    path("api/fare-calendar/", views.fare_calendar_api, name="fare_calendar_api"),
+    path("api/connections/", views.connections_api, name="connections_api"),
+    path("api/departures/next/", views.next_departures_api, name="next_departures_api"),
+    path("api/bookings/bulk/", views.bulk_create_bookings, name="bulk_create_bookings"),
+    path("api/metrics/", views.request_metrics, name="request_metrics"),
 ]
 
 
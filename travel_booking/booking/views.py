@@ -1,87 +1,216 @@
+import hashlib
+import json
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
 from django.db import transaction
-from django.db.models import F
 from django.shortcuts import get_object_or_404, redirect, render
-from django.http import JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_POST
 
-from .forms import SearchForm, BookingForm
-from .models import TravelOption, Booking
+from .bulk import book_batch
+from .connections import Itinerary, find_connections
+from .fares import fare_calendar_days
+from .forms import ConnectionSearchForm, FareCalendarForm, NextDeparturesForm, SearchForm, BookingForm
+from .models import Location, TravelOption, Booking
+from .holds import active_hold, convert_hold, place_hold
+from .instrumentation import read_snapshots, registry, summarize
+from .locations import normalize_location
+from .outbox import enqueue_email
+from .popular import apopular_routes, record_booking
+from .routers import replica_reads
+from .pagination import KEYSET_ORDERING, KeysetPage, keyset_paginate
+from .facets import FACET_FIELDS
+from .search_cache import (
+    aresolve_places,
+    asearch_facets,
+    asearch_flex_days,
+    asearch_travel_options,
+    filter_travel_options,
+    search_cache_stats,
+)
+from .suggest import aget_index
 
 
-def travel_list(request):
-    form = SearchForm(request.GET or None)
-    queryset = TravelOption.objects.all().order_by("departure_date", "departure_time")
-
-    if form.is_valid():
-        type_val = form.cleaned_data.get("type")
-        source = form.cleaned_data.get("source")
-        destination = form.cleaned_data.get("destination")
-        date = form.cleaned_data.get("date")
-
-        if type_val:
-            queryset = queryset.filter(type=type_val)
-        if source:
-            queryset = queryset.filter(source__icontains=source)
-        if destination:
-            queryset = queryset.filter(destination__icontains=destination)
-        if date:
-            queryset = queryset.filter(departure_date=date)
-
-    # Popular routes: based on today's bookings (or recent 24h)
-    from django.utils import timezone
-    from datetime import timedelta
-    since = timezone.now() - timedelta(days=1)
-    popular_qs = (
-        Booking.objects.filter(booking_date__gte=since)
-        .values("travel_option__source", "travel_option__destination")
-        .order_by()
+def _page_size(request) -> int:
+    try:
+        size = int(request.GET.get("page_size") or settings.TRAVEL_LIST_PAGE_SIZE)
+    except ValueError:
+        size = settings.TRAVEL_LIST_PAGE_SIZE
+    return max(1, min(size, settings.TRAVEL_LIST_MAX_PAGE_SIZE))
+
+
+def _pager_links(request, page, **extra):
+    # Carry the active filters over to the next/previous links
+    params = request.GET.copy()
+    params.pop("after", None)
+    params.pop("before", None)
+    for name, value in extra.items():
+        params[name] = value
+    if page.has_next:
+        params["after"] = page.next_cursor
+        page.next_query = params.urlencode()
+        params.pop("after")
+    if page.has_previous:
+        params["before"] = page.previous_cursor
+        page.previous_query = params.urlencode()
+    return page
+
+
+async def _asearch_page(request, cleaned_data, places=None):
+    page = await asearch_travel_options(
+        cleaned_data,
+        page_size=_page_size(request),
+        after=request.GET.get("after", ""),
+        before=request.GET.get("before", ""),
+        places=places,
     )
-    # Build counts dictionary
-    counts = {}
-    for item in popular_qs:
-        key = (item["travel_option__source"], item["travel_option__destination"])
-        counts[key] = counts.get(key, 0) + 1
-    popular = [
-        {"source": s, "destination": d, "count": c}
-        for (s, d), c in sorted(counts.items(), key=lambda kv: kv[1], reverse=True)[:6]
+    return _pager_links(request, page)
+
+
+def _facet_links(request, facets: dict) -> dict:
+    # Each bucket link toggles that bucket, keeping the other filters
+    params = request.GET.copy()
+    params.pop("after", None)
+    params.pop("before", None)
+    for facet, names in FACET_FIELDS.items():
+        for bucket in facets[facet]:
+            query = params.copy()
+            for name in names:
+                query.pop(name, None)
+            if not bucket.selected:
+                query.update({name: value for name, value in bucket.values.items() if value is not None})
+            bucket.query = query.urlencode()
+    return facets
+
+
+async def _asearch(request, cleaned_data) -> tuple:
+    """(page, flex days, facets) for a listing. Flex days is None unless date ± flex_days
+    was asked for, and facets None unless the search names a place or a date."""
+    places = await aresolve_places(cleaned_data)
+    facets = None
+    # An unscoped listing would aggregate the whole table after every schedule change
+    if any(cleaned_data.get(name) for name in ("source", "destination", "date")):
+        facets = _facet_links(request, await asearch_facets(cleaned_data, places=places))
+    if not (cleaned_data.get("date") and cleaned_data.get("flex_days")):
+        return await _asearch_page(request, cleaned_data, places=places), None, facets
+    days = await asearch_flex_days(cleaned_data, per_day=settings.SEARCH_FLEX_PER_DAY, places=places)
+    # Each day links to its full single-day listing
+    params = request.GET.copy()
+    for name in ("after", "before", "flex_days"):
+        params.pop(name, None)
+    cheapest = min((day.min_price for day in days if day.departures), default=None)
+    for day in days:
+        params["date"] = day.date.isoformat()
+        day.query = params.urlencode()
+        day.cheapest = bool(day.departures) and day.min_price == cheapest
+    return KeysetPage(object_list=[option for day in days for option in day.options]), days, facets
+
+
+async def _aresolve_user(request) -> None:
+    # Load the session user through the async API up front; the lazy
+    # request.user would query synchronously from templates and _conditional
+    request.user = await request.auser()
+
+
+def _conditional(request, etag: str, last_modified=None, render_response=None):
+    """Answer 304 when the client's copy is current, else build the response.
+
+    ``render_response`` is only called on a miss, so a revalidated page skips
+    template rendering entirely.
+    """
+    etag = quote_etag(etag)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = render_response()
+    response.headers["ETag"] = etag
+    if timestamp is not None:
+        response.headers["Last-Modified"] = http_date(timestamp)
+    # Shared caches may store anonymous pages, but everyone must revalidate
+    patch_cache_control(response, no_cache=True, private=request.user.is_authenticated)
+    return response
+
+
+def _render_listing(request, template: str, context: dict):
+    page = context["page"]
+    # Offer cards are cached per (id, updated_at) by the template
+    context["card_cache_seconds"] = settings.CARD_FRAGMENT_CACHE_SECONDS
+    if len(messages.get_messages(request)):
+        # Flash messages are one-shot; never let the client reuse the page they were on
+        return render(request, template, context)
+    stamps = [(t.pk, t.updated_at.isoformat()) for t in page]
+    popular = [(p["source"], p["destination"], p["count"]) for p in context.get("popular_routes") or []]
+    days = [(d.date, d.min_price, d.departures) for d in context.get("flex_days") or []]
+    facets = [
+        (name, value if name == "total" else [bucket.count for bucket in value])
+        for name, value in (context.get("facets") or {}).items()
     ]
+    fingerprint = repr(
+        (
+            template, request.get_full_path(), request.user.pk, stamps, page.next_cursor, page.previous_cursor,
+            popular, days, facets,
+        )
+    )
+    return _conditional(
+        request,
+        hashlib.md5(fingerprint.encode()).hexdigest(),
+        last_modified=max((t.updated_at for t in page), default=None),
+        render_response=lambda: render(request, template, context),
+    )
 
-    context = {"form": form, "travel_options": queryset, "popular_routes": popular}
-    return render(request, "booking/travel_list.html", context)
 
+def _requested_seats(request) -> int:
+    try:
+        seats = int(request.GET.get("seats") or 1)
+    except ValueError:
+        seats = 1
+    return max(1, min(seats, settings.SEAT_HOLD_MAX_SEATS))
 
-def travel_list_by_type(request, travel_type: str):
+
+@replica_reads
+async def travel_list(request):
+    await _aresolve_user(request)
+    form = SearchForm(request.GET or None)
+    # Place names resolve through the indexed Location keys (prefix match,
+    # aliases included); result pages are cached per route version
+    page, flex_days, facets = await _asearch(request, form.cleaned_data if form.is_valid() else {})
+
+    # Popular routes over the last 24h, read from the hourly rollup
+    popular = await apopular_routes(limit=6)
+
+    context = {
+        "form": form, "travel_options": page, "page": page, "flex_days": flex_days, "facets": facets,
+        "popular_routes": popular,
+    }
+    return _render_listing(request, "booking/travel_list.html", context)
+
+
+@replica_reads
+async def travel_list_by_type(request, travel_type: str):
+    await _aresolve_user(request)
     # reuse search form but lock the type
     request_get = request.GET.copy()
     request_get["type"] = travel_type.capitalize()
     form = SearchForm(request_get)
-    queryset = (
-        TravelOption.objects.filter(type=travel_type.capitalize())
-        .order_by("departure_date", "departure_time")
-    )
-    if form.is_valid():
-        source = form.cleaned_data.get("source")
-        destination = form.cleaned_data.get("destination")
-        date = form.cleaned_data.get("date")
-        if source:
-            queryset = queryset.filter(source__icontains=source)
-        if destination:
-            queryset = queryset.filter(destination__icontains=destination)
-        if date:
-            queryset = queryset.filter(departure_date=date)
-    context = {"form": form, "travel_options": queryset, "popular_routes": []}
-    return render(request, "booking/travel_list_by_type.html", context)
+    cleaned_data = form.cleaned_data if form.is_valid() else {"type": request_get["type"]}
+    page, flex_days, facets = await _asearch(request, cleaned_data)
+    context = {
+        "form": form, "travel_options": page, "page": page, "flex_days": flex_days, "facets": facets,
+        "popular_routes": [],
+    }
+    return _render_listing(request, "booking/travel_list_by_type.html", context)
 
 
 @login_required
-@transaction.atomic
 def create_booking(request, travel_id: int):
-    # Lock the row to prevent concurrent overbooking
-    travel_option = (
-        TravelOption.objects.select_for_update().select_related(None).get(pk=travel_id)
-    )
+    # Plain read: rendering the form must not queue behind bookings in flight
+    travel_option = get_object_or_404(TravelOption, pk=travel_id)
     if request.method == "POST":
         form = BookingForm(request.POST)
         if form.is_valid():
@@ -90,55 +219,111 @@ def create_booking(request, travel_id: int):
             passenger_age = form.cleaned_data["primary_passenger_age"]
             if number_of_seats <= 0:
                 messages.error(request, "Number of seats must be positive.")
-            elif travel_option.available_seats < number_of_seats:
-                messages.error(request, "Not enough seats available.")
             else:
-                booking = Booking.objects.create(
-                    user=request.user,
-                    travel_option=travel_option,
-                    number_of_seats=number_of_seats,
-                    primary_passenger_name=passenger_name,
-                    primary_passenger_age=passenger_age,
-                    passenger_details=form.cleaned_data.get("passenger_details", []),
-                    total_price=0,
-                )
-                # Atomic seat decrement
-                TravelOption.objects.filter(pk=travel_option.pk).update(
-                    available_seats=F("available_seats") - number_of_seats
-                )
-                # Send confirmation email (best-effort)
-                if request.user.email:
-                    try:
-                        send_mail(
-                            subject="Booking Confirmed",
-                            message=(
-                                f"Your booking #{booking.pk} for {travel_option.type} "
-                                f"{travel_option.source} -> {travel_option.destination} on "
-                                f"{travel_option.departure_date} {travel_option.departure_time} is confirmed."
-                            ),
-                            from_email=None,
-                            recipient_list=[request.user.email],
-                            fail_silently=True,
+                hold = active_hold(request.user, travel_option)
+                with transaction.atomic():
+                    # Seats already held for this user count towards the booking; only the
+                    # difference goes through the conditional UPDATE
+                    held = convert_hold(hold)
+                    if number_of_seats > held:
+                        reserved = TravelOption.objects.reserve_seats(travel_option.pk, number_of_seats - held)
+                    else:
+                        if number_of_seats < held:
+                            TravelOption.objects.release_seats(travel_option.pk, held - number_of_seats)
+                        reserved = True
+                    if reserved:
+                        booking = Booking.objects.create(
+                            user=request.user,
+                            travel_option=travel_option,
+                            number_of_seats=number_of_seats,
+                            primary_passenger_name=passenger_name,
+                            primary_passenger_age=passenger_age,
+                            passenger_details=form.cleaned_data.get("passenger_details", []),
+                            unit_price=travel_option.price,
                         )
-                    except Exception:
-                        pass
-                display_name = (request.user.get_full_name() or request.user.get_username()).strip()
-                messages.success(request, f"Booking confirmed, {display_name}!")
-                return redirect("booking:booking_history")
+                        record_booking(travel_option.source, travel_option.destination, booking.booking_date)
+                        # Confirmation email is queued with the booking and sent by run_outbox
+                        if request.user.email:
+                            enqueue_email(
+                                subject="Booking Confirmed",
+                                message=(
+                                    f"Your booking #{booking.pk} for {travel_option.type} "
+                                    f"{travel_option.source} -> {travel_option.destination} on "
+                                    f"{travel_option.departure_date} {travel_option.departure_time} is confirmed."
+                                ),
+                                recipient=request.user.email,
+                            )
+                    else:
+                        # Keep the hold active for another try
+                        transaction.set_rollback(True)
+                if reserved:
+                    display_name = (request.user.get_full_name() or request.user.get_username()).strip()
+                    messages.success(request, f"Booking confirmed, {display_name}!")
+                    return redirect("booking:booking_history")
+                messages.error(request, "Not enough seats available.")
+                travel_option.refresh_from_db(fields=["available_seats"])
+        hold = active_hold(request.user, travel_option)
     else:
-        form = BookingForm()
+        hold = place_hold(request.user, travel_option, _requested_seats(request))
+        form = BookingForm(initial={"number_of_seats": hold.seats if hold else 1})
+        travel_option.refresh_from_db(fields=["available_seats"])
+
+    return render(
+        request,
+        "booking/booking_form.html",
+        {"form": form, "travel_option": travel_option, "hold": hold},
+    )
 
-    return render(request, "booking/booking_form.html", {"form": form, "travel_option": travel_option})
 
+HISTORY_TABS = ("upcoming", "past", "cancelled")
+# Newest booking first; a backward range scan of the (user, status, booking_date) index
+HISTORY_ORDERING = ("-booking_date", "-id")
+# Everything the history table shows; passenger_details stays on disk
+HISTORY_FIELDS = (
+    "id",
+    "number_of_seats",
+    "primary_passenger_name",
+    "primary_passenger_age",
+    "total_price",
+    "booking_date",
+    "status",
+    "travel_option__type",
+    "travel_option__source",
+    "travel_option__destination",
+    "travel_option__departure_date",
+    "travel_option__departure_time",
+)
 
+
+@replica_reads
 @login_required
 def booking_history(request):
-    bookings = (
-        Booking.objects.filter(user=request.user)
-        .select_related("travel_option")
-        .order_by("-booking_date")
+    tab = request.GET.get("tab")
+    if tab not in HISTORY_TABS:
+        tab = "upcoming"
+    bookings = Booking.objects.filter(user=request.user)
+    if tab == "cancelled":
+        bookings = bookings.filter(status=Booking.Status.CANCELLED)
+    else:
+        bookings = bookings.filter(status=Booking.Status.CONFIRMED)
+        today = timezone.localdate()
+        if tab == "upcoming":
+            bookings = bookings.filter(travel_option__departure_date__gte=today)
+        else:
+            bookings = bookings.filter(travel_option__departure_date__lt=today)
+    page = keyset_paginate(
+        bookings.select_related("travel_option").only(*HISTORY_FIELDS),
+        page_size=settings.BOOKING_HISTORY_PAGE_SIZE,
+        after=request.GET.get("after", ""),
+        before=request.GET.get("before", ""),
+        ordering=HISTORY_ORDERING,
+    )
+    _pager_links(request, page, tab=tab)
+    return render(
+        request,
+        "booking/booking_history.html",
+        {"bookings": page, "page": page, "tab": tab, "tabs": HISTORY_TABS},
     )
-    return render(request, "booking/booking_history.html", {"bookings": bookings})
 
 
 @login_required
@@ -151,56 +336,292 @@ def cancel_booking(request, booking_id: int):
 
     # Restore seats with row lock
     travel = TravelOption.objects.select_for_update().get(pk=booking.travel_option_id)
-    TravelOption.objects.filter(pk=travel.pk).update(
-        available_seats=F("available_seats") + booking.number_of_seats
-    )
+    TravelOption.objects.release_seats(travel.pk, booking.number_of_seats)
     booking.status = Booking.Status.CANCELLED
-    booking.save()
+    booking.save(update_fields=["status"])
+    record_booking(travel.source, travel.destination, booking.booking_date, delta=-1)
     if request.user.email:
-        try:
-            send_mail(
-                subject="Booking Cancelled",
-                message=(
-                    f"Your booking #{booking.pk} for {travel.type} {travel.source} -> {travel.destination} "
-                    f"on {travel.departure_date} {travel.departure_time} has been cancelled."
-                ),
-                from_email=None,
-                recipient_list=[request.user.email],
-                fail_silently=True,
-            )
-        except Exception:
-            pass
+        enqueue_email(
+            subject="Booking Cancelled",
+            message=(
+                f"Your booking #{booking.pk} for {travel.type} {travel.source} -> {travel.destination} "
+                f"on {travel.departure_date} {travel.departure_time} has been cancelled."
+            ),
+            recipient=request.user.email,
+        )
     display_name = (request.user.get_full_name() or request.user.get_username()).strip()
     messages.success(request, f"Booking cancelled and seats restored, {display_name}.")
     return redirect("booking:booking_history")
 
 
-def suggest_locations(request):
+@replica_reads
+async def suggest_locations(request):
     """Return JSON suggestions for source/destination.
     Query params: q=term, field=source|destination (optional)
+    Served from the per-process prefix index in booking.suggest, ranked by
+    number of departures.
     """
+    await _aresolve_user(request)
     term = (request.GET.get("q") or "").strip()
     field = (request.GET.get("field") or "").strip().lower()
-    qs = TravelOption.objects.all()
-    if field == "source":
-        values_qs = qs.values_list("source", flat=True)
-    elif field == "destination":
-        values_qs = qs.values_list("destination", flat=True)
-    else:
-        values_qs = qs.values_list("source", flat=True)
-        values_qs = list(values_qs) + list(qs.values_list("destination", flat=True))
+    index = await aget_index()
+    # The answer only depends on the index build and the normalized query
+    fingerprint = repr((index.version, normalize_location(term), field))
+    return _conditional(
+        request,
+        hashlib.md5(fingerprint.encode()).hexdigest(),
+        render_response=lambda: JsonResponse({"results": index.suggest(term, field, limit=10)}),
+    )
+
+
+def _calendar_days(form) -> list:
+    data = form.cleaned_data
+    return fare_calendar_days(data["source"], data["destination"], data["date"], data["days"], data.get("type") or "")
+
+
+@replica_reads
+def fare_calendar(request):
+    """Cheapest fare per day on a route, read from the precomputed FareDay table."""
+    form = FareCalendarForm(request.GET or None)
+    days = _calendar_days(form) if form.is_valid() else []
+    cheapest = min((day["min_price"] for day in days), default=None)
+    return render(request, "booking/fare_calendar.html", {"form": form, "days": days, "cheapest": cheapest})
 
-    if term:
-        values = [v for v in values_qs if term.lower() in v.lower()]
+
+@replica_reads
+def fare_calendar_api(request):
+    """JSON fare calendar: the FareCalendarForm fields (source, destination,
+    optional type, date=first day, days) in, one entry per day with
+    departures out."""
+    form = FareCalendarForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    data = form.cleaned_data
+    return JsonResponse(
+        {
+            "source": data["source"],
+            "destination": data["destination"],
+            "type": data.get("type") or "",
+            "start": data["date"],
+            "days": data["days"],
+            "results": _calendar_days(form),
+        }
+    )
+
+
+def _connections(form) -> list:
+    data = form.cleaned_data
+    return find_connections(
+        data["source"],
+        data["destination"],
+        data["date"],
+        types=data["types"],
+        max_legs=data["max_legs"],
+        min_layover=data["min_layover"],
+        max_layover=data["max_layover"],
+        sort=data["sort"],
+        seats=data["seats"],
+        limit=settings.CONNECTION_RESULTS,
+    )
+
+
+@replica_reads
+def connection_search(request):
+    """Itineraries with changes (e.g. Delhi -> Mumbai -> Kochi), from the in-memory route graph."""
+    form = ConnectionSearchForm(request.GET or None)
+    itineraries = _connections(form) if form.is_valid() else []
+    return render(request, "booking/connections.html", {"form": form, "itineraries": itineraries})
+
+
+def _leg_json(leg) -> dict:
+    return {
+        "id": leg.pk,
+        "type": leg.type,
+        "source": leg.source,
+        "destination": leg.destination,
+        "departs_at": Itinerary.departs(leg),
+        "arrives_at": Itinerary.arrives(leg),
+        "price": leg.price,
+        "available_seats": leg.available_seats,
+    }
+
+
+@replica_reads
+def connections_api(request):
+    """JSON connection search: the ConnectionSearchForm fields in (types may
+    repeat), the best itineraries out with their legs and layovers."""
+    form = ConnectionSearchForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    results = [
+        {
+            "departs_at": itinerary.departs_at,
+            "arrives_at": itinerary.arrives_at,
+            "price": itinerary.price,
+            "layover_minutes": [int(layover.total_seconds() // 60) for layover in itinerary.layovers],
+            "legs": [_leg_json(leg) for leg in itinerary.legs],
+        }
+        for itinerary in _connections(form)
+    ]
+    return JsonResponse({"sort": form.cleaned_data["sort"], "results": results})
+
+
+def _next_departures(form) -> list:
+    data = form.cleaned_data
+    # Exact place matches, as in connection search; a single source and destination
+    # make this one seek on the (source, destination, departure_at) index
+    source_ids = list(Location.objects.matching(data["source"], prefix=False).values_list("pk", flat=True))
+    destination_ids = list(Location.objects.matching(data["destination"], prefix=False).values_list("pk", flat=True))
+    departures = TravelOption.objects.upcoming(data["after"]).filter(
+        source_location__in=source_ids,
+        destination_location__in=destination_ids,
+        available_seats__gte=data["seats"],
+    )
+    if data.get("type"):
+        departures = departures.filter(type=data["type"])
+    return list(departures[: data["limit"]])
+
+
+@replica_reads
+def next_departures_api(request):
+    """JSON: a route's next departures. Query params: source, destination,
+    optional type, after (ISO datetime, default now), limit and seats."""
+    form = NextDeparturesForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    results = [
+        {
+            "id": option.pk,
+            "type": option.type,
+            "source": option.source,
+            "destination": option.destination,
+            "departure_at": option.departure_at,
+            "price": option.price,
+            "available_seats": option.available_seats,
+        }
+        for option in _next_departures(form)
+    ]
+    return JsonResponse({"results": results})
+
+
+EXPORT_FIELDS = (
+    "id",
+    "type",
+    "source",
+    "destination",
+    "departure_date",
+    "departure_time",
+    "departure_at",
+    "price",
+    "available_seats",
+    "updated_at",
+)
+
+
+def _export_rows(queryset, fields: tuple):
+    encoder = DjangoJSONEncoder()
+    # Plain tuples straight off the cursor; no model instances are built
+    for row in queryset.values_list(*fields).iterator(chunk_size=settings.SEARCH_EXPORT_CHUNK_SIZE):
+        yield encoder.encode(dict(zip(fields, row)))
+
+
+def _chunked(rows, separator: str):
+    """Join encoded rows into one write per chunk instead of one per row."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= settings.SEARCH_EXPORT_CHUNK_SIZE:
+            yield separator.join(batch)
+            batch = []
+    if batch:
+        yield separator.join(batch)
+
+
+def _ndjson(rows):
+    for chunk in _chunked(rows, "\n"):
+        yield chunk + "\n"
+
+
+def _json_document(rows, fields: tuple):
+    yield '{"fields": %s, "results": [' % json.dumps(fields)
+    for i, chunk in enumerate(_chunked(rows, ",\n")):
+        yield ("," if i else "") + "\n" + chunk
+    yield "\n]}\n"
+
+
+@replica_reads
+def search_api(request):
+    """Stream every departure matching a search, for partner integrations.
+
+    Query params: the SearchForm fields (type, source, destination, date, flex_days,
+    price_from, price_under, depart_after, depart_before),
+    format=ndjson|json (default ndjson) and fields=comma separated subset of
+    EXPORT_FIELDS. Rows come in listing order and memory use stays flat
+    however many match.
+    """
+    form = SearchForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    output = request.GET.get("format", "ndjson")
+    if output not in ("ndjson", "json"):
+        return JsonResponse({"error": "format must be 'ndjson' or 'json'."}, status=400)
+    requested = [name.strip() for name in request.GET.get("fields", "").split(",") if name.strip()]
+    unknown = [name for name in requested if name not in EXPORT_FIELDS]
+    if unknown:
+        return JsonResponse({"error": f"Unknown fields: {', '.join(unknown)}."}, status=400)
+    fields = tuple(dict.fromkeys(requested)) or EXPORT_FIELDS
+
+    queryset = filter_travel_options(form.cleaned_data).order_by(*KEYSET_ORDERING)
+    # Rows are fetched while the response streams, after the router's request
+    # state is gone: pick the database now
+    rows = _export_rows(queryset.using(queryset.db), fields)
+    if output == "json":
+        return StreamingHttpResponse(_json_document(rows, fields), content_type="application/json")
+    return StreamingHttpResponse(_ndjson(rows), content_type="application/x-ndjson")
+
+
+@require_POST
+def bulk_create_bookings(request):
+    """Book a batch of itineraries in one transaction.
+
+    Body: {"mode": "all_or_nothing"|"partial",
+           "items": [{"travel_option_id": 1, "seats": 2, "passengers": [{"name": ..., "age": ...}]}]}
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required."}, status=401)
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "Body must be JSON."}, status=400)
+    items = payload.get("items") if isinstance(payload, dict) else None
+    mode = payload.get("mode", "all_or_nothing") if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items:
+        return JsonResponse({"error": "items must be a non-empty list."}, status=400)
+    if len(items) > settings.BULK_BOOKING_MAX_ITEMS:
+        return JsonResponse({"error": f"At most {settings.BULK_BOOKING_MAX_ITEMS} items per batch."}, status=400)
+    if mode not in ("all_or_nothing", "partial"):
+        return JsonResponse({"error": "mode must be 'all_or_nothing' or 'partial'."}, status=400)
+
+    ok, results = book_batch(request.user, items, all_or_nothing=mode == "all_or_nothing")
+    return JsonResponse({"mode": mode, "results": results}, status=200 if ok else 409)
+
+
+def request_metrics(request):
+    """Staff-only JSON dump of the request instrumentation histograms.
+
+    Defaults to the serving process; ?scope=all merges every process's
+    last published snapshot from REQUEST_METRICS_DIR.
+    """
+    if not (request.user.is_authenticated and request.user.is_staff):
+        return JsonResponse({"error": "Staff only."}, status=403)
+    if request.GET.get("scope") == "all":
+        snapshot = read_snapshots()
     else:
-        values = list(values_qs)
-    # unique, preserve order
-    seen = set()
-    unique_values = []
-    for v in values:
-        if v not in seen:
-            seen.add(v)
-            unique_values.append(v)
-        if len(unique_values) >= 10:
-            break
-    return JsonResponse({"results": unique_values})
+        snapshot = registry.snapshot()
+    return JsonResponse(
+        {
+            "enabled": settings.REQUEST_METRICS_ENABLED,
+            "views": summarize(snapshot),
+            "search_cache": search_cache_stats(),
+        }
+    )
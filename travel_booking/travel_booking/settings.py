@@ -106,6 +106,26 @@ else:
     }
 
 
+# Cache: per-process LocMem in development; set REDIS_URL (pip install redis) so
+# every worker shares search results, version tokens and hit-rate counters
+REDIS_URL = config("REDIS_URL", default="")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "travel-booking",
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -181,3 +201,95 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 LOGIN_URL = "accounts:login"
 LOGIN_REDIRECT_URL = "booking:travel_list"
 LOGOUT_REDIRECT_URL = "booking:travel_list"
+
+# Travel search pagination (keyset/cursor based)
+TRAVEL_LIST_PAGE_SIZE = config("TRAVEL_LIST_PAGE_SIZE", cast=int, default=24)
+TRAVEL_LIST_MAX_PAGE_SIZE = config("TRAVEL_LIST_MAX_PAGE_SIZE", cast=int, default=100)
+
+# Seconds the homepage "popular routes" list is cached
+POPULAR_ROUTES_CACHE_SECONDS = config("POPULAR_ROUTES_CACHE_SECONDS", cast=int, default=60)
+
+# Transactional email outbox (delivered by `manage.py run_outbox`)
+OUTBOX_MAX_ATTEMPTS = config("OUTBOX_MAX_ATTEMPTS", cast=int, default=5)
+OUTBOX_RETRY_BASE_SECONDS = config("OUTBOX_RETRY_BASE_SECONDS", cast=int, default=30)
+OUTBOX_RETRY_MAX_SECONDS = config("OUTBOX_RETRY_MAX_SECONDS", cast=int, default=3600)
+
+# Seat holds taken when the booking form opens (released by `manage.py expire_holds`)
+SEAT_HOLD_TTL_SECONDS = config("SEAT_HOLD_TTL_SECONDS", cast=int, default=600)
+SEAT_HOLD_MAX_SEATS = config("SEAT_HOLD_MAX_SEATS", cast=int, default=10)
+
+# Upper bound on items accepted by the bulk booking API
+BULK_BOOKING_MAX_ITEMS = config("BULK_BOOKING_MAX_ITEMS", cast=int, default=100)
+
+# Opt-in per-request SQL/template timing (report: `manage.py request_metrics` or /api/metrics/)
+REQUEST_METRICS_ENABLED = config("REQUEST_METRICS_ENABLED", cast=bool, default=False)
+REQUEST_METRICS_DIR = config("REQUEST_METRICS_DIR", default=str(BASE_DIR / "var" / "metrics"))
+REQUEST_METRICS_FLUSH_SECONDS = config("REQUEST_METRICS_FLUSH_SECONDS", cast=int, default=10)
+if REQUEST_METRICS_ENABLED:
+    MIDDLEWARE.insert(0, "booking.instrumentation.RequestMetricsMiddleware")
+
+# Seconds a cached search result page lives (route version bumps evict it sooner)
+SEARCH_CACHE_SECONDS = config("SEARCH_CACHE_SECONDS", cast=int, default=300)
+
+# Seconds a rendered offer card is cached (keyed by id and updated_at, so edits show at once)
+CARD_FRAGMENT_CACHE_SECONDS = config("CARD_FRAGMENT_CACHE_SECONDS", cast=int, default=3600)
+
+# Rows fetched per round trip by the streaming search API
+SEARCH_EXPORT_CHUNK_SIZE = config("SEARCH_EXPORT_CHUNK_SIZE", cast=int, default=2000)
+
+# Bookings per page in the booking history tabs
+BOOKING_HISTORY_PAGE_SIZE = config("BOOKING_HISTORY_PAGE_SIZE", cast=int, default=20)
+
+# Fare calendar: days shown by default and the widest range one request may ask for
+FARE_CALENDAR_DAYS = config("FARE_CALENDAR_DAYS", cast=int, default=30)
+FARE_CALENDAR_MAX_DAYS = config("FARE_CALENDAR_MAX_DAYS", cast=int, default=180)
+
+# Connection search: most legs per itinerary, layover window (minutes) and itineraries returned
+CONNECTION_MAX_LEGS = config("CONNECTION_MAX_LEGS", cast=int, default=3)
+CONNECTION_MIN_LAYOVER_MINUTES = config("CONNECTION_MIN_LAYOVER_MINUTES", cast=int, default=45)
+CONNECTION_MAX_LAYOVER_MINUTES = config("CONNECTION_MAX_LAYOVER_MINUTES", cast=int, default=360)
+CONNECTION_RESULTS = config("CONNECTION_RESULTS", cast=int, default=10)
+# Longest layover a search may ask for; wider windows make the graph walk scan far more departures
+CONNECTION_LAYOVER_CAP_MINUTES = config("CONNECTION_LAYOVER_CAP_MINUTES", cast=int, default=1440)
+
+# Flexible-date search: widest ± day window offered and departures listed per day
+SEARCH_FLEX_MAX_DAYS = config("SEARCH_FLEX_MAX_DAYS", cast=int, default=3)
+SEARCH_FLEX_PER_DAY = config("SEARCH_FLEX_PER_DAY", cast=int, default=6)
+
+# Search facets: price histogram bucket edges, and the seat count below which a departure is "few left"
+SEARCH_PRICE_BUCKETS = config("SEARCH_PRICE_BUCKETS", cast=Csv(int), default="50,100,250,500,1000")
+SEARCH_FEW_SEATS = config("SEARCH_FEW_SEATS", cast=int, default=10)
+
+# Next departures API: departures returned by default and the most one request may ask for
+NEXT_DEPARTURES_LIMIT = config("NEXT_DEPARTURES_LIMIT", cast=int, default=5)
+NEXT_DEPARTURES_MAX = config("NEXT_DEPARTURES_MAX", cast=int, default=50)
+
+# SQLite under concurrent writers (opt-in, it switches the database file to WAL): WAL so
+# readers never block the writer, a busy timeout instead of an immediate "database is
+# locked", and BEGIN IMMEDIATE so a booking transaction takes the write lock up front
+# (select_for_update is a no-op on SQLite). IMMEDIATE also makes read-only transactions
+# queue for the write lock. SQLiteConcurrentModeTests runs these options from threads
+SQLITE_CONCURRENT_MODE = config("SQLITE_CONCURRENT_MODE", cast=bool, default=False)
+SQLITE_BUSY_TIMEOUT_SECONDS = config("SQLITE_BUSY_TIMEOUT_SECONDS", cast=int, default=20)
+SQLITE_CONCURRENT_OPTIONS = {
+    "transaction_mode": "IMMEDIATE",
+    "timeout": SQLITE_BUSY_TIMEOUT_SECONDS,
+    # NORMAL is durable in WAL mode except for the last commits on power loss
+    "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL",
+}
+if SQLITE_CONCURRENT_MODE and not USE_MYSQL:
+    DATABASES["default"]["OPTIONS"] = {**SQLITE_CONCURRENT_OPTIONS}
+
+# Optional read replica for the search, suggestion and history views (booking.routers):
+# a MySQL host when USE_MYSQL, else a SQLite file kept in sync by the operator
+DATABASE_REPLICA = config("DATABASE_REPLICA", default="")
+# After a request writes, that browser reads from the primary for this long
+REPLICA_STICKY_SECONDS = config("REPLICA_STICKY_SECONDS", cast=int, default=15)
+if DATABASE_REPLICA:
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST" if USE_MYSQL else "NAME": DATABASE_REPLICA,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_ROUTERS = ["booking.routers.ReplicaRouter"]
+    MIDDLEWARE.append("booking.routers.ReplicaMiddleware")